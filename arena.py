@@ -0,0 +1,373 @@
+"""
+Arena: mange slanger på ett felles brett, og protokollen serveren bruker.
+
+ArenaEngine har reglene for flerspiller uten pygame og uten nettverk.
+Alle slangene flyttes samtidig ett steg per tick i fast takt:
+
+- Halene flyttes før hodene, så en slange kan gå inn i cellen en hale
+  nettopp forlot (også en annen slanges).
+- Et hode dør i veggen, eller hvis cellen det kommer til har mer enn én
+  slange etter flyttet (kropp, egen eller andres, eller et annet hode;
+  to hoder mot hverandre dør begge). Rekkefølgen slangene flyttes i har
+  derfor ingen betydning.
+- Døde slanger fjernes fra brettet og kommer tilbake etter respawn_ticks
+  på en tilfeldig ledig celle, med score 0.
+- Maten følger FOOD_TYPES (poeng og sjanse) og går ut på tid som i
+  enspiller, men fartsendringen brukes ikke: alle går i arenaens takt.
+
+Protokollen er binær (little-endian). Hver melding fra serveren har en
+lengde på 4 byte foran, og første byte er typen:
+
+- MSG_SNAPSHOT: hele brettet. Sendes når en klient kobler til, og når en
+  klient som har ligget etter har tatt igjen køen (se arena_server.py).
+- MSG_TICK: bare endringene i én tick. Flytt er 3 byte per slange (id og
+  retning; mottakeren regner ut det nye hodet og fjerner halen selv med
+  mindre slangen vokser), resten er døde, nye slanger, mat og score.
+
+Klienten sender én byte per sving: UP/RIGHT/DOWN/LEFT fra engine.py.
+ArenaMirror bygger brettet opp igjen fra meldingene.
+
+Eksempel:
+    arena = ArenaEngine(100, 100, seed=1)
+    snake_id = arena.add_snake()
+    arena.turn(snake_id, UP)
+    delta = arena.step()
+    message = encode_tick(arena.tick, delta)
+"""
+
+import random
+import struct
+
+from engine import (
+    FOOD_TYPES, FOOD_TYPE_NAMES, FOOD_LIFETIME, START_SPEED, DIRECTIONS, UP, RIGHT, DOWN, LEFT,
+    MAX_BOARD_SIZE, OccupancyGrid, SnakeBody, Food, choose_food_type,
+)
+
+DEFAULT_TICK_RATE = START_SPEED  # Ticks per sekund, som startfarten i enspiller
+START_LENGTH = 3
+MAX_LENGTH = 1024  # Kroppen har fast kapasitet per slange
+RESPAWN_TICKS = DEFAULT_TICK_RATE
+FOODS_PER_SNAKE = 1.0
+MAX_ID = 0xFFFF
+
+MSG_SNAPSHOT, MSG_TICK = 1, 2
+GROW = 4  # Bit i flytt-koden: halen blir stående
+
+FRAME = struct.Struct('<I')
+# type, tick, arbeidstid forrige tick (µs), flytt, døde, nye, mat inn, mat ut, score
+TICK_HEADER = struct.Struct('<BIIHHHHHH')
+MOVE = struct.Struct('<HB')
+DEATH = struct.Struct('<H')
+SPAWN = struct.Struct('<HHHB')
+FOOD_ADD = struct.Struct('<HHB')
+FOOD_REMOVE = struct.Struct('<HH')
+SCORE = struct.Struct('<HI')
+# type, tick, tickrate, kolonner, rader, din id, slanger, mat
+SNAPSHOT_HEADER = struct.Struct('<BIHHHHHH')
+SNAPSHOT_SNAKE = struct.Struct('<HIH')  # id, score, lengde; så cellene fra hodet
+CELL = struct.Struct('<HH')
+
+
+class ArenaSnake:
+    """En spiller i arenaen."""
+    __slots__ = ('id', 'body', 'direction', 'last_move', 'pending', 'length', 'score',
+                 'alive', 'respawn_at', 'deaths')
+
+    def __init__(self, snake_id, capacity):
+        self.id = snake_id
+        self.body = SnakeBody(capacity)
+        self.direction = UP
+        self.last_move = UP
+        self.pending = None  # Siste sving fra klienten, brukes i neste tick
+        self.length = START_LENGTH
+        self.score = 0
+        self.alive = False
+        self.respawn_at = 0
+        self.deaths = 0
+
+
+class TickDelta:
+    """Endringene i én tick, i rekkefølgen mottakeren må bruke dem."""
+    __slots__ = ('moves', 'deaths', 'spawns', 'food_removed', 'food_added', 'scores')
+
+    def __init__(self):
+        self.moves = []         # (id, retning | GROW)
+        self.deaths = []        # id
+        self.spawns = []        # (id, kol, rad, retning)
+        self.food_removed = []  # (kol, rad), spist eller utløpt
+        self.food_added = []    # (kol, rad, typeindeks)
+        self.scores = []        # (id, score)
+
+
+class ArenaEngine:
+    """Reglene for et felles brett med mange slanger."""
+    def __init__(self, cols, rows, seed=None, tick_rate=DEFAULT_TICK_RATE,
+                 respawn_ticks=RESPAWN_TICKS, foods_per_snake=FOODS_PER_SNAKE):
+        if not (1 <= cols <= MAX_BOARD_SIZE and 1 <= rows <= MAX_BOARD_SIZE):
+            raise ValueError(f"Brettet må være 1-{MAX_BOARD_SIZE} celler i hver retning, ikke {cols}x{rows}")
+        self.cols = cols
+        self.rows = rows
+        self.tick_rate = tick_rate
+        self.respawn_ticks = respawn_ticks
+        self.foods_per_snake = foods_per_snake
+        self.grid = OccupancyGrid(cols, rows)
+        self.rng = random.Random(seed)
+        self.snakes = {}  # id -> ArenaSnake
+        self.tick = 0
+        self._departed = []  # Fjernede slanger som ikke er meldt som døde ennå
+        self._next_id = 0
+        self._capacity = min(cols * rows + 1, MAX_LENGTH)
+
+    def add_snake(self):
+        """Ny spiller. Slangen kommer på brettet i neste tick. Returnerer id-en."""
+        if len(self.snakes) > MAX_ID:
+            raise RuntimeError("Arenaen er full")
+        while self._next_id in self.snakes:
+            self._next_id = (self._next_id + 1) % (MAX_ID + 1)
+        snake = ArenaSnake(self._next_id, self._capacity)
+        snake.respawn_at = self.tick + 1
+        self.snakes[snake.id] = snake
+        self._next_id = (self._next_id + 1) % (MAX_ID + 1)
+        return snake.id
+
+    def remove_snake(self, snake_id):
+        """Fjerner en spiller. Slangen meldes som død i neste tick."""
+        snake = self.snakes.pop(snake_id, None)
+        if snake is not None and snake.alive:
+            self._clear_body(snake)
+            self._departed.append(snake_id)
+
+    def turn(self, snake_id, action):
+        """Husker svingen til neste tick. Snu rett bakover ignoreres da."""
+        snake = self.snakes.get(snake_id)
+        if snake is not None:
+            snake.pending = action
+
+    def _clear_body(self, snake):
+        grid = self.grid
+        for col, row in snake.body:
+            grid.remove_snake(grid.cell_at(col, row))
+        snake.body.clear()
+        snake.alive = False
+
+    def _kill(self, snake, delta):
+        self._clear_body(snake)
+        snake.deaths += 1
+        snake.respawn_at = self.tick + self.respawn_ticks
+        delta.deaths.append(snake.id)
+
+    def _spawn(self, snake, delta):
+        """Setter slangen på en ledig celle, på vei mot midten av brettet."""
+        grid = self.grid
+        cell = grid.random_free_cell(self.rng)
+        if cell is None:
+            return  # Fullt brett; prøv igjen neste tick
+        col, row = grid.position_of(cell)
+        dx = self.cols // 2 - col
+        dy = self.rows // 2 - row
+        if abs(dx) >= abs(dy):
+            direction = RIGHT if dx >= 0 else LEFT
+        else:
+            direction = DOWN if dy > 0 else UP
+        snake.body.push_head(col, row)
+        grid.add_snake(cell)
+        snake.direction = snake.last_move = direction
+        snake.pending = None
+        snake.length = START_LENGTH
+        snake.score = 0
+        snake.alive = True
+        delta.spawns.append((snake.id, col, row, direction))
+
+    def step(self):
+        """Flytter alle slangene ett steg. Returnerer endringene som en TickDelta."""
+        self.tick += 1
+        delta = TickDelta()
+        delta.deaths.extend(self._departed)
+        self._departed.clear()
+        grid = self.grid
+        cell_at = grid.cell_at
+
+        # Haler først, så hoder, så kollisjoner, og de døde fjernes til slutt:
+        # resultatet er uavhengig av rekkefølgen slangene flyttes i
+        heads = []
+        dead = []
+        for snake in self.snakes.values():
+            if not snake.alive:
+                continue
+            if snake.pending is not None:
+                if snake.pending != (snake.last_move + 2) % 4:
+                    snake.direction = snake.pending
+                snake.pending = None
+            snake.last_move = snake.direction
+            dx, dy = DIRECTIONS[snake.direction]
+            col, row = snake.body[0]
+            col += dx
+            row += dy
+            cell = cell_at(col, row)
+            if cell < 0:
+                dead.append(snake)
+                continue
+            body = snake.body
+            grow = len(body) < snake.length
+            if not grow:
+                grid.remove_snake(cell_at(*body.pop_tail()))
+            heads.append((snake, col, row, cell))
+            delta.moves.append((snake.id, snake.direction | (GROW if grow else 0)))
+        for snake, col, row, cell in heads:
+            snake.body.push_head(col, row)
+            grid.add_snake(cell)
+        counts = grid.snake
+        for snake, col, row, cell in heads:
+            if counts[cell] > 1:
+                dead.append(snake)
+                continue
+            food = grid.foods.get(cell)
+            if food is not None:
+                snake.score += FOOD_TYPES[food.food_type]['score']
+                snake.length = min(snake.length + 1, self._capacity - 1)
+                grid.remove_food(cell)
+                delta.food_removed.append((col, row))
+                delta.scores.append((snake.id, snake.score))
+        for snake in dead:
+            self._kill(snake, delta)
+
+        # Mat som går ut på tid, og ny mat opp til målet
+        dt = 1.0 / self.tick_rate
+        expired = [cell for cell, food in grid.foods.items() if not food.update(dt)]
+        for cell in expired:
+            delta.food_removed.append(grid.position_of(cell))
+            grid.remove_food(cell)
+        target = max(1, int(len(self.snakes) * self.foods_per_snake))
+        for _ in range(min(target - len(grid.foods), 1 + len(self.snakes) // 10)):
+            food_type = choose_food_type(self.rng)
+            cell = grid.random_free_cell(self.rng)
+            if cell is None:
+                break
+            col, row = grid.position_of(cell)
+            grid.add_food(cell, Food(col, row, food_type, FOOD_LIFETIME))
+            delta.food_added.append((col, row, FOOD_TYPE_NAMES.index(food_type)))
+
+        for snake in self.snakes.values():
+            if not snake.alive and snake.respawn_at <= self.tick:
+                self._spawn(snake, delta)
+        return delta
+
+    def state(self):
+        """Brettet som enkle verdier: ({id: (score, celler fra hodet)}, {(kol, rad): typeindeks})."""
+        snakes = {s.id: (s.score, list(s.body)) for s in self.snakes.values() if s.alive}
+        foods = {self.grid.position_of(cell): FOOD_TYPE_NAMES.index(food.food_type)
+                 for cell, food in self.grid.foods.items()}
+        return snakes, foods
+
+
+# --- PROTOKOLL ---
+
+def frame(payload):
+    """Legger lengden foran en melding."""
+    return FRAME.pack(len(payload)) + payload
+
+def encode_tick(tick, delta, work_us=0):
+    """Koder endringene i én tick. work_us er serverens arbeidstid for forrige tick."""
+    parts = [TICK_HEADER.pack(MSG_TICK, tick, min(work_us, 0xFFFFFFFF), len(delta.moves), len(delta.deaths),
+                              len(delta.spawns), len(delta.food_added), len(delta.food_removed),
+                              len(delta.scores))]
+    parts += [MOVE.pack(*move) for move in delta.moves]
+    parts += [DEATH.pack(snake_id) for snake_id in delta.deaths]
+    parts += [SPAWN.pack(*spawn) for spawn in delta.spawns]
+    parts += [FOOD_REMOVE.pack(*food) for food in delta.food_removed]
+    parts += [FOOD_ADD.pack(*food) for food in delta.food_added]
+    parts += [SCORE.pack(*score) for score in delta.scores]
+    return frame(b''.join(parts))
+
+def snapshot_body(arena):
+    """Slangene og maten i et snapshot; likt for alle klientene i samme tick."""
+    snakes, foods = arena.state()
+    parts = []
+    for snake_id, (score, cells) in snakes.items():
+        parts.append(SNAPSHOT_SNAKE.pack(snake_id, score, len(cells)))
+        parts += [CELL.pack(*cell) for cell in cells]
+    parts += [FOOD_ADD.pack(col, row, food_type) for (col, row), food_type in foods.items()]
+    return len(snakes), len(foods), b''.join(parts)
+
+def encode_snapshot(arena, your_id, body=None):
+    """Koder hele brettet, for en klient som starter (eller starter på nytt).
+
+    body er snapshot_body(arena) hvis den allerede er laget denne ticken.
+    """
+    n_snakes, n_foods, data = body or snapshot_body(arena)
+    header = SNAPSHOT_HEADER.pack(MSG_SNAPSHOT, arena.tick, arena.tick_rate, arena.cols, arena.rows,
+                                  your_id, n_snakes, n_foods)
+    return frame(header + data)
+
+def tick_header(payload):
+    """(tick, arbeidstid i µs) fra en MSG_TICK uten å dekode resten."""
+    _, tick, work_us, *_counts = TICK_HEADER.unpack_from(payload)
+    return tick, work_us
+
+
+class ArenaMirror:
+    """Brettet slik en klient ser det, bygd fra meldingene fra serveren."""
+    def __init__(self):
+        self.tick = 0
+        self.your_id = None
+        self.cols = self.rows = 0
+        self.snakes = {}  # id -> [score, celler fra hodet]
+        self.foods = {}   # (kol, rad) -> typeindeks
+
+    def apply(self, payload):
+        """Bruker én melding (uten lengden foran)."""
+        if payload[0] == MSG_SNAPSHOT:
+            self._apply_snapshot(payload)
+        elif payload[0] == MSG_TICK:
+            self._apply_tick(payload)
+        else:
+            raise ValueError(f"Ukjent meldingstype {payload[0]}")
+
+    def _apply_snapshot(self, payload):
+        (_, self.tick, _tick_rate, self.cols, self.rows, self.your_id,
+         n_snakes, n_foods) = SNAPSHOT_HEADER.unpack_from(payload)
+        offset = SNAPSHOT_HEADER.size
+        self.snakes = {}
+        for _ in range(n_snakes):
+            snake_id, score, length = SNAPSHOT_SNAKE.unpack_from(payload, offset)
+            offset += SNAPSHOT_SNAKE.size
+            cells = [CELL.unpack_from(payload, offset + i * CELL.size) for i in range(length)]
+            offset += length * CELL.size
+            self.snakes[snake_id] = [score, cells]
+        self.foods = {}
+        for _ in range(n_foods):
+            col, row, food_type = FOOD_ADD.unpack_from(payload, offset)
+            offset += FOOD_ADD.size
+            self.foods[(col, row)] = food_type
+
+    def _apply_tick(self, payload):
+        (_, self.tick, _work_us, n_moves, n_deaths, n_spawns, n_added, n_removed,
+         n_scores) = TICK_HEADER.unpack_from(payload)
+        offset = TICK_HEADER.size
+        snakes = self.snakes
+        for snake_id, code in MOVE.iter_unpack(payload[offset:offset + n_moves * MOVE.size]):
+            cells = snakes[snake_id][1]
+            dx, dy = DIRECTIONS[code & 3]
+            col, row = cells[0]
+            cells.insert(0, (col + dx, row + dy))
+            if not code & GROW:
+                cells.pop()
+        offset += n_moves * MOVE.size
+        for (snake_id,) in DEATH.iter_unpack(payload[offset:offset + n_deaths * DEATH.size]):
+            snakes.pop(snake_id, None)
+        offset += n_deaths * DEATH.size
+        for snake_id, col, row, _direction in SPAWN.iter_unpack(payload[offset:offset + n_spawns * SPAWN.size]):
+            snakes[snake_id] = [0, [(col, row)]]
+        offset += n_spawns * SPAWN.size
+        for col, row in FOOD_REMOVE.iter_unpack(payload[offset:offset + n_removed * FOOD_REMOVE.size]):
+            self.foods.pop((col, row), None)
+        offset += n_removed * FOOD_REMOVE.size
+        for col, row, food_type in FOOD_ADD.iter_unpack(payload[offset:offset + n_added * FOOD_ADD.size]):
+            self.foods[(col, row)] = food_type
+        offset += n_added * FOOD_ADD.size
+        for snake_id, score in SCORE.iter_unpack(payload[offset:offset + n_scores * SCORE.size]):
+            snakes[snake_id][0] = score
+
+    def state(self):
+        """Samme form som ArenaEngine.state()."""
+        return {i: (score, list(cells)) for i, (score, cells) in self.snakes.items()}, dict(self.foods)
@@ -0,0 +1,237 @@
+"""
+Lasttest av arena-serveren med boter: tick-tid og båndbredde per antall slanger.
+
+For hvert antall slanger (standard 10, 100 og 1000) startes
+arena_server.py som egen prosess på en ledig port, like mange boter
+kobler til over TCP, og etter oppvarmingen måles det i --seconds sekunder:
+
+- serverens arbeidstid per tick (steg, koding og sending), som serveren
+  legger i hver tick-melding, med p50/p95/p99
+- tiden mellom tick-meldingene hos en observatør-bot (jitter), og hvor
+  mange ticks per sekund som faktisk kom fram
+- byte per tick per klient og samlet båndbredde ut fra serveren
+- snapshots sendt på nytt til klienter som lå etter, og meldinger serveren
+  droppet (fra statistikken serveren skriver ut når den stopper)
+
+Botene svinger tilfeldig og leser alt de får. Med --slow-readers leser
+noen av dem bare litt i sekundet, for å vise at de ikke holder igjen
+tick-løkken. Botene og serveren deler maskinen, så tallene er et øvre
+anslag; kjør gjerne serveren på en egen maskin for nøyaktige tall.
+
+Kjør:
+    python arena_bots.py
+    python arena_bots.py --snakes 100 --seconds 20 --slow-readers 5
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import signal
+import sys
+import time
+
+from arena import FRAME, MSG_SNAPSHOT, MSG_TICK, DEFAULT_TICK_RATE, tick_header
+from arena_server import raise_file_limit
+from profiler import percentile
+
+DEFAULT_SNAKES = (10, 100, 1000)
+DEFAULT_SECONDS = 10.0
+DEFAULT_WARMUP = 2.0
+TURN_CHANCE = 0.2          # Sjanse for å svinge per tick
+CONNECT_CONCURRENCY = 100  # Tilkoblinger som åpnes samtidig
+SLOW_READ_BYTES = 4096     # Byte en treg bot leser per sekund
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arena_server.py")
+
+
+class BotStats:
+    """Det én bot har mottatt siden forrige reset()."""
+    __slots__ = ('bytes', 'ticks', 'snapshots')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.bytes = 0
+        self.ticks = 0
+        self.snapshots = 0
+
+
+class Observer:
+    """Tider for hver tick-melding til én bot."""
+    def __init__(self):
+        self.arrivals = []  # (mottatt, tick, serverens arbeidstid i µs)
+
+    def reset(self):
+        self.arrivals = []
+
+
+async def run_bot(host, port, stats, rng, turn_chance, observer=None):
+    """En bot som leser alle meldinger og svinger tilfeldig."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+            payload = await reader.readexactly(length)
+            stats.bytes += FRAME.size + length
+            if payload[0] == MSG_SNAPSHOT:
+                stats.snapshots += 1
+            elif payload[0] == MSG_TICK:
+                stats.ticks += 1
+                if observer is not None:
+                    observer.arrivals.append((time.perf_counter(), *tick_header(payload)))
+                if rng.random() < turn_chance:
+                    writer.write(bytes((rng.randrange(4),)))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def run_slow_bot(host, port, stats):
+    """En bot som bare leser SLOW_READ_BYTES i sekundet."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            data = await reader.read(SLOW_READ_BYTES)
+            if not data:
+                break
+            stats.bytes += len(data)
+            await asyncio.sleep(1.0)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def arena_size(snakes):
+    """Brettet vokser med antall slanger, så tettheten blir omtrent lik."""
+    return max(40, int(math.sqrt(snakes) * 10))
+
+async def _start_server(cols, rows, tick_rate):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, SERVER_SCRIPT, '--port', '0', '--cols', str(cols), '--rows', str(rows),
+        '--tick-rate', str(tick_rate), '--seed', '1', stdout=asyncio.subprocess.PIPE)
+    line = (await process.stdout.readline()).decode()
+    if not line.startswith("PORT "):
+        process.kill()
+        raise RuntimeError(f"Serveren startet ikke: {line.strip()}")
+    return process, int(line.split()[1])
+
+async def _stop_server(process):
+    """Stopper serveren pent, så den skriver ut statistikken sin. Returnerer den."""
+    if os.name == 'posix':
+        process.send_signal(signal.SIGINT)
+    else:
+        process.terminate()
+    output = (await process.stdout.read()).decode().splitlines()
+    await process.wait()
+    for line in reversed(output):
+        if line.startswith('{'):
+            return json.loads(line)
+    return {}
+
+async def measure(snakes, seconds, warmup, tick_rate, turn_chance, slow_readers, host="127.0.0.1"):
+    """Kjører én lasttest og returnerer resultatene."""
+    cols = rows = arena_size(snakes)
+    process, port = await _start_server(cols, rows, tick_rate)
+    rng = random.Random(snakes)
+    observer = Observer()
+    all_stats = [BotStats() for _ in range(snakes)]
+    slow = min(slow_readers, snakes - 1)
+    tasks = []
+    gate = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def start_bot(i):
+        async with gate:
+            if i < slow:
+                tasks.append(asyncio.ensure_future(run_slow_bot(host, port, all_stats[i])))
+            else:
+                bot_observer = observer if i == slow else None
+                tasks.append(asyncio.ensure_future(run_bot(host, port, all_stats[i], random.Random(rng.random()),
+                                                           turn_chance, bot_observer)))
+            await asyncio.sleep(0)
+
+    try:
+        connect_start = time.perf_counter()
+        await asyncio.gather(*(start_bot(i) for i in range(snakes)))
+        connect_time = time.perf_counter() - connect_start
+        await asyncio.sleep(warmup)
+        for stats in all_stats:
+            stats.reset()
+        observer.reset()
+        start = time.perf_counter()
+        await asyncio.sleep(seconds)
+        elapsed = time.perf_counter() - start
+        received = [(stats.bytes, stats.ticks, stats.snapshots) for stats in all_stats]
+        arrivals = list(observer.arrivals)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        server = await _stop_server(process)
+
+    work = sorted(work_us / 1000.0 for _, _, work_us in arrivals)
+    gaps = sorted((b[0] - a[0]) * 1000.0 for a, b in zip(arrivals, arrivals[1:]))
+    ticks = [ticks for _, ticks, _ in received[slow:]]
+    total_bytes = sum(b for b, _, _ in received)
+    observer_ticks = len(arrivals)
+    return {
+        'snakes': snakes,
+        'slow_readers': slow,
+        'arena': f"{cols}x{rows}",
+        'connect_s': connect_time,
+        'ticks_per_s': observer_ticks / elapsed,
+        'target_ticks_per_s': tick_rate,
+        'work_p50_ms': percentile(work, 0.50),
+        'work_p95_ms': percentile(work, 0.95),
+        'work_p99_ms': percentile(work, 0.99),
+        'interval_p50_ms': percentile(gaps, 0.50),
+        'interval_p99_ms': percentile(gaps, 0.99),
+        'bytes_per_tick_per_client': (received[slow][0] / observer_ticks) if observer_ticks else 0.0,
+        'total_mbit_s': total_bytes * 8 / elapsed / 1e6,
+        'min_ticks_per_bot': min(ticks) if ticks else 0,
+        'resync_snapshots': sum(s for _, _, s in received),
+        'server': server,
+    }
+
+
+async def run_all(args):
+    results = []
+    print(f"{'slanger':>8}{'ticks/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'jitter p99':>12}"
+          f"{'B/tick':>9}{'Mbit/s':>9}{'droppet':>9}")
+    for snakes in args.snakes or DEFAULT_SNAKES:
+        result = await measure(snakes, args.seconds, args.warmup, args.tick_rate, args.turn_chance,
+                               args.slow_readers)
+        results.append(result)
+        print(f"{snakes:>8}{result['ticks_per_s']:>9.1f}{result['work_p50_ms']:>9.2f}"
+              f"{result['work_p99_ms']:>9.2f}{result['interval_p99_ms']:>12.1f}"
+              f"{result['bytes_per_tick_per_client']:>9.0f}{result['total_mbit_s']:>9.1f}"
+              f"{result['server'].get('dropped', 0):>9}")
+    return results
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Lasttest av arena-serveren med boter.")
+    parser.add_argument('--snakes', type=int, action='append',
+                        help="Antall slanger (kan gjentas; standard: 10, 100 og 1000)")
+    parser.add_argument('--seconds', type=float, default=DEFAULT_SECONDS, help="Sekunder som måles")
+    parser.add_argument('--warmup', type=float, default=DEFAULT_WARMUP,
+                        help="Sekunder etter at alle er koblet til før målingen starter")
+    parser.add_argument('--tick-rate', type=int, default=DEFAULT_TICK_RATE)
+    parser.add_argument('--turn-chance', type=float, default=TURN_CHANCE)
+    parser.add_argument('--slow-readers', type=int, default=0,
+                        help="Boter som leser tregt, for å teste mottrykket")
+    parser.add_argument('--output', help="Skriv resultatene til denne JSON-filen")
+    args = parser.parse_args(argv)
+
+    raise_file_limit()
+    results = asyncio.run(run_all(args))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📁 Resultater lagret i '{args.output}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli(sys.argv[1:]))
@@ -0,0 +1,250 @@
+"""
+Arena-server: ett felles brett for mange spillere over TCP med asyncio.
+
+Serveren bestemmer alt (klientene sender bare svinger) og flytter brettet
+i fast takt. Etter hver tick kodes endringene én gang (encode_tick i
+arena.py), og de samme bytene sendes til alle klientene.
+
+Mottrykk per klient: tick-løkken venter aldri på en klient. Hver melding
+legges i transportbufferen til klienten, og hvis bufferen er over
+high_water byte, regnes klienten som etter. Da hoppes tick-meldingene til
+den over (de er verdiløse uten de foregående), og når bufferen har
+kommet under low_water, får klienten et fullt snapshot og fortsetter
+derfra. En klient som ligger etter i mer enn max_lag_ticks, kobles fra.
+
+Kjør:
+    python arena_server.py --port 8765 --cols 200 --rows 200
+    python arena_server.py --port 0    # Ledig port, skrives ut ved start
+
+Se arena_bots.py for lasttest med boter.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import deque
+
+from arena import ArenaEngine, DEFAULT_TICK_RATE, encode_snapshot, encode_tick, snapshot_body
+from engine import MAX_BOARD_SIZE
+from profiler import percentile
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+HIGH_WATER = 256 * 1024  # Byte i kø før klienten regnes som etter
+LOW_WATER = 32 * 1024    # Byte i kø før klienten får snapshot og tas inn igjen
+MAX_LAG_TICKS = 10 * DEFAULT_TICK_RATE
+STATS_WINDOW = 1000      # Ticks i den rullerende statistikken
+
+
+class ArenaClient:
+    """En tilkoblet spiller og tilstanden til køen mot den."""
+    __slots__ = ('snake_id', 'writer', 'transport', 'synced', 'lag_start', 'sent', 'dropped', 'resyncs')
+
+    def __init__(self, snake_id, writer):
+        self.snake_id = snake_id
+        self.writer = writer
+        self.transport = writer.transport
+        self.synced = False   # Har fått snapshot og kan få tick-meldinger
+        self.lag_start = None  # Tick da klienten kom etter
+        self.sent = 0
+        self.dropped = 0
+        self.resyncs = 0
+
+
+class ArenaServer:
+    """Kjører en ArenaEngine i fast takt og sender endringene til klientene."""
+    def __init__(self, arena, high_water=HIGH_WATER, low_water=LOW_WATER, max_lag_ticks=MAX_LAG_TICKS):
+        self.arena = arena
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_lag_ticks = max_lag_ticks
+        self.clients = {}  # snake_id -> ArenaClient
+        self.interval = 1.0 / arena.tick_rate
+        self._server = None
+        self._handlers = set()  # Oppgavene som leser fra klientene
+        self._work_us = 0
+        # Tellere for diagnostikk
+        self.work_times = deque(maxlen=STATS_WINDOW)  # Sekunder per tick (steg, koding og sending)
+        self.late_ticks = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.disconnects = 0
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Begynner å ta imot klienter. Returnerer porten (nyttig med port 0)."""
+        self._server = await asyncio.start_server(self._handle_client, host, port, backlog=1024)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for client in list(self.clients.values()):
+            client.writer.close()
+        # La leserne avslutte selv, i stedet for å bli avbrutt når løkken stopper
+        if self._handlers:
+            await asyncio.wait(self._handlers, timeout=1.0)
+
+    async def _handle_client(self, reader, writer):
+        snake_id = self.arena.add_snake()
+        client = ArenaClient(snake_id, writer)
+        self.clients[snake_id] = client
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while True:
+                data = await reader.read(64)
+                if not data:
+                    break
+                # Bare siste sving før neste tick teller
+                self.arena.turn(snake_id, data[-1] & 3)
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.pop(snake_id, None)
+            self._handlers.discard(handler)
+            self.arena.remove_snake(snake_id)
+            writer.close()
+
+    def _send(self, client, message):
+        try:
+            client.writer.write(message)
+        except (ConnectionError, RuntimeError):
+            return  # Lukket; _handle_client rydder opp
+        client.sent += len(message)
+        self.bytes_sent += len(message)
+
+    def _broadcast(self, message):
+        """Sender tick-meldingen uten å vente på noen klient."""
+        arena = self.arena
+        body = None  # Kodes bare én gang, selv om mange klienter trenger snapshot
+        for client in list(self.clients.values()):
+            queued = client.transport.get_write_buffer_size()
+            if client.lag_start is not None:
+                if queued > self.low_water:
+                    client.dropped += 1
+                    self.dropped += 1
+                    if arena.tick - client.lag_start > self.max_lag_ticks:
+                        self.disconnects += 1
+                        client.transport.abort()
+                    continue
+                client.lag_start = None
+                client.synced = False
+                client.resyncs += 1
+            elif queued > self.high_water:
+                client.lag_start = arena.tick
+                client.dropped += 1
+                self.dropped += 1
+                continue
+            if not client.synced:
+                # Snapshotet er tilstanden etter denne ticken; tick-meldingene fortsetter derfra
+                if body is None:
+                    body = snapshot_body(arena)
+                self._send(client, encode_snapshot(arena, client.snake_id, body))
+                client.synced = True
+            else:
+                self._send(client, message)
+
+    def tick(self):
+        """Én tick: flytt, kode og send. Returnerer arbeidstiden i sekunder."""
+        start = time.perf_counter()
+        delta = self.arena.step()
+        self._broadcast(encode_tick(self.arena.tick, delta, self._work_us))
+        work = time.perf_counter() - start
+        self._work_us = int(work * 1e6)
+        self.work_times.append(work)
+        return work
+
+    async def run(self, duration=None):
+        """Tick-løkken. Går til duration sekunder har gått (eller for alltid)."""
+        loop_start = deadline = time.perf_counter()
+        while duration is None or time.perf_counter() - loop_start < duration:
+            self.tick()
+            deadline += self.interval
+            now = time.perf_counter()
+            if now > deadline:
+                # Ligger vi etter, starter neste tick med en gang, uten å ta igjen
+                if now - deadline > self.interval:
+                    self.late_ticks += 1
+                    deadline = now
+                await asyncio.sleep(0)
+            else:
+                await asyncio.sleep(deadline - now)
+
+    def stats(self):
+        times = sorted(self.work_times)
+        return {
+            "tick": self.arena.tick,
+            "clients": len(self.clients),
+            "work_mean_ms": statistics.fmean(times) * 1000.0 if times else 0.0,
+            "work_p50_ms": percentile(times, 0.50) * 1000.0,
+            "work_p99_ms": percentile(times, 0.99) * 1000.0,
+            "late_ticks": self.late_ticks,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+            "disconnects": self.disconnects,
+        }
+
+
+def raise_file_limit():
+    """Mange klienter trenger mange fildeskriptorer (ikke på Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+async def serve(args):
+    arena = ArenaEngine(args.cols, args.rows, seed=args.seed, tick_rate=args.tick_rate)
+    server = ArenaServer(arena, args.high_water, args.low_water)
+    port = await server.start(args.host, args.port)
+    # Første linje leses av arena_bots.py når porten er 0
+    print(f"PORT {port}", flush=True)
+    print(f"Arena {args.cols}x{args.rows} på {args.host}:{port}, {args.tick_rate} ticks/s", flush=True)
+    try:
+        await server.run(args.duration)
+    finally:
+        await server.close()
+        print(json.dumps(server.stats()), flush=True)
+
+
+def board_size(value):
+    """argparse-type for --cols/--rows: et heltall i 1..MAX_BOARD_SIZE."""
+    size = int(value)
+    if not 1 <= size <= MAX_BOARD_SIZE:
+        raise argparse.ArgumentTypeError(f"må være 1-{MAX_BOARD_SIZE}, ikke {size}")
+    return size
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Arena-server for Neon Snake.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="0 velger en ledig port")
+    parser.add_argument('--cols', type=board_size, default=200)
+    parser.add_argument('--rows', type=board_size, default=200)
+    parser.add_argument('--tick-rate', type=int, default=DEFAULT_TICK_RATE, help="Ticks per sekund")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--high-water', type=int, default=HIGH_WATER,
+                        help="Byte i kø før en klient regnes som etter")
+    parser.add_argument('--low-water', type=int, default=LOW_WATER,
+                        help="Byte i kø før en klient som er etter får snapshot")
+    parser.add_argument('--duration', type=float, help="Stopp etter så mange sekunder")
+    args = parser.parse_args(argv)
+
+    raise_file_limit()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli(sys.argv[1:]))
@@ -0,0 +1,231 @@
+"""
+Vektorisert batch-simulator: N uavhengige Neon Snake-brett i NumPy-arrays.
+
+Samme regler som SnakeEngine i engine.py (bevegelse, vegg- og
+selvkollisjon, FOOD_TYPES med poeng, sjanse og fartsendring, mat som går
+ut på tid og spawner hvert 2. sekund), men alle brettene flyttes med ett
+kall til step(actions). Ferdige spill startes automatisk på nytt.
+
+Krever NumPy.
+
+Eksempel:
+    env = BatchSnakeEngine(1024, seed=42)
+    obs = env.reset()
+    obs, rewards, dones, info = env.step(actions)
+"""
+
+import numpy as np
+
+from engine import (
+    FOOD_TYPES, FOOD_TYPE_NAMES, FOOD_LIFETIME, FOOD_SPAWN_INTERVAL, MAX_FOODS,
+    START_FOODS, START_SPEED, MIN_SPEED, MAX_SPEED, BOARD_COLS, BOARD_ROWS, DIRECTIONS,
+)
+
+# Dødsårsaker i info['cause']
+CAUSE_NONE, CAUSE_WALL, CAUSE_SELF = range(3)
+
+_NEVER = -(1 << 30)  # "Hodet var aldri her"
+
+_DIRECTION_DX = np.array([dx for dx, _ in DIRECTIONS], dtype=np.int32)
+_DIRECTION_DY = np.array([dy for _, dy in DIRECTIONS], dtype=np.int32)
+_FOOD_SCORE = np.array([FOOD_TYPES[name]['score'] for name in FOOD_TYPE_NAMES], dtype=np.int32)
+_FOOD_SPEED_MOD = np.array([FOOD_TYPES[name]['speed_mod'] for name in FOOD_TYPE_NAMES], dtype=np.int32)
+_FOOD_CHANCE_CUMULATIVE = np.cumsum([FOOD_TYPES[name]['chance'] for name in FOOD_TYPE_NAMES])
+
+
+class BatchSnakeEngine:
+    """N Snake-spill som flyttes i takt.
+
+    Slangekroppen lagres uten liste: hver celle husker hvilket flytt hodet
+    sist var der, og cellen er en del av slangen så lenge
+    flytt - besøkt < lengde. Da er både flytt og kollisjonssjekk O(1) per
+    brett, uten å måtte holde styr på halen.
+    """
+    def __init__(self, num_envs, cols=BOARD_COLS, rows=BOARD_ROWS,
+                 spawn_cols=None, spawn_rows=None, seed=None):
+        self.num_envs = num_envs
+        self.cols = cols
+        self.rows = rows
+        # Som i SnakeEngine: siste kolonne/rad holdes fri for mat
+        spawn_cols = cols - 1 if spawn_cols is None else spawn_cols
+        spawn_rows = rows - 1 if spawn_rows is None else spawn_rows
+        spawn_mask = np.zeros((rows, cols), dtype=bool)
+        spawn_mask[:spawn_rows, :spawn_cols] = True
+        self._spawn_mask = spawn_mask.ravel()
+
+        # En egen tilfeldighetsstrøm per brett, så et brett er reproduserbart
+        # uavhengig av hvor mange andre som kjører ved siden av.
+        seeds = np.random.SeedSequence(seed).spawn(num_envs)
+        self.rngs = [np.random.default_rng(s) for s in seeds]
+
+        n = num_envs
+        self.visited = np.full((n, cols * rows), _NEVER, dtype=np.int32)
+        self.head_col = np.zeros(n, dtype=np.int32)
+        self.head_row = np.zeros(n, dtype=np.int32)
+        self.dir_x = np.zeros(n, dtype=np.int32)
+        self.dir_y = np.zeros(n, dtype=np.int32)
+        self.last_x = np.zeros(n, dtype=np.int32)
+        self.last_y = np.zeros(n, dtype=np.int32)
+        self.moves = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        self.length = np.ones(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.speed = np.full(n, START_SPEED, dtype=np.int32)
+        self.last_food_spawn = np.zeros(n, dtype=np.float64)
+        self.food_cell = np.full((n, MAX_FOODS), -1, dtype=np.int32)
+        self.food_type = np.zeros((n, MAX_FOODS), dtype=np.int8)
+        self.food_timer = np.zeros((n, MAX_FOODS), dtype=np.float64)
+        self.episodes = np.zeros(n, dtype=np.int64)
+        self._rows = np.arange(n)
+        self.reset()
+
+    # --- Tilbakestilling og spawning ---
+
+    def reset(self, env_ids=None):
+        """Starter nye spill på de gitte brettene (alle hvis None)."""
+        if env_ids is None:
+            env_ids = self._rows
+        env_ids = np.asarray(env_ids)
+        head_col, head_row = self.cols // 2, self.rows // 2
+        self.visited[env_ids] = _NEVER
+        self.visited[env_ids, head_row * self.cols + head_col] = 0
+        self.head_col[env_ids] = head_col
+        self.head_row[env_ids] = head_row
+        for arr in (self.dir_x, self.dir_y, self.last_x, self.last_y, self.moves,
+                    self.ticks, self.score, self.last_food_spawn):
+            arr[env_ids] = 0
+        self.length[env_ids] = 1
+        self.speed[env_ids] = START_SPEED
+        self.food_cell[env_ids] = -1
+        for env in env_ids.tolist():
+            for _ in range(START_FOODS):
+                self._spawn_food(env)
+        return self.observation()
+
+    def _body_mask(self, env):
+        return self.moves[env] - self.visited[env] < self.length[env]
+
+    def _spawn_food(self, env):
+        """Spawn mat på en uniformt tilfeldig ledig celle i ett brett."""
+        slots = np.flatnonzero(self.food_cell[env] < 0)
+        rng = self.rngs[env]
+        # Velg mattype basert på sannsynlighet (samme trekk som i engine.py)
+        food_type = int(np.searchsorted(_FOOD_CHANCE_CUMULATIVE, rng.integers(1, 101)))
+        if not slots.size:
+            return
+        free = self._spawn_mask & ~self._body_mask(env)
+        foods = self.food_cell[env]
+        free[foods[foods >= 0]] = False
+        free_cells = np.flatnonzero(free)
+        if not free_cells.size:
+            return  # Brettet er fullt
+        slot = slots[0]
+        self.food_cell[env, slot] = free_cells[rng.integers(free_cells.size)]
+        self.food_type[env, slot] = food_type
+        self.food_timer[env, slot] = FOOD_LIFETIME
+
+    # --- Simulering ---
+
+    def step(self, actions):
+        """Ett flytt på alle brett.
+
+        actions er N heltall: UP/RIGHT/DOWN/LEFT fra engine.py, eller -1 for
+        å fortsette rett fram. Returnerer (observasjon, belønning, ferdig, info)
+        der belønningen er poengene dette steget. Brett som ble ferdige
+        startes på nytt før observasjonen lages; sluttresultatet ligger i
+        info['final_score'], info['final_length'] og info['cause'].
+        """
+        actions = np.asarray(actions, dtype=np.int32)
+        rows = self._rows
+
+        # Bytt retning, men ikke rett bakover
+        turning = actions >= 0
+        safe_actions = np.where(turning, actions, 0)
+        dx = _DIRECTION_DX[safe_actions]
+        dy = _DIRECTION_DY[safe_actions]
+        reverse = ((dx != 0) & (self.last_x != 0)) | ((dy != 0) & (self.last_y != 0))
+        turning &= ~reverse
+        self.dir_x = np.where(turning, dx, self.dir_x)
+        self.dir_y = np.where(turning, dy, self.dir_y)
+
+        # La tiden gå 1/speed sekunder: mat går ut på tid og ny mat spawnes
+        dt = 1.0 / self.speed
+        has_food = self.food_cell >= 0
+        self.food_timer -= dt[:, None]
+        expired = has_food & (self.food_timer <= 0)
+        self.food_cell[expired] = -1
+        self.last_food_spawn += dt
+        food_count = (self.food_cell >= 0).sum(axis=1)
+        spawning = (self.last_food_spawn >= FOOD_SPAWN_INTERVAL) & (food_count < MAX_FOODS)
+        for env in np.flatnonzero(spawning).tolist():
+            self._spawn_food(env)
+        self.last_food_spawn[spawning] = 0.0
+
+        # Flytt slangene som har en retning
+        self.ticks += 1
+        self.last_x = self.dir_x.copy()
+        self.last_y = self.dir_y.copy()
+        moving = (self.dir_x != 0) | (self.dir_y != 0)
+        new_col = self.head_col + self.dir_x
+        new_row = self.head_row + self.dir_y
+        hit_wall = moving & ((new_col < 0) | (new_col >= self.cols) | (new_row < 0) | (new_row >= self.rows))
+        advancing = moving & ~hit_wall
+        self.moves += advancing
+        new_cell = np.where(advancing, new_row * self.cols + new_col, 0)
+        # Halen har allerede flyttet seg når hodet kommer fram
+        hit_self = advancing & (self.moves - self.visited[rows, new_cell] < self.length)
+        self.head_col = np.where(advancing, new_col, self.head_col)
+        self.head_row = np.where(advancing, new_row, self.head_row)
+        self.visited[rows[advancing], new_cell[advancing]] = self.moves[advancing]
+
+        # Spis mat
+        eaten_slots = advancing[:, None] & (self.food_cell == new_cell[:, None])
+        eaten = eaten_slots.any(axis=1)
+        eaten_slot = eaten_slots.argmax(axis=1)
+        eaten_type = self.food_type[rows, eaten_slot].astype(np.int32)
+        rewards = np.where(eaten, _FOOD_SCORE[eaten_type], 0)
+        self.score += rewards
+        self.speed = np.where(eaten, np.clip(self.speed + _FOOD_SPEED_MOD[eaten_type], MIN_SPEED, MAX_SPEED),
+                              self.speed)
+        self.length += eaten
+        self.food_cell[rows[eaten], eaten_slot[eaten]] = -1
+
+        dones = hit_wall | hit_self
+        info = {
+            'eaten': np.where(eaten, eaten_type, -1),
+            'expired': expired.sum(axis=1),
+            'cause': np.where(hit_wall, CAUSE_WALL, np.where(hit_self, CAUSE_SELF, CAUSE_NONE)),
+            'final_score': np.where(dones, self.score, 0),
+            'final_length': np.where(dones, self.length, 0),
+            'final_ticks': np.where(dones, self.ticks, 0),
+        }
+        if dones.any():
+            finished = np.flatnonzero(dones)
+            self.episodes[finished] += 1
+            self.reset(finished)
+        return self.observation(), rewards, dones, info
+
+    # --- Observasjoner ---
+
+    def observation(self):
+        """Kompakt tilstand for alle brett som dict av arrays (kopier)."""
+        return {
+            'head_col': self.head_col.copy(),
+            'head_row': self.head_row.copy(),
+            'dir_x': self.dir_x.copy(),
+            'dir_y': self.dir_y.copy(),
+            'length': self.length.copy(),
+            'score': self.score.copy(),
+            'speed': self.speed.copy(),
+            'food_cell': self.food_cell.copy(),
+            'food_type': self.food_type.copy(),
+            'food_timer': self.food_timer.copy(),
+        }
+
+    def boards(self):
+        """Alle brett som (N, rader, kolonner) uint8, kodet som SnakeEngine.board()."""
+        cells = (self.moves[:, None] - self.visited < self.length[:, None]).astype(np.uint8)
+        cells[self._rows, self.head_row * self.cols + self.head_col] = 2
+        env_ids, slots = np.nonzero(self.food_cell >= 0)
+        cells[env_ids, self.food_cell[env_ids, slots]] = 3 + self.food_type[env_ids, slots]
+        return cells.reshape(self.num_envs, self.rows, self.cols)
@@ -0,0 +1,287 @@
+"""
+Benchmark av tegning og spillogikk uten skjerm, med baseline for regresjoner.
+
+Kjører SnakeGame under SDL_VIDEODRIVER=dummy gjennom faste scenarier uten
+menneskelig input, og måler frames per sekund og p50/p95/p99 per frame.
+Klokken byttes ut med en som ikke venter, så målingen viser hvor lang tid
+selve framen tar, ikke 60 FPS-grensen.
+
+Kjør:
+    python benchmark.py --save-baseline          # Lagre ny baseline
+    python benchmark.py                          # Sammenlign med baseline
+    python benchmark.py --threshold 0.2 --scenario long_snake
+    python benchmark.py --quality low            # Mål et lavere kvalitetsnivå
+    python benchmark.py --backend texture --driver software
+
+Avslutter med kode 1 hvis et scenario er tregere enn baseline (p50 per
+frame) med mer enn terskelen. Kvalitetsnivået låses (standard 'high'), så
+målingene ikke påvirkes av at spillet skrur ned effektene selv.
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import pygame
+
+import main
+from engine import SnakeEngine, MAX_FOODS, UP, RIGHT, DOWN, LEFT
+from profiler import percentile
+from quality import QUALITY_TIERS
+from render_backend import BACKENDS
+from tournament import greedy_policy
+
+DEFAULT_FRAMES = 600
+DEFAULT_WARMUP = 30
+DEFAULT_THRESHOLD = 0.10  # Tillatt økning i p50 per frame (10 %)
+DEFAULT_BASELINE = "benchmark_baseline.json"
+LONG_SNAKE_LENGTH = 500
+ENDURANCE_WORLD = (1000, 1000)
+ENDURANCE_SNAKE_LENGTH = 20000
+
+
+class FixedClock:
+    """Erstatter pygame-klokken: et fast tidssteg per frame, uten å vente."""
+    def tick(self, framerate=0):
+        return 1000.0 / (framerate or main.RENDER_FPS)
+
+
+def _cycle_action(engine):
+    """Retningen som følger en lukket sti gjennom hele brettet (krever partall rader).
+
+    Kolonne 0 er veien tilbake opp; resten av brettet gås i slangelinjer.
+    Slangen kan da bli lang uten å krasje.
+    """
+    col, row = engine.snake[0]
+    cols, rows = engine.grid.cols, engine.grid.rows
+    if col == 0:
+        return RIGHT if row == 0 else UP
+    if row % 2 == 0:
+        return RIGHT if col < cols - 1 else DOWN
+    if col > 1 or row == rows - 1:
+        return LEFT
+    return DOWN
+
+
+# --- SCENARIER ---
+# Hvert scenario setter opp spillet og returnerer en funksjon som kjører én frame.
+
+def scenario_empty_board(game):
+    """Nytt spill der slangen står stille: bakgrunn, mat, slangehode og HUD."""
+    return game.play_step
+
+def _grow_along_cycle(engine, length):
+    engine.length = length
+    while len(engine.snake) < length:
+        engine.turn(_cycle_action(engine))
+        engine.move()
+
+def scenario_long_snake(game):
+    """En slange på minst 500 segmenter som går rundt hele brettet."""
+    engine = game.engine
+    _grow_along_cycle(engine, LONG_SNAKE_LENGTH)
+
+    def frame():
+        # Ett flytt per frame på det meste (MAX_SPEED < RENDER_FPS)
+        engine.turn(_cycle_action(engine))
+        game.play_step()
+    return frame
+
+def scenario_endurance_world(game):
+    """Verden på 1000x1000 celler med en slange på 20 000 segmenter og kamera."""
+    engine = game.engine
+    _grow_along_cycle(engine, ENDURANCE_SNAKE_LENGTH)
+    game.camera.center_on(*engine.snake[0])
+
+    def frame():
+        engine.turn(_cycle_action(engine))
+        game.play_step()
+    return frame
+
+def scenario_foods_particles(game):
+    """Fullt med mat (MAX_FOODS) og partikkelsystemet fylt til kapasiteten hver frame."""
+    engine = game.engine
+    particles = game.particles
+    rng = random.Random(1)
+    colors = [data['color'] for data in main.FOOD_TYPES.values()]
+
+    def frame():
+        while len(engine.foods) < MAX_FOODS and engine.spawn_food():
+            pass
+        missing = particles.capacity - len(particles)
+        if missing:
+            particles.emit(main.SCREEN_WIDTH / 2, main.SCREEN_HEIGHT / 2, rng.choice(colors), missing, rng=rng)
+        game.play_step()
+    return frame
+
+def scenario_name_input(game):
+    """Navneskjermen med et navn skrevet inn."""
+    def frame():
+        main.draw_name_input("Benchmark")
+        main.backend.present_screen()
+    return frame
+
+def scenario_game_over(game):
+    """Game over-skjermen med en full side av highscore-listen."""
+    game.highscores = [{"name": f"Spiller {i}", "score": 1000 - i * 37} for i in range(main.LEADERBOARD_PAGE_SIZE)]
+
+    def frame():
+        game.draw_game_over(page=0, rank=4, total=1234)
+        main.backend.present_screen()
+    return frame
+
+def scenario_engine_logic(game):
+    """Bare spillogikken: ett SnakeEngine-steg med greedy-policyen per 'frame'."""
+    engine = SnakeEngine(seed=1)
+    rng = random.Random(1)
+
+    def frame():
+        _, _, done, _ = engine.step(greedy_policy(engine, rng))
+        if done:
+            engine.reset(rng.randrange(1 << 30))
+    return frame
+
+# Scenarier som trenger en annen verden enn standardbrettet
+SCENARIO_WORLDS = {
+    'endurance_world': ENDURANCE_WORLD,
+}
+
+SCENARIOS = {
+    'empty_board': scenario_empty_board,
+    'long_snake': scenario_long_snake,
+    'endurance_world': scenario_endurance_world,
+    'foods_particles': scenario_foods_particles,
+    'name_input': scenario_name_input,
+    'game_over': scenario_game_over,
+    'engine_logic': scenario_engine_logic,
+}
+
+# --- KJØRING ---
+
+def use_scratch_leaderboard():
+    """Gir spillet en tom leaderboard i minnet, så benchmarken ikke rører leaderboard.db."""
+    main.LEADERBOARD_FILE = ":memory:"
+    main.leaderboard = None
+    main._leaderboard_opened = False
+    main._top_page = None
+
+def run_scenario(name, frames=DEFAULT_FRAMES, warmup=DEFAULT_WARMUP, quality='high'):
+    """Kjører ett scenario og returnerer FPS og tid per frame (ms)."""
+    main.clock = FixedClock()
+    use_scratch_leaderboard()
+    game = main.SnakeGame(*SCENARIO_WORLDS.get(name, (main.WORLD_COLS, main.WORLD_ROWS)))
+    game.quality.set_tier(quality)
+    game.apply_quality()
+    game.reset_game(seed=1)
+    frame = SCENARIOS[name](game)
+    for _ in range(warmup):
+        frame()
+
+    times = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for _ in range(frames):
+        t = perf_counter()
+        frame()
+        times.append(perf_counter() - t)
+    wall = perf_counter() - start
+    if game.game_close:
+        raise RuntimeError(f"Scenario '{name}' endte med game over")
+
+    times.sort()
+    return {
+        'frames': frames,
+        'fps': frames / wall,
+        'mean_ms': statistics.fmean(times) * 1000.0,
+        'p50_ms': percentile(times, 0.50) * 1000.0,
+        'p95_ms': percentile(times, 0.95) * 1000.0,
+        'p99_ms': percentile(times, 0.99) * 1000.0,
+    }
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Sammenligner med baseline. Returnerer liste av (scenario, endring, regresjon)."""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        change = result['p50_ms'] / base['p50_ms'] - 1.0 if base['p50_ms'] else 0.0
+        rows.append((name, change, change > threshold))
+    return rows
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'video_driver': os.environ.get("SDL_VIDEODRIVER"),
+    }
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark av Neon Snake uten skjerm.")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario som skal kjøres (kan gjentas; standard: alle)")
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help="Målte frames per scenario")
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help="Frames som kjøres før målingen")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="JSON-fil med baseline")
+    parser.add_argument('--save-baseline', action='store_true', help="Lagre resultatene som ny baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Tillatt økning i p50 per frame før det regnes som regresjon (0.1 = 10 %%)")
+    parser.add_argument('--quality', default='high', choices=[tier['name'] for tier in QUALITY_TIERS],
+                        help="Kvalitetsnivå som brukes under målingen (standard: high)")
+    parser.add_argument('--backend', default='surface', choices=BACKENDS,
+                        help="Render-backend som måles (standard: surface)")
+    parser.add_argument('--driver', help="SDL-renderdriver for --backend texture (f.eks. software)")
+    parser.add_argument('--output', help="Skriv resultatene til denne JSON-filen")
+    args = parser.parse_args(argv)
+
+    main.use_backend(args.backend, args.driver)
+    names = args.scenario or list(SCENARIOS)
+    results = {}
+    print(f"{'scenario':<16}{'fps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in names:
+        result = run_scenario(name, args.frames, args.warmup, args.quality)
+        results[name] = result
+        print(f"{name:<16}{result['fps']:>10.0f}{result['p50_ms']:>10.3f}"
+              f"{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+
+    report = {'environment': environment(), 'quality': args.quality,
+              'backend': main.backend.name, 'driver': args.driver, 'scenarios': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📁 Baseline lagret i '{args.baseline}'")
+        return 0
+
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"\nIngen baseline i '{args.baseline}' (lag en med --save-baseline)")
+        return 0
+
+    regressions = 0
+    print(f"\nMot baseline (terskel {args.threshold:.0%} på p50):")
+    for name, change, regressed in compare(results, baseline, args.threshold):
+        marker = "❌" if regressed else "✅"
+        print(f"  {marker} {name:<16}{change:+.1%}")
+        regressions += regressed
+    if baseline.get('environment') != report['environment']:
+        print("  (baseline ble laget i et annet miljø; sammenlign med forsiktighet)")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli(sys.argv[1:]))
@@ -0,0 +1,461 @@
+"""
+Spillreglene for Neon Snake uten pygame.
+
+SnakeEngine inneholder hele simuleringen (bevegelse, kollisjoner, mat,
+poeng og fart) og kan kjøres uten skjerm, f.eks. for boter og
+balansetesting. main.py tegner og tar imot input oppå denne.
+"""
+
+import random
+from array import array
+
+# Mat-typer og egenskaper
+FOOD_TYPES = {
+    'normal': {'color': (255, 80, 80),   'glow': (255, 120, 120), 'score': 10, 'chance': 70, 'speed_mod': 0},  # Rød
+    'gold':   {'color': (255, 215, 0),   'glow': (255, 255, 150), 'score': 50, 'chance': 10, 'speed_mod': 0},  # Gull
+    'speed':  {'color': (0, 255, 255),   'glow': (100, 255, 255), 'score': 20, 'chance': 10, 'speed_mod': 2},  # Cyan (Raskere)
+    'slow':   {'color': (180, 80, 255),  'glow': (220, 120, 255), 'score': 10, 'chance': 10, 'speed_mod': -2}, # Lilla (Tregere)
+}
+FOOD_TYPE_NAMES = tuple(FOOD_TYPES)
+
+# Brettet (40x30 celler som i vinduet på 800x600 med 20 px blokker)
+BOARD_COLS = 40
+BOARD_ROWS = 30
+MAX_BOARD_SIZE = 0x7FFF  # SnakeBody lagrer koordinatene som int16
+
+# Regler
+FOOD_LIFETIME = 5.0        # Sekunder før maten forsvinner
+FOOD_SPAWN_INTERVAL = 2.0  # Spawn ny mat hver 2. sekund
+MAX_FOODS = 5
+START_FOODS = 2
+START_SPEED = 15           # Flytt per sekund
+MIN_SPEED = 5
+MAX_SPEED = 40
+
+# Retninger som (dx, dy) i celler; handlingene i step() er indekser hit
+UP, RIGHT, DOWN, LEFT = range(4)
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+def choose_food_type(rng):
+    """Trekker en mattype etter sjansene i FOOD_TYPES."""
+    rand_val = rng.randint(1, 100)
+    cumulative = 0
+    for f_type, data in FOOD_TYPES.items():
+        cumulative += data['chance']
+        if rand_val <= cumulative:
+            return f_type
+    return 'normal'
+
+class OccupancyGrid:
+    """Belegg-rutenett for slange og mat, indeksert per celle.
+
+    Slangen telles i en bytearray (tåler overlapp i kollisjonsøyeblikket),
+    mat slås opp i en dict, og frie celler ligger i en liste med
+    swap-remove slik at både oppslag, oppdatering og tilfeldig plassering
+    av mat er O(1) uansett hvor lang slangen er.
+    """
+    def __init__(self, cols, rows, spawn_cols=None, spawn_rows=None):
+        self.cols = cols
+        self.rows = rows
+        # Maten kan bare plasseres innenfor spawn-området
+        self.spawn_cols = cols if spawn_cols is None else spawn_cols
+        self.spawn_rows = rows if spawn_rows is None else spawn_rows
+        self.reset()
+
+    def reset(self):
+        """Tømmer rutenettet."""
+        cols, spawn_cols = self.cols, self.spawn_cols
+        size = cols * self.rows
+        self.snake = bytearray(size)
+        self.foods = {}
+        # Bygges rad for rad med array-slicing, så store brett nullstilles raskt
+        self._free = array('i')
+        self._free_pos = array('i', [-1]) * size
+        for row in range(self.spawn_rows):
+            self._free.extend(range(row * cols, row * cols + spawn_cols))
+            self._free_pos[row * cols:row * cols + spawn_cols] = array(
+                'i', range(row * spawn_cols, (row + 1) * spawn_cols))
+
+    def cell_at(self, col, row):
+        """Gjør om kolonne/rad til celleindeks, eller -1 utenfor brettet."""
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return row * self.cols + col
+        return -1
+
+    def position_of(self, cell):
+        """Gjør om celleindeks til (kolonne, rad)."""
+        row, col = divmod(cell, self.cols)
+        return col, row
+
+    def is_free(self, cell):
+        return self.snake[cell] == 0 and cell not in self.foods
+
+    def _take(self, cell):
+        pos = self._free_pos[cell]
+        if pos < 0:
+            return
+        last = self._free.pop()
+        if last != cell:
+            self._free[pos] = last
+            self._free_pos[last] = pos
+        self._free_pos[cell] = -1
+
+    def _release(self, cell):
+        if not self.is_free(cell) or self._free_pos[cell] >= 0:
+            return
+        row, col = divmod(cell, self.cols)
+        if col < self.spawn_cols and row < self.spawn_rows:
+            self._free_pos[cell] = len(self._free)
+            self._free.append(cell)
+
+    def has_snake(self, cell):
+        return cell >= 0 and self.snake[cell] > 0
+
+    def add_snake(self, cell):
+        if cell < 0:
+            return
+        self.snake[cell] += 1
+        self._take(cell)
+
+    def remove_snake(self, cell):
+        if cell < 0 or self.snake[cell] == 0:
+            return
+        self.snake[cell] -= 1
+        self._release(cell)
+
+    def food_at(self, cell):
+        return self.foods.get(cell) if cell >= 0 else None
+
+    def add_food(self, cell, food):
+        self.foods[cell] = food
+        self._take(cell)
+
+    def remove_food(self, cell):
+        if self.foods.pop(cell, None) is not None:
+            self._release(cell)
+
+    def snake_cells_in(self, first_col, first_row, last_col, last_row):
+        """Cellene med slange i et rektangel (inklusive kantene), som (kolonne, rad).
+
+        Kostnaden følger størrelsen på rektangelet, ikke lengden på slangen;
+        rader uten slange hoppes over med ett C-kall.
+        """
+        first_col = max(0, first_col)
+        first_row = max(0, first_row)
+        last_col = min(self.cols - 1, last_col)
+        last_row = min(self.rows - 1, last_row)
+        if first_col > last_col:
+            return
+        snake, cols = self.snake, self.cols
+        width = last_col - first_col + 1
+        for row in range(first_row, last_row + 1):
+            start = row * cols + first_col
+            cells = snake[start:start + width]
+            if cells.count(0) == width:
+                continue
+            for offset, count in enumerate(cells):
+                if count:
+                    yield first_col + offset, row
+
+    def free_count(self):
+        return len(self._free)
+
+    def random_free_cell(self, rng=random):
+        """Trekker en uniformt tilfeldig ledig celle, eller None hvis alt er fullt."""
+        if not self._free:
+            return None
+        return self._free[rng.randrange(len(self._free))]
+
+class SnakeBody:
+    """Slangekroppen som ringbuffer av heltalls celle-koordinater.
+
+    Kapasiteten er fast, så push_head og pop_tail er O(1) uten at noe
+    flyttes. Iterasjon og indeksering går fra hodet (indeks 0) mot halen.
+    """
+    __slots__ = ('capacity', '_cols', '_rows', '_start', '_length')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._cols = array('h', bytes(2 * capacity))
+        self._rows = array('h', bytes(2 * capacity))
+        self._start = 0   # Indeks til halen
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def clear(self):
+        self._start = 0
+        self._length = 0
+
+    def push_head(self, col, row):
+        """Legger til et nytt hode."""
+        if self._length == self.capacity:
+            raise IndexError("slangekroppen er full")
+        i = (self._start + self._length) % self.capacity
+        self._cols[i] = col
+        self._rows[i] = row
+        self._length += 1
+
+    def pop_tail(self):
+        """Fjerner og returnerer halen som (kolonne, rad)."""
+        if not self._length:
+            raise IndexError("slangekroppen er tom")
+        i = self._start
+        self._start = (i + 1) % self.capacity
+        self._length -= 1
+        return self._cols[i], self._rows[i]
+
+    def head(self):
+        return self[0]
+
+    def tail(self):
+        return self[-1]
+
+    def __getitem__(self, index):
+        """Segment nummer index regnet fra hodet (negative teller fra halen)."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("segmentindeks utenfor slangen")
+        i = (self._start + self._length - 1 - index) % self.capacity
+        return self._cols[i], self._rows[i]
+
+    def to_arrays(self):
+        """Kopi av segmentene som (kolonner, rader), fra halen til hodet."""
+        end = self._start + self._length
+        if end <= self.capacity:
+            return self._cols[self._start:end], self._rows[self._start:end]
+        end -= self.capacity
+        return (self._cols[self._start:] + self._cols[:end],
+                self._rows[self._start:] + self._rows[:end])
+
+    def load_arrays(self, cols, rows):
+        """Erstatter kroppen med segmentene fra to_arrays()."""
+        if len(cols) > self.capacity:
+            raise IndexError("slangekroppen er full")
+        self._cols[:len(cols)] = cols
+        self._rows[:len(rows)] = rows
+        self._start = 0
+        self._length = len(cols)
+
+    def __iter__(self):
+        """Går fra hodet til halen."""
+        cols, rows, capacity = self._cols, self._rows, self.capacity
+        i = (self._start + self._length - 1) % capacity
+        for _ in range(self._length):
+            yield cols[i], rows[i]
+            i = i - 1 if i else capacity - 1
+
+class Food:
+    """Mat på brettet: celle, type og gjenværende tid."""
+    __slots__ = ('col', 'row', 'food_type', 'timer')
+
+    def __init__(self, col, row, food_type, timer=FOOD_LIFETIME):
+        self.col = col
+        self.row = row
+        self.food_type = food_type
+        self.timer = timer
+
+    def update(self, dt):
+        """Teller ned timeren. Returnerer False når maten har gått ut på tid."""
+        self.timer -= dt
+        return self.timer > 0
+
+class SnakeEngine:
+    """Spillreglene for ett brett, uten tegning og uten sanntid.
+
+    Bruk enten step() (ett flytt pluss tiden det tar, som for boter) eller
+    turn()/move()/advance() hver for seg når tiden styres utenfra.
+    """
+    def __init__(self, cols=BOARD_COLS, rows=BOARD_ROWS, spawn_cols=None, spawn_rows=None, seed=None):
+        if not (1 <= cols <= MAX_BOARD_SIZE and 1 <= rows <= MAX_BOARD_SIZE):
+            raise ValueError(f"Brettet må være 1-{MAX_BOARD_SIZE} celler i hver retning, ikke {cols}x{rows}")
+        # Maten plasseres ikke i siste kolonne/rad (timer-baren må synes)
+        spawn_cols = cols - 1 if spawn_cols is None else spawn_cols
+        spawn_rows = rows - 1 if spawn_rows is None else spawn_rows
+        self.grid = OccupancyGrid(cols, rows, spawn_cols, spawn_rows)
+        self.snake = SnakeBody(cols * rows + 1)
+        self.rng = random.Random()
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Starter et nytt spill og returnerer første observasjon."""
+        self.rng.seed(seed)
+        self.grid.reset()
+        self.snake.clear()
+        self.foods = []
+        self.direction = (0, 0)  # Står stille til første input
+        self._last_move = (0, 0)
+        self.length = 1
+        self.speed = START_SPEED
+        self.score = 0
+        self.ticks = 0
+        self.time = 0.0
+        self.last_food_spawn = 0.0
+        self.done = False
+        self.cause = None  # 'wall' eller 'self' når spillet er over
+        self.vacated = None  # Halecellen som ble frigjort i siste flytt
+        self.spawned = None  # Maten som ble spawnet i siste advance()
+        
+        head_col, head_row = self.grid.cols // 2, self.grid.rows // 2
+        self.snake.push_head(head_col, head_row)
+        self.grid.add_snake(self.grid.cell_at(head_col, head_row))
+        for _ in range(START_FOODS):
+            self.spawn_food()
+        return self.observation()
+
+    def turn(self, action):
+        """Bytter retning. Snu rett bakover (mot siste flytt) ignoreres."""
+        dx, dy = DIRECTIONS[action]
+        last_dx, last_dy = self._last_move
+        if (dx and last_dx) or (dy and last_dy):
+            return False
+        self.direction = (dx, dy)
+        return True
+
+    def spawn_food(self):
+        """Spawn en ny mat på en tilfeldig ledig celle."""
+        selected_type = choose_food_type(self.rng)
+        cell = self.grid.random_free_cell(self.rng)
+        if cell is None:
+            return None  # Brettet er fullt
+        col, row = self.grid.position_of(cell)
+        food = Food(col, row, selected_type)
+        self.grid.add_food(cell, food)
+        self.foods.append(food)
+        return food
+
+    def move(self):
+        """Flytter slangen ett steg. Returnerer maten som ble spist, eller None."""
+        if self.done:
+            return None
+        self.ticks += 1
+        self.vacated = None
+        dx, dy = self.direction
+        self._last_move = self.direction
+        if dx == 0 and dy == 0:
+            return None
+        
+        head_col, head_row = self.snake[0]
+        head_col += dx
+        head_row += dy
+        head_cell = self.grid.cell_at(head_col, head_row)
+        if head_cell < 0:
+            self.done = True
+            self.cause = 'wall'
+            return None
+        
+        self.snake.push_head(head_col, head_row)
+        if len(self.snake) > self.length:
+            self.vacated = self.snake.pop_tail()
+            self.grid.remove_snake(self.grid.cell_at(*self.vacated))
+        
+        # Sjekk kollisjon med seg selv (O(1) oppslag i rutenettet)
+        if self.grid.has_snake(head_cell):
+            self.done = True
+            self.cause = 'self'
+        self.grid.add_snake(head_cell)
+        
+        # Sjekk om slangen spiser mat
+        eaten = self.grid.food_at(head_cell)
+        if eaten:
+            props = FOOD_TYPES[eaten.food_type]
+            self.score += props['score']
+            # Sikre at farten ikke blir for lav eller ekstremt høy
+            self.speed = max(MIN_SPEED, min(self.speed + props['speed_mod'], MAX_SPEED))
+            self.foods.remove(eaten)
+            self.grid.remove_food(head_cell)
+            self.length += 1
+        return eaten
+
+    def advance(self, dt):
+        """Lar dt sekunder gå: mat går ut på tid og ny mat spawnes.
+
+        Returnerer antall mat-objekter som gikk ut på tid.
+        """
+        self.time += dt
+        self.spawned = None
+        alive_foods = []
+        for food in self.foods:
+            if food.update(dt):
+                alive_foods.append(food)
+            else:
+                self.grid.remove_food(self.grid.cell_at(food.col, food.row))
+        expired = len(self.foods) - len(alive_foods)
+        self.foods = alive_foods
+        
+        # Spawn ny mat med jevne mellomrom
+        self.last_food_spawn += dt
+        if self.last_food_spawn >= FOOD_SPAWN_INTERVAL and len(self.foods) < MAX_FOODS:
+            self.spawned = self.spawn_food()
+            self.last_food_spawn = 0.0
+        return expired
+
+    def step(self, action=None):
+        """Ett flytt med valgfri ny retning (UP/RIGHT/DOWN/LEFT eller None).
+
+        Tiden går 1/speed sekunder per steg, akkurat som når spillet kjøres
+        i sanntid. Returnerer (observasjon, belønning, ferdig, info) der
+        belønningen er poengene dette steget.
+        """
+        if action is not None:
+            self.turn(action)
+        score_before = self.score
+        expired = self.advance(1.0 / self.speed)
+        eaten = self.move()
+        info = {
+            'ticks': self.ticks,
+            'eaten': eaten.food_type if eaten else None,
+            'expired': expired,
+            'cause': self.cause,
+        }
+        return self.observation(), self.score - score_before, self.done, info
+
+    def snapshot(self):
+        """Hele spilltilstanden som en kompakt tuple, for restore().
+
+        Rutenettet lagres ikke (det bygges fra slangen og maten), og heller
+        ikke tilstanden til RNG-en: et spill som gjenopprettes ser likt ut,
+        men ny mat kan havne andre steder enn første gang.
+        """
+        cols, rows = self.snake.to_arrays()
+        foods = tuple((f.col, f.row, f.food_type, f.timer) for f in self.foods)
+        return (cols, rows, foods, self.direction, self._last_move, self.length, self.speed,
+                self.score, self.ticks, self.time, self.last_food_spawn, self.done, self.cause)
+
+    def restore(self, snapshot):
+        """Setter tilstanden tilbake til et snapshot() fra samme brett."""
+        (cols, rows, foods, self.direction, self._last_move, self.length, self.speed,
+         self.score, self.ticks, self.time, self.last_food_spawn, self.done, self.cause) = snapshot
+        grid = self.grid
+        grid.reset()
+        self.snake.load_arrays(cols, rows)
+        for col, row in zip(cols, rows):
+            grid.add_snake(grid.cell_at(col, row))
+        self.foods = []
+        for col, row, food_type, timer in foods:
+            food = Food(col, row, food_type, timer)
+            grid.add_food(grid.cell_at(col, row), food)
+            self.foods.append(food)
+        self.vacated = None
+        self.spawned = None
+
+    def observation(self):
+        """Kompakt tilstand: hode, retning, lengde, poeng, fart og maten.
+
+        Maten er (kolonne, rad, typeindeks i FOOD_TYPE_NAMES, gjenværende tid).
+        """
+        head_col, head_row = self.snake[0]
+        foods = tuple((f.col, f.row, FOOD_TYPE_NAMES.index(f.food_type), f.timer) for f in self.foods)
+        return (head_col, head_row, self.direction, len(self.snake), self.score, self.speed, foods)
+
+    def board(self):
+        """Hele brettet som bytearray: 0 tom, 1 kropp, 2 hode, 3 + typeindeks for mat."""
+        cells = bytearray(min(count, 1) for count in self.grid.snake)
+        head = self.grid.cell_at(*self.snake[0])
+        if head >= 0:
+            cells[head] = 2
+        for cell, food in self.grid.foods.items():
+            cells[cell] = 3 + FOOD_TYPE_NAMES.index(food.food_type)
+        return cells
@@ -0,0 +1,98 @@
+"""
+Frame-takt med asyncio i stedet for blokkerende clock.tick().
+
+I stedet for å blokkere tråden til neste frame (som clock.tick gjør),
+venter FrameScheduler med asyncio.sleep til fristen for neste frame. I
+nettleseren (pygbag) får nettleseren da tråden tilbake mens vi venter, og
+på desktop bruker spillet ikke CPU mellom framene.
+
+Skjermer uten animasjon (navn og game over) tegnes bare når noe endrer
+seg, og venter med wait_events() til det kommer en hendelse eller en
+timer (f.eks. blinkende cursor) går ut. pygame har ingen asynkron
+event.wait(), og hendelser må leses i hovedtråden, så køen sjekkes med
+et fast intervall; mellom sjekkene sover løkken.
+
+Eksempel:
+    scheduler = FrameScheduler(60)
+    while True:
+        dt = await scheduler.next_frame()
+        ...
+"""
+
+import asyncio
+import time
+
+import pygame
+
+
+class FrameScheduler:
+    """Venter asynkront til neste frame-frist og måler tiden mellom framene."""
+    def __init__(self, fps=60, poll_interval=None):
+        self.interval = 1.0 / fps
+        # Hvor ofte hendelseskøen sjekkes på skjermer uten animasjon
+        self.poll_interval = self.interval if poll_interval is None else poll_interval
+        self._deadline = None
+        self._last = None
+        # Tellere for diagnostikk
+        self.frames = 0
+        self.late_frames = 0  # Framer som startet etter fristen
+        self.slept = 0.0      # Sekunder brukt på å vente
+
+    def reset(self):
+        """Glemmer fristen, f.eks. etter en skjerm som ikke bruker frame-takten."""
+        self._deadline = None
+        self._last = None
+
+    async def _sleep(self, seconds):
+        start = time.perf_counter()
+        # sleep(0) gir også kontrollen tilbake (viktig for web)
+        await asyncio.sleep(max(0.0, seconds))
+        self.slept += time.perf_counter() - start
+
+    async def next_frame(self):
+        """Venter til neste frame skal starte. Returnerer sekunder siden forrige frame.
+
+        Ligger vi etter, startes framen med en gang, og fristene regnes fra nå
+        i stedet for å prøve å ta igjen framene som ble borte.
+        """
+        now = time.perf_counter()
+        if self._deadline is None:
+            self._deadline = now
+        if self._deadline > now:
+            await self._sleep(self._deadline - now)
+        else:
+            if now - self._deadline > self.interval:
+                self.late_frames += 1
+                self._deadline = now
+            await self._sleep(0)
+        now = time.perf_counter()
+        dt = now - self._last if self._last is not None else self.interval
+        self._last = now
+        self._deadline += self.interval
+        self.frames += 1
+        return dt
+
+    async def wait_events(self, timeout=None):
+        """Venter på hendelser fra pygame, men ikke lenger enn timeout sekunder.
+
+        Returnerer hendelsene (tom liste hvis timeout gikk ut først).
+        """
+        end = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            events = pygame.event.get()
+            if events:
+                return events
+            delay = self.poll_interval
+            if end is not None:
+                remaining = end - time.perf_counter()
+                if remaining <= 0:
+                    return []
+                delay = min(delay, remaining)
+            await self._sleep(delay)
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "late_frames": self.late_frames,
+            "slept_s": self.slept,
+        }
@@ -0,0 +1,210 @@
+"""
+Highscore-lager som leser fra minnet og skriver i bakgrunnen.
+
+Listen lastes én gang. Nye scorer legges inn i minnet med en gang, og
+skrives så av en asyncio-oppgave til en journal (én JSON-linje per score,
+bare lagt til på slutten). Med jevne mellomrom komprimeres journalen til
+highscore.json via en midlertidig fil og os.replace, så et krasj midt i en
+skriving aldri etterlater en ødelagt highscore.json.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+# Uten tråder (pygbag/emscripten) skrives det direkte i oppgaven (brukes også av main.py)
+HAS_THREADS = sys.platform != 'emscripten'
+
+
+class HighscoreStore:
+    """Topp-listen i minnet, med journal og atomisk komprimering på disk."""
+    def __init__(self, path, limit=10, compact_every=20):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.limit = limit
+        self.compact_every = compact_every
+        self._highscores = None
+        self._pending = []
+        self._journal_entries = 0
+        self._torn_tail = False
+        self._wakeup = None
+        self._writer = None
+        self._ids = itertools.count()
+        self._pending_lock = threading.Lock()  # Kort: bare bytte av køen
+        self._io_lock = threading.Lock()       # Én skriving om gangen
+        # Tellere for diagnostikk
+        self.writes = 0
+        self.failed_writes = 0
+        self.compactions = 0
+        self.skipped_lines = 0
+        self.last_error = None
+
+    # --- Lesing ---
+
+    def _read_snapshot(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            self.last_error = e
+            return []
+        if isinstance(data, list):
+            return [entry for entry in data if isinstance(entry, dict) and "score" in entry]
+        if isinstance(data, (int, float)):
+            return [{"name": "Spiller", "score": data}]
+        return []
+
+    def _read_journal(self):
+        entries = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._torn_tail = not line.endswith("\n")
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        self.skipped_lines += 1  # Halvskrevet linje etter et krasj
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.last_error = e
+        return entries
+
+    def load(self):
+        """Laster snapshot og journal fra disk (bare første gang)."""
+        if self._highscores is not None:
+            return self._highscores
+        entries = self._read_snapshot()
+        journal = self._read_journal()
+        self._journal_entries = len(journal)
+        seen = {entry.get("id") for entry in entries if "id" in entry}
+        for entry in journal:
+            # Et krasj mellom komprimering og tømming av journalen gir duplikater
+            if entry.get("id") not in seen:
+                entries.append(entry)
+                seen.add(entry.get("id"))
+        entries.sort(key=lambda x: x["score"], reverse=True)
+        self._highscores = entries[:self.limit]
+        return self._highscores
+
+    @property
+    def highscores(self):
+        return self.load()
+
+    def best(self):
+        highscores = self.load()
+        return highscores[0]["score"] if highscores else 0
+
+    # --- Skriving ---
+
+    def add(self, name, score, **extra):
+        """Legger inn en score i minnet og setter den i kø for disk.
+
+        Returnerer den nye topp-listen uten å vente på disken.
+        """
+        highscores = self.load()
+        entry = {"name": name, "score": score, **extra}
+        entry["id"] = f"{time.time_ns():x}-{os.getpid():x}-{next(self._ids)}"
+        # Stabil innsetting: lik score havner etter de som var der fra før
+        index = len(highscores)
+        while index > 0 and highscores[index - 1]["score"] < score:
+            index -= 1
+        # Under låsen, så compact() i skrivetråden aldri ser listen halvveis endret
+        with self._pending_lock:
+            highscores.insert(index, entry)
+            del highscores[self.limit:]
+            self._pending.append(entry)
+        self._schedule()
+        return highscores
+
+    def _schedule(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()  # Ingen event-loop (f.eks. verktøy): skriv med en gang
+            return
+        if self._writer is None or self._writer.done():
+            self._wakeup = asyncio.Event()
+            self._writer = loop.create_task(self._write_loop())
+        self._wakeup.set()
+
+    async def _write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if HAS_THREADS:
+                await asyncio.to_thread(self.flush_sync)
+            else:
+                self.flush_sync()
+
+    def _append_journal(self, entries):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            if self._torn_tail:
+                f.write("\n")  # Ikke skriv videre på en halv linje
+                self._torn_tail = False
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self):
+        """Skriver topp-listen atomisk til highscore.json og tømmer journalen."""
+        tmp_path = self.path + ".tmp"
+        # Kjører i skrivetråden mens add() kan endre listen på event-loopen
+        with self._pending_lock:
+            highscores = list(self.load())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(highscores, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        with open(self.journal_path, 'w', encoding='utf-8'):
+            pass
+        self._torn_tail = False
+        self._journal_entries = 0
+        self.compactions += 1
+
+    def flush_sync(self, compact=False):
+        """Skriver ventende scorer til journalen (blokkerende)."""
+        with self._io_lock:
+            with self._pending_lock:
+                entries, self._pending = self._pending, []
+            try:
+                if entries:
+                    self._append_journal(entries)
+                    self._journal_entries += len(entries)
+                    self.writes += len(entries)
+                    entries = []
+                if self._journal_entries and (compact or self._journal_entries >= self.compact_every):
+                    self.compact()
+            except OSError as e:
+                # Prøv igjen ved neste skriving i stedet for å miste scorene
+                with self._pending_lock:
+                    self._pending[:0] = entries
+                self.failed_writes += 1
+                self.last_error = e
+                print(f"Kunne ikke lagre highscore: {e}")
+
+    async def flush(self):
+        """Skriver alt som venter og komprimerer (kalles ved avslutning)."""
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        self.flush_sync(compact=True)
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "journal_entries": self._journal_entries,
+            "writes": self.writes,
+            "failed_writes": self.failed_writes,
+            "compactions": self.compactions,
+            "skipped_lines": self.skipped_lines,
+            "last_error": repr(self.last_error) if self.last_error else None,
+        }
@@ -0,0 +1,77 @@
+"""
+Kø for svinger mellom input og simulering.
+
+Tastetrykk leses hver render-frame, men slangen flytter seg bare `speed`
+ganger i sekundet. I stedet for at et nytt trykk overskriver retningen før
+slangen rekker å flytte seg, legges svingene i en kø, og simuleringen tar
+ut nøyaktig én sving per flytt. To raske trykk (f.eks. opp og så venstre)
+blir da to svinger på to flytt, i stedet for at det første forsvinner.
+
+Hver sving sjekkes mot den siste svingen i køen (eller retningen slangen
+går i), så køen kan aldri inneholde en sving rett bakover.
+"""
+
+from collections import deque
+
+from engine import DIRECTIONS
+
+
+class TurnQueue:
+    """FIFO med opptil max_pending svinger, hver med tidspunktet tasten ble trykket."""
+    def __init__(self, max_pending=3):
+        self.max_pending = max_pending
+        self._pending = deque()
+        # Statistikk
+        self.accepted = 0
+        self.rejected = 0  # Rett bakover eller samme retning som før
+        self.dropped = 0   # Køen var full
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.consumed = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def clear(self):
+        self._pending.clear()
+
+    def push(self, action, timestamp, direction):
+        """Legger til en sving. direction er (dx, dy) slangen går i nå.
+
+        Returnerer True hvis svingen ble lagt i køen.
+        """
+        if self._pending:
+            direction = DIRECTIONS[self._pending[-1][0]]
+        dx, dy = DIRECTIONS[action]
+        last_dx, last_dy = direction
+        if (dx, dy) == (last_dx, last_dy) or (dx and last_dx) or (dy and last_dy):
+            self.rejected += 1
+            return False
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self._pending.append((action, timestamp))
+        self.accepted += 1
+        return True
+
+    def pop(self, now=None):
+        """Tar ut neste sving, eller None. Med now måles tiden svingen ventet."""
+        if not self._pending:
+            return None
+        action, timestamp = self._pending.popleft()
+        if now is not None:
+            latency = now - timestamp
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.consumed += 1
+        return action
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "mean_latency_ms": self.total_latency / self.consumed * 1000.0 if self.consumed else 0.0,
+            "max_latency_ms": self.max_latency * 1000.0,
+        }
@@ -0,0 +1,197 @@
+"""
+Lokal leaderboard i SQLite: hele historikken, sesonger, plassering og sider.
+
+Hvert spill lagres som én rad i `scores`, med indeks på
+(sesong, plattform, score), så topp-N og sider leses rett fra indeksen.
+Plassering beregnes fra `score_counts`, som teller antall spill per
+poengsum. Da er "hvilken plass gir denne scoren?" en sum over de ulike
+poengsummene over scoren, ikke over alle radene, og svaret kommer like
+raskt med millioner av spill lagret. `player_bests` holder beste score per
+spiller og sesong.
+
+Sesongene følger LeaderboardService i web-versjonen: 'season1' er den
+gamle listen, 'season2' er gjeldende sesong.
+
+Eksempel:
+    board = Leaderboard("leaderboard.db")
+    board.add("Ola", 120)
+    rank, total = board.rank(120)
+    page = board.top(limit=10, offset=10)
+"""
+
+import sqlite3
+import threading
+import time
+
+SEASONS = ('season1', 'season2')
+CURRENT_SEASON = 'season2'
+DEFAULT_PLATFORM = 'pc'
+MAX_NAME_LENGTH = 20  # Samme grense som web-versjonen
+
+# Feil fra databasen (låst, skrivebeskyttet, ødelagt fil, ...)
+LeaderboardError = sqlite3.Error
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    season TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    replay TEXT
+);
+CREATE INDEX IF NOT EXISTS scores_by_platform
+    ON scores (season, platform, score DESC, id);
+CREATE INDEX IF NOT EXISTS scores_by_season
+    ON scores (season, score DESC, id);
+
+CREATE TABLE IF NOT EXISTS score_counts (
+    season TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    PRIMARY KEY (season, platform, score)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS player_bests (
+    season TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    score_id INTEGER NOT NULL,
+    PRIMARY KEY (season, platform, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS player_bests_by_score
+    ON player_bests (season, platform, score DESC);
+"""
+
+
+def _platform_filter(platform):
+    """SQL-bit og parametre for én plattform, eller alle hvis None ('global')."""
+    if platform is None:
+        return "", ()
+    return " AND platform = ?", (platform,)
+
+
+class Leaderboard:
+    """Leaderboard over alle spill, lagret i én SQLite-fil.
+
+    Tilkoblingen kan brukes fra en bakgrunnstråd (asyncio.to_thread), men
+    bare én operasjon kjører om gangen.
+    """
+    def __init__(self, path, season=CURRENT_SEASON, platform=DEFAULT_PLATFORM):
+        if season not in SEASONS:
+            raise ValueError(f"Ukjent sesong '{season}' (gyldige: {', '.join(SEASONS)})")
+        self.path = path
+        self.season = season
+        self.platform = platform
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            # WAL: lesere blokkeres ikke av en skriving, og et krasj ruller tilbake
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Skriving ---
+
+    def add(self, name, score, season=None, platform=None, replay=None, timestamp=None):
+        """Lagrer ett spill og returnerer id-en til raden."""
+        season = season or self.season
+        platform = platform or self.platform
+        name = name[:MAX_NAME_LENGTH]
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock, self._db:
+            score_id = self._db.execute(
+                "INSERT INTO scores (season, platform, name, score, timestamp, replay)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (season, platform, name, score, timestamp, replay)).lastrowid
+            self._db.execute(
+                "INSERT INTO score_counts (season, platform, score, runs) VALUES (?, ?, ?, 1)"
+                " ON CONFLICT (season, platform, score) DO UPDATE SET runs = runs + 1",
+                (season, platform, score))
+            self._db.execute(
+                "INSERT INTO player_bests (season, platform, name, score, score_id) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (season, platform, name) DO UPDATE"
+                " SET score = excluded.score, score_id = excluded.score_id"
+                " WHERE excluded.score > player_bests.score",
+                (season, platform, name, score, score_id))
+        return score_id
+
+    def import_entries(self, entries, season='season1', platform=None):
+        """Importerer en gammel highscore-liste (dicts med name/score). Returnerer antall."""
+        count = 0
+        for entry in entries:
+            if isinstance(entry, dict) and "score" in entry:
+                self.add(str(entry.get("name", "Spiller")), int(entry["score"]),
+                         season=season, platform=platform, replay=entry.get("replay"), timestamp=0.0)
+                count += 1
+        return count
+
+    # --- Spørringer ---
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def count(self, season=None, platform=None):
+        """Antall spill lagret i sesongen."""
+        where, params = _platform_filter(platform)
+        row = self._query(f"SELECT COALESCE(SUM(runs), 0) FROM score_counts WHERE season = ?{where}",
+                          (season or self.season, *params))
+        return row[0][0]
+
+    def rank(self, score, season=None, platform=None):
+        """Plasseringen en score får, som (plass, antall spill).
+
+        Like scorer deler plass, som getPlayerRank i web-versjonen.
+        """
+        season = season or self.season
+        where, params = _platform_filter(platform)
+        above = self._query(
+            f"SELECT COALESCE(SUM(runs), 0) FROM score_counts WHERE season = ?{where} AND score > ?",
+            (season, *params, score))[0][0]
+        return above + 1, self.count(season, platform)
+
+    def top(self, limit=10, offset=0, season=None, platform=None):
+        """Én side av topplisten, høyest først (lik score: eldst først)."""
+        where, params = _platform_filter(platform)
+        rows = self._query(
+            f"SELECT id, name, score, platform, timestamp FROM scores WHERE season = ?{where}"
+            " ORDER BY score DESC, id LIMIT ? OFFSET ?",
+            (season or self.season, *params, limit, offset))
+        return [dict(row) for row in rows]
+
+    def best(self, season=None, platform=None):
+        """Høyeste score i sesongen (0 hvis tom)."""
+        top = self.top(1, season=season, platform=platform)
+        return top[0]["score"] if top else 0
+
+    def player_best(self, name, season=None, platform=None):
+        """Beste score for én spiller, eller None."""
+        platform = platform or self.platform
+        rows = self._query(
+            "SELECT name, score, score_id FROM player_bests WHERE season = ? AND platform = ? AND name = ?",
+            (season or self.season, platform, name[:MAX_NAME_LENGTH]))
+        return dict(rows[0]) if rows else None
+
+    def top_players(self, limit=10, offset=0, season=None, platform=None):
+        """Én side av topplisten med bare beste score per spiller."""
+        platform = platform or self.platform
+        rows = self._query(
+            "SELECT name, score, score_id FROM player_bests WHERE season = ? AND platform = ?"
+            " ORDER BY score DESC, score_id LIMIT ? OFFSET ?",
+            (season or self.season, platform, limit, offset))
+        return [dict(row) for row in rows]
+
+    def replay(self, score_id):
+        """Replayet (base64) som ble lagret med et spill, eller None."""
+        rows = self._query("SELECT replay FROM scores WHERE id = ?", (score_id,))
+        return rows[0][0] if rows else None
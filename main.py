@@ -1,9 +1,34 @@
-import pygame
 import time
-import random
+_import_start = time.perf_counter()  # Oppstartsrapporten måler fra her
+
+import pygame
+import asyncio
 import os
-import json
+import random
 import math
+import base64
+from array import array
+from collections import OrderedDict
+
+from engine import FOOD_TYPES, FOOD_LIFETIME, MAX_BOARD_SIZE, SnakeEngine, UP, RIGHT, DOWN, LEFT
+from replay import ReplayRecorder
+from input_queue import TurnQueue
+from frame_scheduler import FrameScheduler
+from highscore_store import HAS_THREADS, HighscoreStore
+from profiler import FrameProfiler, StartupTimer, PHASES
+from quality import QualityGovernor, QUALITY_TIERS
+from render_backend import create_backend
+from rewind import RewindBuffer
+
+try:
+    from leaderboard import Leaderboard, LeaderboardError, MAX_NAME_LENGTH
+except ImportError:
+    Leaderboard = None  # Uten sqlite3 (f.eks. i nettleseren) brukes bare highscore.json
+
+try:
+    import numpy as np  # Valgfri: vektorisert partikkel-oppdatering
+except ImportError:
+    np = None
 
 # --- KONFIGURASJON OG FARGER ---
 SCREEN_WIDTH = 800
@@ -20,101 +45,453 @@ COLOR_SNAKE_HEAD = (150, 255, 200)
 COLOR_SNAKE_GLOW = (0, 255, 150, 100)  # Glød farge med alpha
 COLOR_TEXT = (240, 240, 240)
 
-# Mat-typer og egenskaper
-FOOD_TYPES = {
-    'normal': {'color': (255, 80, 80),   'glow': (255, 120, 120), 'score': 10, 'chance': 70, 'speed_mod': 0},  # Rød
-    'gold':   {'color': (255, 215, 0),   'glow': (255, 255, 150), 'score': 50, 'chance': 10, 'speed_mod': 0},  # Gull
-    'speed':  {'color': (0, 255, 255),   'glow': (100, 255, 255), 'score': 20, 'chance': 10, 'speed_mod': 2},  # Cyan (Raskere)
-    'slow':   {'color': (180, 80, 255),  'glow': (220, 120, 255), 'score': 10, 'chance': 10, 'speed_mod': -2}, # Lilla (Tregere)
-}
+# Sprite-cache: antall timer-nivåer for alpha og maks antall sprites i minnet
+SPRITE_ALPHA_BUCKETS = 32
+SPRITE_CACHE_SIZE = 512
+
+# Tekst-cache: maks antall ferdige tekstflater i minnet
+TEXT_CACHE_SIZE = 256
+COLOR_HIGHSCORE = (255, 215, 0)
+COLOR_HINT = (150, 150, 150)
+
+# Partikler: fast kapasitet, levetid-tap og friksjon per oppdatering
+PARTICLE_CAPACITY = 4096
+PARTICLE_DECAY = 0.75  # Levetid tapt per sekund
+PARTICLE_DRAG = 0.95 ** 15  # Andel av farten som er igjen etter ett sekund
+
+# Fast tidssteg: slangen flytter seg `speed` ganger i sekundet, mens
+# tegning, input og effekter går i skjermens takt.
+RENDER_FPS = 60
+MAX_FRAME_TIME = 0.25  # Lengre pauser (f.eks. flytting av vinduet) kuttes
+MAX_STEPS_PER_FRAME = 5
+FOOD_PULSE_SPEED = 2.25  # Radianer per sekund
+
+# Antall svinger som kan vente på neste flytt (se input_queue.py)
+TURN_QUEUE_SIZE = 3
+
+# Verden: standard er ett skjermbilde (40x30 celler). En større verden, f.eks.
+# NEON_WORLD_COLS=1000 NEON_WORLD_ROWS=1000, vises gjennom et kamera som
+# følger hodet, og bare det som er innenfor skjermen tegnes.
+def _world_size(name, default):
+    """Leser verdensstørrelsen fra miljøvariabelen name (1-MAX_BOARD_SIZE celler)."""
+    size = int(os.environ.get(name, default))
+    if not 1 <= size <= MAX_BOARD_SIZE:
+        raise ValueError(f"{name} må være 1-{MAX_BOARD_SIZE}, ikke {size}")
+    return size
+
+WORLD_COLS = _world_size("NEON_WORLD_COLS", SCREEN_WIDTH // BLOCK_SIZE)
+WORLD_ROWS = _world_size("NEON_WORLD_ROWS", SCREEN_HEIGHT // BLOCK_SIZE)
+CAMERA_MARGIN = 8  # Celler fra skjermkanten før kameraet flytter seg
+GRID_STEP = BLOCK_SIZE * 2  # Avstand mellom linjene i rutenettet
+
+# Dirty-rect rendering: tegner og laster bare opp endrede områder.
+# Over terskelen (andel av skjermen) tegnes hele bildet på nytt i stedet.
+USE_DIRTY_RECTS = False
+DIRTY_RECT_THRESHOLD = 0.4
+
+# HUD-områder (score-boks og highscore-tekst)
+HUD_RECT = pygame.Rect(5, 5, 200, 60)
+HUD_HIGH_RECT = pygame.Rect(SCREEN_WIDTH - 160, 10, 160, 30)
+GAME_OVER_HINT = "Trykk C for å spille igjen, Q for å avslutte, pil opp/ned for å bla"
+CURSOR_BLINK_INTERVAL = 0.5  # Sekunder cursoren er synlig (og skjult) på navneskjermen
+
+# Profilering: F3 slår av/på måling med overlay, F4 eksporterer historikken.
+# NEON_PROFILE=1 slår den på fra start.
+PROFILE_ENABLED = os.environ.get("NEON_PROFILE") == "1"
+PROFILE_TOGGLE_KEY = pygame.K_F3
+PROFILE_EXPORT_KEY = pygame.K_F4
+PROFILE_OVERLAY_REFRESH = 0.5  # Sekunder mellom hver oppdatering av tallene
+PROFILE_LINE_HEIGHT = 15
+PROFILE_OVERLAY_RECT = pygame.Rect(5, SCREEN_HEIGHT - 5 - PROFILE_LINE_HEIGHT * (len(PHASES) + 6),
+                                   300, PROFILE_LINE_HEIGHT * (len(PHASES) + 6))
+PROFILE_TRACE_FILE = "profile_trace.json"
+PROFILE_CSV_FILE = "profile.csv"
+
+# Kvalitet: 'auto' lar QualityGovernor skru ned effektene når framene tar
+# for lang tid; NEON_QUALITY=high/medium/low/minimal låser nivået.
+QUALITY = os.environ.get("NEON_QUALITY", "auto")
+QUALITY_BUDGET = 1.0 / RENDER_FPS  # Sekunder arbeid en frame kan bruke
+
+# Render-backend: 'surface' (programvare-blits, standard) eller 'texture'
+# (SDL Renderer, se render_backend.py). NEON_RENDER_DRIVER velger SDL-driver
+# for 'texture', f.eks. 'software' eller 'opengl'.
+RENDER_BACKEND = os.environ.get("NEON_RENDER_BACKEND", "surface")
+RENDER_DRIVER = os.environ.get("NEON_RENDER_DRIVER") or None
+WINDOW_TITLE = 'Neon Snake Deluxe'
+
+# Øvingsmodus: R spoler spillet REWIND_STEP sekunder tilbake, så langt
+# bufferen rekker (REWIND_SECONDS). Et spill som er spolt tilbake lagres
+# ikke på highscore-listen, siden det ikke kan spilles av fra replayet.
+REWIND_KEY = pygame.K_r
+REWIND_SECONDS = 10
+REWIND_STEP = 2.0
+REWIND_KEYFRAME_INTERVAL = 60  # Steg mellom hvert fulle snapshot
 
 # Fil for å lagre highscore
 HIGHSCORE_FILE = "highscore.json"
+highscore_store = HighscoreStore(HIGHSCORE_FILE)
+
+# Leaderboard med hele historikken (SQLite), og antall plasser per side
+LEADERBOARD_FILE = "leaderboard.db"
+LEADERBOARD_PAGE_SIZE = 10
+
+# Sekunder per frame som kan brukes på forhåndsrendring de første framene
+WARMUP_BUDGET = 0.002
 
 # --- OPPSETT AV PYGAME ---
-pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption('Neon Snake Deluxe')
+# Vindu, fonter og leaderboard lages først når de trengs (init_game() og
+# get_leaderboard()), så import av modulen (verktøy, benchmark) ikke åpner
+# et vindu. startup måler tiden fra import til første frame.
+startup = StartupTimer(_import_start)
+backend = None
+screen = None  # Spill-framen tegnes gjennom backend; skjermene uten animasjon tegner på screen
 clock = pygame.time.Clock()
+game_font = title_font = small_font = None
 
-# Bruker default font for bedre web-kompatibilitet
-game_font = pygame.font.SysFont(None, 25)
-title_font = pygame.font.SysFont(None, 50)
-small_font = pygame.font.SysFont(None, 18)
+def init_game(backend_name=RENDER_BACKEND, driver=RENDER_DRIVER):
+    """Starter pygame-modulene spillet bruker, vinduet og fontene (bare første gang)."""
+    global backend, screen, game_font, title_font, small_font
+    if backend is not None:
+        return
+    # Bare skjerm og fonter; pygame.init() starter også lyd og joystick
+    pygame.display.init()
+    pygame.font.init()
+    startup.mark('pygame')
+    backend = create_backend(backend_name, (SCREEN_WIDTH, SCREEN_HEIGHT), WINDOW_TITLE, driver)
+    screen = backend.surface
+    startup.mark('display')
+    
+    # Bruker default font for bedre web-kompatibilitet
+    game_font = pygame.font.SysFont(None, 25)
+    title_font = pygame.font.SysFont(None, 50)
+    small_font = pygame.font.SysFont(None, 18)
+    startup.mark('fonts')
 
 # --- FUNKSJONER ---
 
-def load_highscore():
-    """Laster inn topp 10 highscore-listen."""
-    try:
-        # Prøv å laste fra fil først (fungerer lokalt)
-        if os.path.exists(HIGHSCORE_FILE):
-            with open(HIGHSCORE_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return data
-                elif isinstance(data, (int, float)):
-                    return [{"name": "Spiller", "score": data}]
-    except:
-        pass
-    
-    # For web: localStorage håndteres automatisk av pygbag
-    # Vi returnerer tom liste hvis fil ikke finnes
-    return []
+def use_backend(name, driver=None):
+    """Bytter render-backend (f.eks. fra benchmark). Spill laget før byttet må lages på nytt."""
+    global backend, screen
+    if backend is None:
+        init_game(name, driver)
+        return backend
+    backend.close()
+    backend = create_backend(name, (SCREEN_WIDTH, SCREEN_HEIGHT), WINDOW_TITLE, driver)
+    screen = backend.surface
+    static_layers.invalidate()  # Lagene er konvertert til formatet til forrige skjerm
+    return backend
 
-def save_highscore(name, score):
-    """Lagrer en ny highscore og beholder kun topp 10."""
-    highscores = load_highscore()
-    
-    # Legg til ny score
-    highscores.append({"name": name, "score": score})
-    
-    # Sorter etter score (høyest først) og behold kun topp 10
-    highscores.sort(key=lambda x: x["score"], reverse=True)
-    highscores = highscores[:10]
-    
-    # Lagre til fil (fungerer både lokalt og på web)
+def open_leaderboard():
+    """Åpner SQLite-leaderboarden, eller None hvis den ikke kan brukes.
+
+    Første gang importeres den gamle topp 10-listen fra highscore.json som
+    sesong 1, slik web-versjonen gjorde med sin gamle liste.
+    """
+    if Leaderboard is None:
+        return None
+    is_new = not os.path.exists(LEADERBOARD_FILE)
     try:
-        with open(HIGHSCORE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(highscores, f, ensure_ascii=False, indent=2)
-    except:
-        # Hvis fil-lagring feiler (f.eks. på web), prøv localStorage
+        board = Leaderboard(LEADERBOARD_FILE)
+        if is_new:
+            board.import_entries(highscore_store.highscores, season='season1')
+    except LeaderboardError as e:
+        print(f"Kunne ikke åpne leaderboard, bruker highscore.json: {e}")
+        return None
+    return board
+
+leaderboard = None
+_leaderboard_opened = False
+_top_page = None  # Første side av leaderboarden, holdt oppdatert av save_highscore()
+
+async def run_blocking(func, *args, **kwargs):
+    """Kjører et blokkerende kall (SQLite, replay-sjekk) i en tråd, så event-loopen går videre.
+
+    Uten tråder (pygbag/emscripten) kjøres kallet direkte.
+    """
+    if HAS_THREADS:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+def get_leaderboard():
+    """Leaderboarden, åpnet første gang den trengs (None hvis den ikke kan brukes)."""
+    global leaderboard, _leaderboard_opened
+    if not _leaderboard_opened:
+        _leaderboard_opened = True
+        leaderboard = open_leaderboard()
+        startup.mark('leaderboard')
+    return leaderboard
+
+def load_highscore(page=0):
+    """Returnerer én side av highscore-listen (10 per side), høyest først.
+
+    Første side leses fra SQLite bare én gang og holdes deretter i minnet,
+    så en omstart ikke venter på disken. De andre sidene spørres etter.
+    """
+    global _top_page
+    offset = page * LEADERBOARD_PAGE_SIZE
+    board = get_leaderboard()
+    if board is None:
+        return highscore_store.highscores[offset:offset + LEADERBOARD_PAGE_SIZE]
+    if page == 0:
+        if _top_page is None:
+            _top_page = board.top(LEADERBOARD_PAGE_SIZE)
+        return list(_top_page)
+    return board.top(LEADERBOARD_PAGE_SIZE, offset)
+
+def _remember_top_score(entry):
+    """Legger en ny score inn i første side i minnet (lik score: eldst først)."""
+    if _top_page is None:
+        return  # Leses inn med scoren når den trengs
+    index = sum(1 for old in _top_page if old["score"] >= entry["score"])
+    if index < LEADERBOARD_PAGE_SIZE:
+        _top_page.insert(index, entry)
+        del _top_page[LEADERBOARD_PAGE_SIZE:]
+
+def highscore_rank(score):
+    """Plasseringen en score får i gjeldende sesong, som (plass, antall spill).
+
+    Uten leaderboard er antall spill bare lengden på topp-listen, så en
+    score som ikke kom med gir plass > antall.
+    """
+    board = get_leaderboard()
+    if board is not None:
+        return board.rank(score)
+    highscores = highscore_store.highscores
+    return sum(1 for entry in highscores if entry["score"] > score) + 1, len(highscores)
+
+async def save_highscore(name, score, replay=None):
+    """Lagrer en ny score. Returnerer True hvis den ble godtatt.
+
+    Med et replay spilles spillet av på nytt først, og scoren lagres bare
+    hvis replayet ender på samme poengsum. Med SQLite lagres alle spill i
+    leaderboarden (én liten transaksjon i en tråd, og første side i minnet
+    oppdateres); ellers legges scoren i topp 10-listen, som skrives til
+    disk i bakgrunnen (se highscore_store.py).
+    """
+    if replay is not None and not await run_blocking(replay.verify, score):
+        print(f"Replay stemmer ikke med scoren {score}, highscore ble ikke lagret")
+        return False
+
+    # Lagre med replayet, så scoren kan sjekkes igjen senere
+    encoded = base64.b64encode(replay.to_bytes()).decode('ascii') if replay is not None else None
+    board = get_leaderboard()
+    if board is not None:
+        timestamp = time.time()
         try:
-            # pygbag håndterer localStorage automatisk via IndexedDB
-            pass
-        except:
-            pass
-    
-    return highscores
+            score_id = await run_blocking(board.add, name, score, replay=encoded, timestamp=timestamp)
+        except LeaderboardError as e:
+            print(f"Kunne ikke lagre i leaderboard, bruker highscore.json: {e}")
+        else:
+            _remember_top_score({"id": score_id, "name": name[:MAX_NAME_LENGTH], "score": score,
+                                 "platform": board.platform, "timestamp": timestamp})
+            return True
+    extra = {"replay": encoded} if encoded is not None else {}
+    highscore_store.add(name, score, **extra)
+    return True
+
+def _render_gradient(surface):
+    """Tegner gradienten (brukes kun ved bygging av cachen).
 
-def draw_gradient_background():
-    """Tegner en gradient bakgrunn."""
-    for y in range(SCREEN_HEIGHT):
-        ratio = y / SCREEN_HEIGHT
+    Fargen endres bare nedover, så én kolonne regnes ut piksel for piksel
+    og strekkes til full bredde med én skalering.
+    """
+    width, height = surface.get_size()
+    pixels = bytearray()
+    for y in range(height):
+        ratio = y / height
         r = int(COLOR_BG[0] * (1 - ratio) + COLOR_BG_GRADIENT[0] * ratio)
         g = int(COLOR_BG[1] * (1 - ratio) + COLOR_BG_GRADIENT[1] * ratio)
         b = int(COLOR_BG[2] * (1 - ratio) + COLOR_BG_GRADIENT[2] * ratio)
-        pygame.draw.line(screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
+        pixels += bytes((r, g, b))
+    column = pygame.image.frombuffer(pixels, (1, height), 'RGB')
+    surface.blit(pygame.transform.scale(column, (width, height)), (0, 0))
+
+def _render_grid(surface):
+    """Tegner rutenettet (dyrt, brukes kun ved bygging av cachen)."""
+    width, height = surface.get_size()
+    for x in range(0, width, GRID_STEP):
+        pygame.draw.line(surface, COLOR_GRID, (x, 0), (x, height), 1)
+    for y in range(0, height, GRID_STEP):
+        pygame.draw.line(surface, COLOR_GRID, (0, y), (width, y), 1)
+
+class StaticLayerCache:
+    """Forhåndsrendret statisk lag (gradient og rutenett) som tegnes med én blit.
+
+    Laget bygges på nytt bare når oppløsningen eller fargepaletten endres.
+    """
+    def __init__(self):
+        self._layers = {}
+
+    def _key(self, size, with_grid):
+        return (size, with_grid, BLOCK_SIZE, COLOR_BG, COLOR_BG_GRADIENT, COLOR_GRID)
+
+    def get(self, size, with_grid=True):
+        """Returnerer det ferdige laget for gitt størrelse, bygger det ved behov."""
+        key = self._key(size, with_grid)
+        layer = self._layers.get(with_grid)
+        if layer is None or layer[0] != key:
+            surf = pygame.Surface(size)
+            _render_gradient(surf)
+            if with_grid:
+                _render_grid(surf)
+            if pygame.display.get_surface() is not None:
+                surf = surf.convert()  # Samme format som skjermen gir raskest blit
+            layer = (key, surf)
+            self._layers[with_grid] = layer
+        return layer[1]
+
+    def invalidate(self):
+        """Tvinger ny bygging ved neste tegning (f.eks. etter endret palett)."""
+        self._layers.clear()
+
+static_layers = StaticLayerCache()
+
+class SpriteCache:
+    """LRU-cache for ferdige sprites (glød, mat, slangesegmenter og etiketter).
+
+    Nøkkelen beskriver alt som påvirker pikslene, slik at render-løkken kan
+    blitte ferdige flater i stedet for å lage nye hver frame.
+    """
+    def __init__(self, max_size=SPRITE_CACHE_SIZE):
+        self.max_size = max_size
+        self._sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, builder):
+        """Henter sprite for nøkkelen, eller bygger den med builder()."""
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self._sprites.move_to_end(key)
+            return sprite
+        self.misses += 1
+        sprite = builder()
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_size:
+            self._sprites.popitem(last=False)  # Kast den minst brukte
+        return sprite
+
+    def clear(self):
+        self._sprites.clear()
+
+    def stats(self):
+        """Returnerer størrelse og treff-statistikk."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._sprites),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
 
-def draw_grid():
-    """Tegner et diskret rutenett for moderne look."""
-    for x in range(0, SCREEN_WIDTH, BLOCK_SIZE * 2):
-        pygame.draw.line(screen, COLOR_GRID, (x, 0), (x, SCREEN_HEIGHT), 1)
-    for y in range(0, SCREEN_HEIGHT, BLOCK_SIZE * 2):
-        pygame.draw.line(screen, COLOR_GRID, (0, y), (SCREEN_WIDTH, y), 1)
+sprite_cache = SpriteCache()
+
+class TextCache(SpriteCache):
+    """LRU-cache for ferdig rendret tekst, med nøkkel (font, tekst, farge, antialias).
+
+    Tall settes sammen av cachede siffer-glyfer, så en score som endrer seg
+    ikke trenger ny rasterisering av fonten.
+    """
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        super().__init__(max_size)
+
+    def render(self, font, text, color, antialias=True):
+        """Som font.render(), men hver tekst rendres bare én gang."""
+        return self.get((font, text, color, antialias), lambda: font.render(text, antialias, color))
+
+    def blit(self, surface, font, text, color, pos, antialias=True):
+        """Tegner teksten med øvre venstre hjørne i pos. Returnerer x rett etter teksten."""
+        text_surface = self.render(font, text, color, antialias)
+        surface.blit(text_surface, pos)
+        return pos[0] + text_surface.get_width()
+
+    def blit_number(self, surface, font, value, color, pos, antialias=True):
+        """Tegner et heltall siffer for siffer fra cachen. Returnerer x rett etter tallet."""
+        x, y = pos
+        for digit in str(value):
+            glyph = self.render(font, digit, color, antialias)
+            surface.blit(glyph, (x, y))
+            x += glyph.get_width()
+        return x
+
+text_cache = TextCache()
+
+def warmup_assets():
+    """Rendrer faste tekster, siffer og bakgrunnene til skjermene på forhånd.
+
+    Generator med ett steg per tekst eller sprite; spillet kjører stegene i
+    ledig tid de første framene (se SnakeGame.warm_up), så verken oppstarten
+    eller en enkelt frame må gjøre alt.
+    """
+    static_texts = [
+        (game_font, "Score: ", COLOR_TEXT),
+        (game_font, "High: ", COLOR_HIGHSCORE),
+        (game_font, "Skriv inn navn:", COLOR_TEXT),
+        (small_font, "Trykk ENTER for å lagre", COLOR_HINT),
+        (title_font, "GAME OVER", (255, 50, 50)),
+        (game_font, "NY HIGHSCORE!", COLOR_HIGHSCORE),
+        (game_font, "TOPP 10 HIGHSCORES", COLOR_HIGHSCORE),
+        (small_font, GAME_OVER_HINT, COLOR_HINT),
+    ]
+    for font, text, color in static_texts:
+        text_cache.render(font, text, color)
+        yield
+    for font, color in ((game_font, COLOR_TEXT), (game_font, COLOR_HIGHSCORE), (small_font, (255, 255, 255))):
+        for digit in "0123456789-":
+            text_cache.render(font, digit, color)
+            yield
+    sprite_cache.get('input_bg', _build_input_background)
+    yield
+    sprite_cache.get('leaderboard_bg', _build_leaderboard_background)
+    yield
+
+def _build_hud_background():
+    hud_bg = pygame.Surface(HUD_RECT.size, pygame.SRCALPHA)
+    pygame.draw.rect(hud_bg, (0, 0, 0, 150), ((0, 0), HUD_RECT.size), border_radius=10)
+    return hud_bg
+
+def alpha_bucket(ratio):
+    """Kvantiserer en verdi i [0, 1] til et av SPRITE_ALPHA_BUCKETS nivåer."""
+    return max(0, min(SPRITE_ALPHA_BUCKETS, int(ratio * SPRITE_ALPHA_BUCKETS + 0.5)))
+
+def draw_gradient_background(surface=None):
+    """Tegner gradient-bakgrunnen fra cachen."""
+    surface = surface or screen
+    surface.blit(static_layers.get(surface.get_size(), with_grid=False), (0, 0))
 
 def draw_text(surf, text, font, color, pos):
-    text_surface = font.render(text, True, color)
+    text_surface = text_cache.render(font, text, color)
     rect = text_surface.get_rect(center=pos)
     surf.blit(text_surface, rect)
 
-async def get_name_input():
-    """Får navn fra brukeren via tastaturinput."""
+def cursor_visible(now=None):
+    """Om den blinkende cursoren skal vises nå."""
+    now = time.perf_counter() if now is None else now
+    return int(now / CURSOR_BLINK_INTERVAL) % 2 == 0
+
+async def get_name_input(scheduler):
+    """Får navn fra brukeren via tastaturinput.
+
+    Skjermen tegnes bare når navnet endres eller cursoren blinker; ellers
+    venter den på neste tastetrykk uten å bruke CPU.
+    """
     name = ""
     input_active = True
+    shown = None
     
     while input_active:
-        for event in pygame.event.get():
+        now = time.perf_counter()
+        state = (name, cursor_visible(now))
+        if state != shown:
+            draw_name_input(*state)
+            backend.present_screen()
+            shown = state
+        
+        # Vent på tastetrykk, men ikke lenger enn til cursoren skal blinke
+        next_blink = CURSOR_BLINK_INTERVAL - now % CURSOR_BLINK_INTERVAL
+        for event in await scheduler.wait_events(next_blink):
             if event.type == pygame.QUIT:
                 return None
             if event.type == pygame.KEYDOWN:
@@ -129,490 +506,1086 @@ async def get_name_input():
                     if event.unicode.isalnum() or event.unicode in [' ', '-', '_']:
                         if len(name) < 15:  # Maks 15 tegn
                             name += event.unicode
-        
-        draw_gradient_background()
-        
-        # Tegn bakgrunn for input-boksen
-        input_bg = pygame.Surface((400, 200), pygame.SRCALPHA)
-        pygame.draw.rect(input_bg, (0, 0, 0, 200), (0, 0, 400, 200), border_radius=15)
-        pygame.draw.rect(input_bg, (100, 100, 100, 100), (0, 0, 400, 200), width=2, border_radius=15)
-        screen.blit(input_bg, (SCREEN_WIDTH/2 - 200, SCREEN_HEIGHT/2 - 100))
-        
-        # Tekst
-        name_text = game_font.render("Skriv inn navn:", True, COLOR_TEXT)
-        screen.blit(name_text, (SCREEN_WIDTH/2 - name_text.get_width()/2, SCREEN_HEIGHT/2 - 50))
-        
-        # Navn med blinkende cursor
-        cursor = "_" if int(time.time() * 2) % 2 == 0 else " "
-        name_display = name + cursor
-        name_input_text = game_font.render(name_display, True, (255, 255, 100))
-        screen.blit(name_input_text, (SCREEN_WIDTH/2 - name_input_text.get_width()/2, SCREEN_HEIGHT/2))
-        
-        hint_text = small_font.render("Trykk ENTER for å lagre", True, (150, 150, 150))
-        screen.blit(hint_text, (SCREEN_WIDTH/2 - hint_text.get_width()/2, SCREEN_HEIGHT/2 + 40))
-        
-        pygame.display.update()
-        await asyncio.sleep(0)
     
     return name if name else "Spiller"
 
-# --- HOVEDKLASSEN ---
+def _build_input_background():
+    input_bg = pygame.Surface((400, 200), pygame.SRCALPHA)
+    pygame.draw.rect(input_bg, (0, 0, 0, 200), (0, 0, 400, 200), border_radius=15)
+    pygame.draw.rect(input_bg, (100, 100, 100, 100), (0, 0, 400, 200), width=2, border_radius=15)
+    return input_bg
 
-class Particle:
-    """Partikkel for visuelle effekter."""
-    def __init__(self, x, y, color, velocity):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.vx, self.vy = velocity
-        self.life = 1.0
-        self.size = random.randint(3, 6)
+def _build_leaderboard_background():
+    list_bg = pygame.Surface((650, 500), pygame.SRCALPHA)
+    pygame.draw.rect(list_bg, (0, 0, 0, 200), (0, 0, 650, 500), border_radius=15)
+    pygame.draw.rect(list_bg, (255, 215, 0, 100), (0, 0, 650, 500), width=2, border_radius=15)
+    return list_bg
+
+def draw_name_input(name, show_cursor=True):
+    """Tegner navneskjermen med navnet skrevet så langt."""
+    draw_gradient_background()
+    
+    # Tegn bakgrunn for input-boksen
+    screen.blit(sprite_cache.get('input_bg', _build_input_background),
+                (SCREEN_WIDTH/2 - 200, SCREEN_HEIGHT/2 - 100))
     
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.life -= 0.05
-        self.vx *= 0.95
-        self.vy *= 0.95
+    # Tekst
+    name_text = text_cache.render(game_font, "Skriv inn navn:", COLOR_TEXT)
+    screen.blit(name_text, (SCREEN_WIDTH/2 - name_text.get_width()/2, SCREEN_HEIGHT/2 - 50))
     
-    def draw(self, surface):
-        if self.life > 0:
-            alpha = int(255 * self.life)
-            color_with_alpha = (*self.color[:3], alpha)
-            size = int(self.size * self.life)
-            if size > 0:
-                glow_surf = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-                pygame.draw.circle(glow_surf, color_with_alpha, (size, size), size)
-                surface.blit(glow_surf, (self.x - size, self.y - size), 
-                            special_flags=pygame.BLEND_ALPHA_SDL2)
-
-class Food:
-    """Mat-objekt med type, posisjon og timer."""
-    def __init__(self, x, y, food_type):
-        self.x = x
-        self.y = y
-        self.food_type = food_type
-        self.timer = 5.0  # 5 sekunder før maten forsvinner
-        self.pulse = 0.0
+    # Navn med blinkende cursor
+    cursor = "_" if show_cursor else " "
+    name_display = name + cursor
+    name_input_text = text_cache.render(game_font, name_display, (255, 255, 100))
+    screen.blit(name_input_text, (SCREEN_WIDTH/2 - name_input_text.get_width()/2, SCREEN_HEIGHT/2))
     
+    hint_text = text_cache.render(small_font, "Trykk ENTER for å lagre", COLOR_HINT)
+    screen.blit(hint_text, (SCREEN_WIDTH/2 - hint_text.get_width()/2, SCREEN_HEIGHT/2 + 40))
+
+class DirtyRectRenderer:
+    """Holder styr på hvilke skjermområder som må tegnes og lastes opp.
+
+    Animerte områder (mat, partikler) huskes til neste frame slik at det de
+    etterlot seg også blir ryddet. Engangsendringer (hode, hale, HUD) gjelder
+    bare denne framen. Blir det skitne arealet for stort, ber plan() om full
+    omtegning i stedet.
+    """
+    def __init__(self, size, threshold=DIRTY_RECT_THRESHOLD):
+        self.screen_rect = pygame.Rect((0, 0), size)
+        self.threshold = threshold
+        self._previous = []
+        self._full_redraw = True
+        self.frames = 0
+        self.full_frames = 0
+        self.pushed_area = 0
+
+    def invalidate(self):
+        """Neste frame tegnes i sin helhet (f.eks. etter en annen skjerm)."""
+        self._full_redraw = True
+
+    @staticmethod
+    def _merge(rects):
+        merged = []
+        for rect in rects:
+            for i, other in enumerate(merged):
+                if rect.colliderect(other):
+                    merged[i] = other.union(rect)
+                    break
+            else:
+                merged.append(rect)
+        return merged
+
+    def plan(self, moving, changed):
+        """Returnerer listen av områder som skal tegnes, eller None for full omtegning."""
+        self.frames += 1
+        rects = [r.clip(self.screen_rect) for r in self._previous + moving + changed]
+        self._previous = moving
+        rects = self._merge([r for r in rects if r.width and r.height])
+        area = sum(r.width * r.height for r in rects)
+        if self._full_redraw or area > self.threshold * self.screen_rect.width * self.screen_rect.height:
+            self._full_redraw = False
+            self.full_frames += 1
+            self.pushed_area += self.screen_rect.width * self.screen_rect.height
+            return None
+        self.pushed_area += area
+        return rects
+
+class Camera:
+    """Utsnittet av verden som vises på skjermen, i piksler.
+
+    Kameraet følger hodet med en dødsone: det flytter seg først når hodet
+    kommer nærmere skjermkanten enn CAMERA_MARGIN celler, og alltid i hele
+    celler, så rutenett og sprites havner på de samme pikslene. Det går
+    aldri utenfor verden. Er verden ikke større enn skjermen, står det stille.
+    """
+    def __init__(self, world_cols, world_rows, view_size, margin=CAMERA_MARGIN):
+        self.world_width = world_cols * BLOCK_SIZE
+        self.world_height = world_rows * BLOCK_SIZE
+        self.view_width, self.view_height = view_size
+        self.margin = margin * BLOCK_SIZE
+        self.x = 0
+        self.y = 0
+        self.moved = False
+
+    @property
+    def scrolls(self):
+        return self.world_width > self.view_width or self.world_height > self.view_height
+
+    @property
+    def offset(self):
+        return self.x, self.y
+
+    def _clamp(self, x, y):
+        x = max(0, min(x, self.world_width - self.view_width))
+        y = max(0, min(y, self.world_height - self.view_height))
+        return x - x % BLOCK_SIZE, y - y % BLOCK_SIZE
+
+    def _move_to(self, x, y):
+        x, y = self._clamp(x, y)
+        self.moved = (x, y) != (self.x, self.y)
+        self.x, self.y = x, y
+
+    def center_on(self, col, row):
+        """Plasserer kameraet med cellen i midten."""
+        self._move_to(col * BLOCK_SIZE - self.view_width // 2, row * BLOCK_SIZE - self.view_height // 2)
+
+    def follow(self, col, row):
+        """Flytter kameraet hvis cellen er kommet inn i margen. Setter self.moved."""
+        left, top = col * BLOCK_SIZE, row * BLOCK_SIZE
+        x, y = self.x, self.y
+        if left < x + self.margin:
+            x = left - self.margin
+        elif left + BLOCK_SIZE > x + self.view_width - self.margin:
+            x = left + BLOCK_SIZE - self.view_width + self.margin
+        if top < y + self.margin:
+            y = top - self.margin
+        elif top + BLOCK_SIZE > y + self.view_height - self.margin:
+            y = top + BLOCK_SIZE - self.view_height + self.margin
+        self._move_to(x, y)
+
+# --- HOVEDKLASSEN ---
+
+class ParticleSystem:
+    """Partikkelmotor med forhåndsallokerte arrays (struct-of-arrays).
+
+    Partiklene lagres i faste arrays med en friliste, så det blir ingen
+    allokering per partikkel. Med NumPy oppdateres alle i ett vektorisert
+    pass via views på de samme bufferne; uten NumPy brukes en enkel løkke.
+    Tegning skjer med ferdige sirkel-sprites per farge, størrelse og alpha.
+    """
+    def __init__(self, capacity=PARTICLE_CAPACITY):
+        self.capacity = capacity
+        self._x = array('d', bytes(8 * capacity))
+        self._y = array('d', bytes(8 * capacity))
+        self._vx = array('d', bytes(8 * capacity))
+        self._vy = array('d', bytes(8 * capacity))
+        self._life = array('d', bytes(8 * capacity))
+        self._size = array('B', bytes(capacity))
+        self._color = array('H', bytes(2 * capacity))
+        self._alive = bytearray(capacity)
+        self._free = list(range(capacity - 1, -1, -1))
+        self._high = 0  # Én forbi høyeste brukte indeks
+        self._palette = []
+        self._palette_index = {}
+        self.sprites = SpriteCache(max_size=1024)
+        self.dropped = 0  # Partikler som ikke fikk plass
+        if np is not None:
+            self._np = {name: np.frombuffer(getattr(self, '_' + name), dtype=np.float64)
+                        for name in ('x', 'y', 'vx', 'vy', 'life')}
+            self._np['alive'] = np.frombuffer(self._alive, dtype=np.uint8)
+        else:
+            self._np = None
+
+    def __len__(self):
+        return self.capacity - len(self._free)
+
+    def clear(self):
+        """Fjerner alle partikler."""
+        self._alive[:] = bytes(self.capacity)
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._high = 0
+
+    def _color_id(self, color):
+        color = tuple(color[:3])
+        color_id = self._palette_index.get(color)
+        if color_id is None:
+            color_id = len(self._palette)
+            self._palette.append(color)
+            self._palette_index[color] = color_id
+        return color_id
+
+    def emit_one(self, x, y, color, vx, vy, size, life=1.0):
+        """Legger til én partikkel. Returnerer False hvis motoren er full."""
+        if not self._free:
+            self.dropped += 1
+            return False
+        i = self._free.pop()
+        self._x[i] = x
+        self._y[i] = y
+        self._vx[i] = vx
+        self._vy[i] = vy
+        self._life[i] = life
+        self._size[i] = size
+        self._color[i] = self._color_id(color)
+        self._alive[i] = 1
+        if i >= self._high:
+            self._high = i + 1
+        return True
+
+    def emit(self, x, y, color, count, speed=(30, 75), size=(3, 6), rng=random):
+        """Sender ut en sirkulær sky av partikler fra (x, y).
+
+        Brukes av alle effekter (mat, eksplosjoner, spor). Returnerer antall
+        partikler som faktisk fikk plass.
+        """
+        color_id = self._color_id(color)
+        if count > len(self._free):
+            self.dropped += count - len(self._free)
+            count = len(self._free)
+        for _ in range(count):
+            angle = rng.uniform(0, 2 * math.pi)
+            velocity = rng.uniform(*speed)
+            i = self._free.pop()
+            self._x[i] = x
+            self._y[i] = y
+            self._vx[i] = math.cos(angle) * velocity
+            self._vy[i] = math.sin(angle) * velocity
+            self._life[i] = 1.0
+            self._size[i] = rng.randint(*size)
+            self._color[i] = color_id
+            self._alive[i] = 1
+            if i >= self._high:
+                self._high = i + 1
+        return count
+
     def update(self, dt):
-        """Oppdater timer og animasjon."""
-        self.timer -= dt
-        self.pulse += 0.15
-        return self.timer > 0
+        """Flytter alle levende partikler dt sekunder og frigjør de som er ferdige."""
+        n = self._high
+        if n == 0:
+            return
+        decay = PARTICLE_DECAY * dt
+        drag = PARTICLE_DRAG ** dt
+        if self._np is not None:
+            v = self._np
+            v['x'][:n] += v['vx'][:n] * dt
+            v['y'][:n] += v['vy'][:n] * dt
+            v['life'][:n] -= decay
+            v['vx'][:n] *= drag
+            v['vy'][:n] *= drag
+            died = np.flatnonzero(v['alive'][:n] & (v['life'][:n] <= 0))
+            if died.size:
+                v['alive'][died] = 0
+                self._free.extend(died.tolist())
+        else:
+            x, y, vx, vy, life, alive = self._x, self._y, self._vx, self._vy, self._life, self._alive
+            for i in range(n):
+                if not alive[i]:
+                    continue
+                x[i] += vx[i] * dt
+                y[i] += vy[i] * dt
+                life[i] -= decay
+                vx[i] *= drag
+                vy[i] *= drag
+                if life[i] <= 0:
+                    alive[i] = 0
+                    self._free.append(i)
+        while self._high and not self._alive[self._high - 1]:
+            self._high -= 1
+
+    def bounds(self, offset=(0, 0)):
+        """Rektangel (på skjermen) rundt alle levende partikler, eller None hvis ingen."""
+        x, y, size, alive = self._x, self._y, self._size, self._alive
+        left = top = math.inf
+        right = bottom = -math.inf
+        for i in range(self._high):
+            if alive[i]:
+                r = size[i]
+                left = min(left, x[i] - r)
+                top = min(top, y[i] - r)
+                right = max(right, x[i] + r)
+                bottom = max(bottom, y[i] + r)
+        if left is math.inf:
+            return None
+        return pygame.Rect(int(left - offset[0]) - 1, int(top - offset[1]) - 1,
+                           int(right - left) + 3, int(bottom - top) + 3)
+
+    def _build_sprite(self, color, size, bucket):
+        sprite = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+        alpha = int(255 * bucket / SPRITE_ALPHA_BUCKETS)
+        pygame.draw.circle(sprite, (*color, alpha), (size, size), size)
+        return sprite
+
+    def draw(self, surface, offset=(0, 0)):
+        """Tegner alle levende partikler innenfor skjermen med én batchet blits().
+
+        Partiklene ligger i verdenskoordinater; offset er kameraets posisjon.
+        """
+        blits = []
+        palette, sprites = self._palette, self.sprites
+        x, y, life, size, color, alive = (self._x, self._y, self._life,
+                                          self._size, self._color, self._alive)
+        offset_x, offset_y = offset
+        width, height = surface.get_size()
+        for i in range(self._high):
+            if not alive[i]:
+                continue
+            current_size = int(size[i] * life[i])
+            if current_size <= 0:
+                continue
+            left = x[i] - current_size - offset_x
+            top = y[i] - current_size - offset_y
+            if left >= width or top >= height or left + 2 * current_size <= 0 or top + 2 * current_size <= 0:
+                continue  # Utenfor skjermen
+            bucket = alpha_bucket(life[i])
+            key = (color[i], current_size, bucket)
+            sprite = sprites.get(key, lambda: self._build_sprite(palette[color[i]], current_size, bucket))
+            blits.append((sprite, (left, top), None, pygame.BLEND_ALPHA_SDL2))
+        if blits:
+            surface.blits(blits, doreturn=False)
+
+# --- MAT ---
+# Maten selv (celle, type, timer) ligger i engine.py; her tegnes den bare.
+
+def _build_food_glow(glow_color, food_size, bucket, layers=5):
+    timer_ratio = bucket / SPRITE_ALPHA_BUCKETS
+    glow_surf = pygame.Surface((BLOCK_SIZE * 3, BLOCK_SIZE * 3), pygame.SRCALPHA)
+    for i in range(layers):
+        alpha = int(80 - i * 15 * timer_ratio)  # Fade ut når timeren går ned
+        if alpha < 0:
+            alpha = 0
+        size = food_size + i * 4
+        offset = (BLOCK_SIZE * 3 - size) // 2
+        pygame.draw.rect(glow_surf, (*glow_color, alpha),
+                       [offset, offset, size, size], border_radius=8)
+    return glow_surf
+
+def _build_food(food_color, food_size, bucket):
+    alpha = int(255 * bucket / SPRITE_ALPHA_BUCKETS)
+    food_offset = (BLOCK_SIZE - food_size) // 2
+    food_surf = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE), pygame.SRCALPHA)
+    pygame.draw.rect(food_surf, (*food_color, alpha),
+                    [food_offset, food_offset, food_size, food_size], border_radius=6)
+    return food_surf
+
+def _build_food_label(score):
+    """Verditekst med mørk bakgrunn, satt sammen til én flate."""
+    value_text = text_cache.render(small_font, str(score), (255, 255, 255))
+    width, height = value_text.get_width() + 4, value_text.get_height() + 2
+    label = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.rect(label, (0, 0, 0, 180), (0, 0, width, height), border_radius=3)
+    label.blit(value_text, (2, 1))
+    return label
+
+def food_bounds(food, offset=(0, 0)):
+    """Området (på skjermen) som glød, verdi og timer-bar tegnes innenfor."""
+    return pygame.Rect((food.col - 1) * BLOCK_SIZE - offset[0], (food.row - 1) * BLOCK_SIZE - offset[1],
+                       BLOCK_SIZE * 3, BLOCK_SIZE * 3)
+
+def draw_food(surface, food, elapsed=0.0, offset=(0, 0), quality=QUALITY_TIERS[0]):
+    """Tegn maten med verdi og timer.
+
+    elapsed er tiden siden siste simuleringssteg, så timer og puls går jevnt
+    mellom stegene. offset er kameraets posisjon i verden. quality er
+    kvalitetsnivået (antall glød-lag og om verdien vises).
+    """
+    food_data = FOOD_TYPES[food.food_type]
+    food_color = food_data['color']
+    glow_color = food_data['glow']
+    score = food_data['score']
+    x = food.col * BLOCK_SIZE - offset[0]
+    y = food.row * BLOCK_SIZE - offset[1]
+    timer = max(0.0, food.timer - elapsed)
+    timer_progress = timer / FOOD_LIFETIME
     
-    def draw(self, surface):
-        """Tegn maten med verdi og timer."""
-        food_data = FOOD_TYPES[self.food_type]
-        food_color = food_data['color']
-        glow_color = food_data['glow']
-        score = food_data['score']
-        
-        # Pulsing-effekt
-        pulse_size = math.sin(self.pulse) * 0.2 + 1.0
-        food_size = int(BLOCK_SIZE * pulse_size)
-        food_offset = (BLOCK_SIZE - food_size) // 2
-        
-        # Glød-effekt
-        glow_surf = pygame.Surface((BLOCK_SIZE * 3, BLOCK_SIZE * 3), pygame.SRCALPHA)
-        for i in range(5):
-            alpha = int(80 - i * 15 * (self.timer / 5.0))  # Fade ut når timeren går ned
-            if alpha < 0:
-                alpha = 0
-            size = food_size + i * 4
-            offset = (BLOCK_SIZE * 3 - size) // 2
-            pygame.draw.rect(glow_surf, (*glow_color, alpha), 
-                           [offset, offset, size, size], border_radius=8)
-        surface.blit(glow_surf, (self.x - BLOCK_SIZE, self.y - BLOCK_SIZE),
+    # Pulsing-effekt (følger timeren; kvantisert til pikselstørrelse, som er det som faktisk synes)
+    pulse = (FOOD_LIFETIME - timer) * FOOD_PULSE_SPEED
+    pulse_size = math.sin(pulse) * 0.2 + 1.0
+    food_size = int(BLOCK_SIZE * pulse_size)
+    bucket = alpha_bucket(timer_progress)
+    
+    # Glød-effekt
+    layers = quality['food_glow_layers']
+    if layers:
+        glow_surf = sprite_cache.get(('food_glow', food.food_type, food_size, bucket, layers),
+                                     lambda: _build_food_glow(glow_color, food_size, bucket, layers))
+        surface.blit(glow_surf, (x - BLOCK_SIZE, y - BLOCK_SIZE),
                    special_flags=pygame.BLEND_ALPHA_SDL2)
-        
-        # Selve maten
-        alpha = int(255 * (self.timer / 5.0))
-        food_surf = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE), pygame.SRCALPHA)
-        pygame.draw.rect(food_surf, (*food_color, alpha), 
-                        [food_offset, food_offset, food_size, food_size], border_radius=6)
-        surface.blit(food_surf, (self.x, self.y), special_flags=pygame.BLEND_ALPHA_SDL2)
-        
-        # Vis verdi over maten
-        value_text = small_font.render(str(score), True, (255, 255, 255))
-        value_bg = pygame.Surface((value_text.get_width() + 4, value_text.get_height() + 2), pygame.SRCALPHA)
-        pygame.draw.rect(value_bg, (0, 0, 0, 180), (0, 0, value_text.get_width() + 4, value_text.get_height() + 2), border_radius=3)
-        surface.blit(value_bg, (self.x + BLOCK_SIZE // 2 - value_text.get_width() // 2 - 2, 
-                               self.y - value_text.get_height() - 5))
-        surface.blit(value_text, (self.x + BLOCK_SIZE // 2 - value_text.get_width() // 2, 
-                                 self.y - value_text.get_height() - 4))
-        
-        # Vis timer-bar under maten
-        timer_width = BLOCK_SIZE
-        timer_height = 3
-        timer_progress = self.timer / 5.0
-        timer_x = self.x
-        timer_y = self.y + BLOCK_SIZE + 2
-        
-        # Bakgrunn for timer
-        pygame.draw.rect(surface, (50, 50, 50), 
-                        [timer_x, timer_y, timer_width, timer_height])
-        # Timer-farge (rød når lite tid igjen, grønn når mye)
-        if timer_progress > 0.5:
-            timer_color = (0, 255, 0)
-        elif timer_progress > 0.25:
-            timer_color = (255, 255, 0)
+    
+    # Selve maten
+    food_surf = sprite_cache.get(('food', food.food_type, food_size, bucket),
+                                 lambda: _build_food(food_color, food_size, bucket))
+    surface.blit(food_surf, (x, y), special_flags=pygame.BLEND_ALPHA_SDL2)
+    
+    # Vis verdi over maten
+    if quality['food_labels']:
+        label = sprite_cache.get(('food_label', score), lambda: _build_food_label(score))
+        surface.blit(label, (x + BLOCK_SIZE // 2 - label.get_width() // 2,
+                             y - label.get_height() - 5))
+    
+    # Vis timer-bar under maten
+    timer_width = BLOCK_SIZE
+    timer_height = 3
+    timer_y = y + BLOCK_SIZE + 2
+    
+    # Bakgrunn for timer
+    surface.fill((50, 50, 50), (x, timer_y, timer_width, timer_height))
+    # Timer-farge (rød når lite tid igjen, grønn når mye)
+    if timer_progress > 0.5:
+        timer_color = (0, 255, 0)
+    elif timer_progress > 0.25:
+        timer_color = (255, 255, 0)
+    else:
+        timer_color = (255, 0, 0)
+    surface.fill(timer_color, (x, timer_y, int(timer_width * timer_progress), timer_height))
+
+# --- SLANGE ---
+
+def _build_segment_glow(is_head, layers):
+    glow_surf = pygame.Surface((BLOCK_SIZE * 2, BLOCK_SIZE * 2), pygame.SRCALPHA)
+    if is_head:
+        # Ekstra glød på hodet
+        color, alpha_start, grow, radius = COLOR_SNAKE_HEAD, 60, 3, 5
+    else:
+        # Mindre glød på kroppen
+        color, alpha_start, grow, radius = COLOR_SNAKE, 40, 2, 4
+    for i in range(layers):
+        alpha = alpha_start - i * 15
+        size = BLOCK_SIZE + i * grow
+        offset = (BLOCK_SIZE * 2 - size) // 2
+        pygame.draw.rect(glow_surf, (*color[:3], alpha),
+                       [offset, offset, size, size], border_radius=radius)
+    return glow_surf
+
+def _build_segment(is_head):
+    """Segment med lysere kant, uten øyne (de avhenger av retning)."""
+    color = COLOR_SNAKE_HEAD if is_head else COLOR_SNAKE
+    segment_surf = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE), pygame.SRCALPHA)
+    pygame.draw.rect(segment_surf, color, [0, 0, BLOCK_SIZE, BLOCK_SIZE], border_radius=4)
+    lighter_color = tuple(min(255, c + 30) for c in color)
+    pygame.draw.rect(segment_surf, lighter_color, [0, 0, BLOCK_SIZE, BLOCK_SIZE],
+                   width=2, border_radius=4)
+    return segment_surf
+
+def _build_eye():
+    """Svart øye med et hvitt lyspunkt, sentrert i en 7x7-flate."""
+    eye = pygame.Surface((7, 7), pygame.SRCALPHA)
+    pygame.draw.circle(eye, (0, 0, 0), (3, 3), 3)
+    pygame.draw.circle(eye, (255, 255, 255), (3, 3), 1)
+    return eye
+
+def snake_sprites(quality=QUALITY_TIERS[0]):
+    """(kroppsglød, hodeglød, kropp, hode) fra sprite-cachen.
+
+    En glød er None når kvalitetsnivået ikke har glød-lag for den.
+    """
+    body_layers, head_layers = quality['body_glow_layers'], quality['head_glow_layers']
+    body_glow = head_glow = None
+    if body_layers:
+        body_glow = sprite_cache.get(('snake_glow', False, body_layers), lambda: _build_segment_glow(False, body_layers))
+    if head_layers:
+        head_glow = sprite_cache.get(('snake_glow', True, head_layers), lambda: _build_segment_glow(True, head_layers))
+    return (body_glow, head_glow,
+            sprite_cache.get(('snake_segment', False), lambda: _build_segment(False)),
+            sprite_cache.get(('snake_segment', True), lambda: _build_segment(True)))
+
+class SnakeLayer:
+    """Bakgrunnen med slangekroppen (uten hodet) ferdig tegnet, på skjermen.
+
+    Laget beholdes mellom framene. Etter et flytt tegnes bare områdene rundt
+    cellene som endret seg (gammelt hode som ble kropp, hale som ble borte):
+    bakgrunnen kopieres inn fra cachen, og glød og kropp for segmentene i
+    nærheten stemples på nytt, klippet til området. Kostnaden per flytt er
+    dermed konstant, uansett hvor lang slangen er. Når kameraet flytter
+    seg sidelengs, skrolles laget og bare stripen som kommer inn tegnes.
+    Gradienten står fast på skjermen, så flytter kameraet seg opp eller
+    ned, bygges hele laget på nytt, som ved nytt spill og ny skjermstørrelse.
+    """
+    def __init__(self):
+        self.surface = None
+        self.offset = (0, 0)
+        self.quality = QUALITY_TIERS[0]  # Settes av spillet; invalidate() etter bytte
+        self._changes = None  # Områder tegnet om siden take_changes() (None: hele)
+        self._background = None
+        self._phase = (0, 0)
+        # Tellere for diagnostikk
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    def invalidate(self):
+        self.surface = None
+
+    def take_changes(self):
+        """Områdene som er tegnet om siden forrige kall, eller None hvis hele laget er nytt.
+
+        Brukes av backender som må laste opp laget (som tekstur).
+        """
+        changes, self._changes = self._changes, []
+        return changes
+
+    def sync(self, grid, head, changed_cells, offset, scrolls):
+        """Oppdaterer laget til slangen og kameraet slik de er nå."""
+        width, height = screen.get_size()
+        if scrolls:
+            background = static_layers.get((width + GRID_STEP, height + GRID_STEP), with_grid=True)
+            phase = (offset[0] % GRID_STEP, offset[1] % GRID_STEP)
         else:
-            timer_color = (255, 0, 0)
-        pygame.draw.rect(surface, timer_color, 
-                        [timer_x, timer_y, int(timer_width * timer_progress), timer_height])
+            background = static_layers.get((width, height), with_grid=True)
+            phase = (0, 0)
+        dx, dy = offset[0] - self.offset[0], offset[1] - self.offset[1]
+        if (self.surface is None or self.surface.get_size() != (width, height)
+                or background is not self._background or dy or abs(dx) >= width):
+            self._rebuild(grid, head, offset, background, phase)
+            return
+        self.offset = offset
+        self._phase = phase
+        if dx:
+            # Flytt innholdet og tegn bare stripen som kom inn på skjermen
+            self.surface.scroll(-dx, 0)
+            self._changes = None
+            self._refresh(pygame.Rect(width - dx if dx > 0 else 0, 0, abs(dx), height), grid, head)
+        shift = BLOCK_SIZE // 2
+        for col, row in changed_cells:
+            self._refresh(pygame.Rect(col * BLOCK_SIZE - shift - offset[0], row * BLOCK_SIZE - shift - offset[1],
+                                      BLOCK_SIZE * 2, BLOCK_SIZE * 2), grid, head)
+
+    def _rebuild(self, grid, head, offset, background, phase):
+        surface = pygame.Surface(screen.get_size())
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        self.surface = surface
+        self.offset = offset
+        self._background = background
+        self._phase = phase
+        self._refresh(surface.get_rect(), grid, head)
+        self._changes = None
+        self.rebuilds += 1
+
+    def _refresh(self, rect, grid, head):
+        """Tegner bakgrunn og kropp på nytt innenfor rect (skjermkoordinater)."""
+        surface = self.surface
+        rect = rect.clip(surface.get_rect())
+        if not rect:
+            return
+        x, y = self.offset
+        # Glød fra segmenter rett utenfor rect kan nå inn i den
+        body = [cell for cell in grid.snake_cells_in((rect.left + x) // BLOCK_SIZE - 1, (rect.top + y) // BLOCK_SIZE - 1,
+                                                     (rect.right + x) // BLOCK_SIZE + 1, (rect.bottom + y) // BLOCK_SIZE + 1)
+                if cell != head]
+        body_glow, _, body_surf, _ = snake_sprites(self.quality)
+        glow_x = BLOCK_SIZE // 2 + x
+        glow_y = BLOCK_SIZE // 2 + y
+        surface.set_clip(rect)
+        surface.blit(self._background, rect, rect.move(self._phase))
+        # All glød først, så kroppen over, som når hele slangen tegnes
+        if body_glow:
+            surface.blits([(body_glow, (col * BLOCK_SIZE - glow_x, row * BLOCK_SIZE - glow_y), None,
+                            pygame.BLEND_ALPHA_SDL2) for col, row in body], doreturn=False)
+        surface.blits([(body_surf, (col * BLOCK_SIZE - x, row * BLOCK_SIZE - y)) for col, row in body], doreturn=False)
+        surface.set_clip(None)
+        if self._changes is not None:
+            self._changes.append(rect)
+        self.refreshes += 1
+
+def _build_profile_overlay(profiler, quality):
+    """Tabell med p50/p95/p99 (ms) per fase, GC, allokeringer og kvalitetsnivå."""
+    overlay = pygame.Surface(PROFILE_OVERLAY_RECT.size, pygame.SRCALPHA)
+    pygame.draw.rect(overlay, (0, 0, 0, 190), ((0, 0), PROFILE_OVERLAY_RECT.size), border_radius=8)
+    stats = profiler.percentiles()
+    columns = (8, 110, 170, 230)
+    rows = [("fase", "p50", "p95", "p99")]
+    for name in PHASES + ('frame', 'gc'):
+        rows.append((name, *(f"{ms:.2f}" for ms in stats[name])))
+    y = 4
+    for i, row in enumerate(rows):
+        color = COLOR_HIGHSCORE if i == 0 or row[0] == 'frame' else COLOR_TEXT
+        for x, text in zip(columns, row):
+            overlay.blit(small_font.render(text, True, color), (x, y))
+        y += PROFILE_LINE_HEIGHT
+    pauses, longest = profiler.gc_pauses()
+    for summary in (f"netto blokker/frame {profiler.allocations():.0f}",
+                    f"gc-pauser {pauses} (maks {longest:.1f} ms)"):
+        overlay.blit(small_font.render(summary, True, COLOR_HINT), (columns[0], y))
+        y += PROFILE_LINE_HEIGHT
+    level = f"kvalitet {quality.name} (snitt {quality.average() * 1000.0:.1f} ms, {len(quality.history)} bytter)"
+    overlay.blit(small_font.render(level, True, COLOR_HINT), (columns[0], y))
+    return overlay
+
+# Piltaster til retninger i spillmotoren
+KEY_ACTIONS = {
+    pygame.K_UP: UP,
+    pygame.K_RIGHT: RIGHT,
+    pygame.K_DOWN: DOWN,
+    pygame.K_LEFT: LEFT,
+}
 
 class SnakeGame:
-    def __init__(self):
+    """Tegning, input og sanntid oppå SnakeEngine."""
+    def __init__(self, world_cols=WORLD_COLS, world_rows=WORLD_ROWS):
+        init_game()
+        self.particles = ParticleSystem()
+        self.engine = SnakeEngine(world_cols, world_rows)
+        self.camera = Camera(world_cols, world_rows, (SCREEN_WIDTH, SCREEN_HEIGHT))
+        # Dirty rects gir bare noe når backenden kan vise deler av skjermen
+        self.dirty_renderer = (DirtyRectRenderer((SCREEN_WIDTH, SCREEN_HEIGHT))
+                               if USE_DIRTY_RECTS and backend.partial_updates else None)
+        self.snake_layer = SnakeLayer()
+        self.turn_queue = TurnQueue(TURN_QUEUE_SIZE)
+        self.rewind = RewindBuffer(self.engine, REWIND_SECONDS, REWIND_KEYFRAME_INTERVAL)
+        self.scheduler = FrameScheduler(RENDER_FPS)
+        self.quality = QualityGovernor(QUALITY_BUDGET)
+        if QUALITY != 'auto':
+            self.quality.set_tier(QUALITY)
+        self.snake_layer.quality = self.quality.settings
+        self.profiler = FrameProfiler()
+        if PROFILE_ENABLED:
+            self.profiler.enable()
+        self._profile_overlay = None
+        self._profile_overlay_time = 0.0
+        self._warmup = warmup_assets()
         self.reset_game()
-        self.highscores = load_highscore()
-        self.highscore = self.highscores[0]["score"] if self.highscores else 0
-        self.particles = []
-        self.food_pulse = 0.0
-        self.animation_time = 0.0
+        startup.mark('game')
 
-    def reset_game(self):
+    # Spilltilstanden ligger i motoren
+    @property
+    def snake(self):
+        return self.engine.snake
+
+    @property
+    def grid(self):
+        return self.engine.grid
+
+    @property
+    def foods(self):
+        return self.engine.foods
+
+    @property
+    def score(self):
+        return self.engine.score
+
+    @property
+    def speed(self):
+        return self.engine.speed
+
+    def reset_game(self, seed=None):
+        # Hvert spill får sin egen seed, så det kan spilles av igjen fra replayet
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self.engine.reset(seed)
+        self.recorder = ReplayRecorder(seed, self.grid.cols, self.grid.rows)
+        self.rewind.clear()
+        self.practice = False  # Satt når spillet er spolt tilbake
+        self.camera.center_on(*self.snake[0])
+        self.turn_queue.clear()
+        self.effects_rng = random.Random(seed)  # Partikler, uavhengig av spillet
         self.game_over = False
         self.game_close = False
-        
-        # Startposisjon
-        self.x1 = SCREEN_WIDTH / 2
-        self.y1 = SCREEN_HEIGHT / 2
-        
-        self.x1_change = 0
-        self.y1_change = 0
-        
-        self.snake_list = []
-        self.length_of_snake = 1
-        self.speed = 15  # Starthastighet (FPS)
-        
-        self.score = 0
-        self.particles = []
-        self.food_pulse = 0.0
+        self._accumulator = 0.0  # Simuleringstid som ikke er brukt ennå
+        self._changed_cells = []  # Celler som endret seg denne framen
+        self._hud_state = None
+        self.snake_layer.invalidate()
+        if self.dirty_renderer:
+            self.dirty_renderer.invalidate()
+        self.particles.clear()
         self.animation_time = 0.0
-        self.foods = []  # Liste med mat-objekter
-        self.last_food_spawn = 0.0
-        self.food_spawn_interval = 2.0  # Spawn ny mat hver 2. sekund
         
         # Oppdater highscore-visningen
         self.highscores = load_highscore()
         self.highscore = self.highscores[0]["score"] if self.highscores else 0
-        
-        # Spawn første mat-objekter
-        for _ in range(2):  # Start med 2 mat-objekter
-            self.spawn_food()
-
-    def spawn_food(self):
-        """Spawn en ny mat på et tilfeldig sted."""
-        # Velg mattype basert på sannsynlighet
-        rand_val = random.randint(1, 100)
-        cumulative = 0
-        selected_type = 'normal'
-        
-        for f_type, data in FOOD_TYPES.items():
-            cumulative += data['chance']
-            if rand_val <= cumulative:
-                selected_type = f_type
-                break
-        
-        # Plasser maten slik at den passer i rutenettet
-        cols = (SCREEN_WIDTH - BLOCK_SIZE) // BLOCK_SIZE
-        rows = (SCREEN_HEIGHT - BLOCK_SIZE) // BLOCK_SIZE
-        
-        # Prøv å finne en posisjon som ikke kolliderer med slangen eller annen mat
-        max_attempts = 50
-        for _ in range(max_attempts):
-            foodx = round(random.randrange(0, cols) * BLOCK_SIZE)
-            foody = round(random.randrange(0, rows) * BLOCK_SIZE)
-            
-            # Sjekk kollisjon med slangen
-            collision = False
-            for segment in self.snake_list:
-                if segment[0] == foodx and segment[1] == foody:
-                    collision = True
-                    break
-            
-            # Sjekk kollisjon med annen mat
-            if not collision:
-                for food in self.foods:
-                    if food.x == foodx and food.y == foody:
-                        collision = True
-                        break
-            
-            if not collision:
-                self.foods.append(Food(foodx, foody, selected_type))
-                return
-        
-        # Hvis vi ikke fant en plass, spawn likevel (kan overlappe)
-        foodx = round(random.randrange(0, cols) * BLOCK_SIZE)
-        foody = round(random.randrange(0, rows) * BLOCK_SIZE)
-        self.foods.append(Food(foodx, foody, selected_type))
 
-    def play_step(self):
-        # Håndter input
+    async def play_frame(self):
+        """Venter på neste frame-frist uten å blokkere, og kjører framen."""
+        self.profiler.begin_frame()
+        frame_dt = await self.scheduler.next_frame()
+        return self.play_step(frame_dt)
+
+    def play_step(self, frame_dt=None):
+        """Én frame: input, faste simuleringssteg, effekter og tegning.
+
+        Uten frame_dt (verktøy og benchmark) begrenser clock.tick render-raten
+        og måler tiden siden forrige frame; ellers har play_frame() ventet.
+        """
+        profiler = self.profiler
+        if frame_dt is None:
+            profiler.begin_frame()
+            frame_dt = clock.tick(RENDER_FPS) / 1000.0
+        frame_dt = min(frame_dt, MAX_FRAME_TIME)
+        profiler.mark('tick_wait')
+        work_start = time.perf_counter()
+        
+        # Håndter input: svinger legges i kø og tas ut én per flytt
+        now = time.perf_counter()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return True # Avslutt programmet
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT and self.x1_change == 0:
-                    self.x1_change = -BLOCK_SIZE
-                    self.y1_change = 0
-                elif event.key == pygame.K_RIGHT and self.x1_change == 0:
-                    self.x1_change = BLOCK_SIZE
-                    self.y1_change = 0
-                elif event.key == pygame.K_UP and self.y1_change == 0:
-                    self.y1_change = -BLOCK_SIZE
-                    self.x1_change = 0
-                elif event.key == pygame.K_DOWN and self.y1_change == 0:
-                    self.y1_change = BLOCK_SIZE
-                    self.x1_change = 0
-
-        # Sjekk kollisjon med vegger
-        if self.x1 >= SCREEN_WIDTH or self.x1 < 0 or self.y1 >= SCREEN_HEIGHT or self.y1 < 0:
-            self.game_close = True
-
-        # Oppdater posisjon
-        self.x1 += self.x1_change
-        self.y1 += self.y1_change
-        
-        # Oppdater animasjonstid
-        self.animation_time += 0.1
-        dt = 1.0 / self.speed  # Delta time basert på FPS
-        
-        # Oppdater partikler
-        self.particles = [p for p in self.particles if p.life > 0]
-        for particle in self.particles:
-            particle.update()
+            if event.type == pygame.KEYDOWN and event.key in KEY_ACTIONS:
+                self.turn_queue.push(KEY_ACTIONS[event.key], now, self.engine.direction)
+            elif event.type == pygame.KEYDOWN and event.key == PROFILE_TOGGLE_KEY:
+                self.toggle_profiler()
+            elif event.type == pygame.KEYDOWN and event.key == PROFILE_EXPORT_KEY:
+                self.export_profile()
+            elif event.type == pygame.KEYDOWN and event.key == REWIND_KEY:
+                self.rewind_back(REWIND_STEP)
+        profiler.mark('events')
         
-        # Oppdater mat-objekter (fjern de som har gått ut på tid)
-        self.foods = [food for food in self.foods if food.update(dt)]
+        # Flytt slangen med fast tidssteg, uavhengig av render-raten
+        self._changed_cells = []
+        self._accumulator += frame_dt
+        steps = 0
+        while not self.game_close and self._accumulator >= 1.0 / self.speed:
+            self._accumulator -= 1.0 / self.speed
+            self.move_snake()
+            steps += 1
+            if steps == MAX_STEPS_PER_FRAME:
+                self._accumulator = 0.0  # Ikke prøv å ta igjen mer enn dette
+                break
+        self.camera.follow(*self.snake[0])
+        if self.camera.moved and self.dirty_renderer:
+            self.dirty_renderer.invalidate()  # Hele bildet flytter seg
+        profiler.mark('simulation')
         
-        # Spawn ny mat med jevne mellomrom (maks 5 mat-objekter samtidig)
-        self.last_food_spawn += dt
-        if self.last_food_spawn >= self.food_spawn_interval and len(self.foods) < 5:
-            self.spawn_food()
-            self.last_food_spawn = 0.0
+        self.update_effects(frame_dt)
+        profiler.mark('particles')
+        self.render()
         
-        # Tegn bakgrunn
-        draw_gradient_background()
-        draw_grid()
+        # Arbeidstiden (uten ventingen) styrer kvalitetsnivået
+        if self.quality.record(time.perf_counter() - work_start):
+            self.apply_quality()
+        if self._warmup is not None:
+            self.warm_up(work_start)
+        return False
 
-        # Tegn alle mat-objekter
-        for food in self.foods:
-            food.draw(screen)
-        
-        # Tegn partikler
-        for particle in self.particles:
-            particle.draw(screen)
+    def rewind_back(self, seconds):
+        """Spoler spillet tilbake omtrent seconds sekunder (øvingsmodus)."""
+        rewind = self.rewind
+        tick = max(rewind.oldest, self.engine.ticks - int(seconds * self.speed))
+        if tick >= self.engine.ticks:
+            return
+        rewind.restore(tick)
+        self.practice = True
+        self.game_close = self.engine.done
+        self.turn_queue.clear()
+        self._accumulator = 0.0
+        self.camera.center_on(*self.snake[0])
+        self.snake_layer.invalidate()
+        if self.dirty_renderer:
+            self.dirty_renderer.invalidate()
 
-        # Snake logikk
-        snake_head = [self.x1, self.y1]
-        self.snake_list.append(snake_head)
-        
-        if len(self.snake_list) > self.length_of_snake:
-            del self.snake_list[0]
+    def warm_up(self, frame_start):
+        """Kjører forhåndsrendring til framen har brukt WARMUP_BUDGET sekunder."""
+        for _ in self._warmup:
+            if time.perf_counter() - frame_start >= WARMUP_BUDGET:
+                return
+        self._warmup = None
+
+    def apply_quality(self):
+        """Tar i bruk et nytt kvalitetsnivå: kroppen i laget må tegnes på nytt."""
+        self.snake_layer.quality = self.quality.settings
+        self.snake_layer.invalidate()
+        if self.dirty_renderer:
+            self.dirty_renderer.invalidate()
+
+    def toggle_profiler(self):
+        """Slår profileringen og overlayet av eller på."""
+        self.profiler.toggle()
+        self._profile_overlay = None
+        if self.dirty_renderer:
+            self.dirty_renderer.invalidate()  # Overlayet må tegnes over eller bort
+
+    def export_profile(self):
+        """Skriver profilhistorikken til Chrome trace-JSON og CSV."""
+        if not self.profiler.history:
+            print("Ingen profildata ennå (slå på med F3)")
+            return
+        try:
+            self.profiler.export_chrome_trace(PROFILE_TRACE_FILE)
+            self.profiler.export_csv(PROFILE_CSV_FILE)
+        except OSError as e:
+            print(f"Kunne ikke eksportere profil: {e}")
+            return
+        print(f"📁 Profil eksportert til '{PROFILE_TRACE_FILE}' og '{PROFILE_CSV_FILE}'")
+
+    def draw_profile_overlay(self):
+        """Tegner overlayet med tider per fase (tallene oppdateres to ganger i sekundet)."""
+        now = time.perf_counter()
+        if self._profile_overlay is None or now - self._profile_overlay_time >= PROFILE_OVERLAY_REFRESH:
+            self._profile_overlay = _build_profile_overlay(self.profiler, self.quality)
+            self._profile_overlay_time = now
+        backend.blit(self._profile_overlay, PROFILE_OVERLAY_RECT.topleft)
 
-        # Sjekk kollisjon med seg selv
-        for x in self.snake_list[:-1]:
-            if x == snake_head:
-                self.game_close = True
+    def move_snake(self):
+        """Ett simuleringssteg i motoren, pluss effektene det utløser.
 
-        self.draw_snake()
-        self.draw_ui()
+        Tiden i spillet (mat-timere og spawning) går 1/speed per steg, som i
+        SnakeEngine.step(), slik at spillet er bestemt av seed og svinger.
+        """
+        # Nøyaktig én sving fra køen per flytt (motoren avviser snu rett bakover)
+        action = self.turn_queue.pop(time.perf_counter())
+        if action is not None and self.engine.turn(action):
+            self.recorder.record_turn(self.engine.ticks, action)
         
-        pygame.display.flip()  # Bruk flip() i stedet for update() for web
+        previous_head = self.snake[0]
+        dt = 1.0 / self.speed
+        self.engine.advance(dt)
+        eaten_food = self.engine.move()
+        self.rewind.record(dt, previous_head, eaten_food)
+        self.game_close = self.engine.done
+        self._changed_cells += (previous_head, self.snake[0])
+        if self.engine.vacated:
+            self._changed_cells.append(self.engine.vacated)
+        
+        particle_count = self.quality.settings['particles_per_food']
+        if eaten_food and particle_count:
+            # Lag partikler når mat spises
+            food_center_x = eaten_food.col * BLOCK_SIZE + BLOCK_SIZE // 2
+            food_center_y = eaten_food.row * BLOCK_SIZE + BLOCK_SIZE // 2
+            self.particles.emit(food_center_x, food_center_y, FOOD_TYPES[eaten_food.food_type]['color'], particle_count,
+                                rng=self.effects_rng)
 
-        # Sjekk om slangen spiser mat
-        eaten_food = None
-        for food in self.foods:
-            if self.x1 == food.x and self.y1 == food.y:
-                eaten_food = food
-                break
+    def update_effects(self, dt):
+        """Oppdaterer effektene som går i sanntid (partikler)."""
+        self.animation_time += dt
+        self.particles.update(dt)
+
+    def render(self):
+        """Tegner framen, enten i sin helhet eller bare de skitne områdene."""
+        rects = None
+        if self.dirty_renderer:
+            # Spill laget før use_backend() kan ha en backend som ikke viser deler av skjermen
+            assert backend.partial_updates, f"Backenden '{backend.name}' støtter ikke dirty rects"
+            rects = self.dirty_renderer.plan(self._moving_rects(), self._changed_rects())
         
-        if eaten_food:
-            props = FOOD_TYPES[eaten_food.food_type]
-            self.score += props['score']
-            self.speed += props['speed_mod']
+        profiler = self.profiler
+        camera = self.camera
+        offset = camera.offset
+        quality = self.quality.settings
+        # Kroppen ligger i laget; bare cellene som endret seg tegnes om
+        self.snake_layer.sync(self.grid, self.snake[0], self._changed_cells, offset, camera.scrolls)
+        backend.upload(self.snake_layer.surface, self.snake_layer.take_changes())
+        profiler.mark('snake')
+        if rects is None:
+            # Tegn bakgrunnen med slangekroppen fra laget
+            backend.blit(self.snake_layer.surface, (0, 0))
+            profiler.mark('background')
             
-            # Lag partikler når mat spises
-            food_center_x = eaten_food.x + BLOCK_SIZE // 2
-            food_center_y = eaten_food.y + BLOCK_SIZE // 2
-            for _ in range(15):
-                angle = random.uniform(0, 2 * math.pi)
-                speed = random.uniform(2, 5)
-                vx = math.cos(angle) * speed
-                vy = math.sin(angle) * speed
-                self.particles.append(Particle(food_center_x, food_center_y, 
-                                              props['color'], (vx, vy)))
+            # Tegn mat-objektene som er innenfor skjermen
+            screen_rect = pygame.Rect((0, 0), backend.get_size())
+            for food in self.foods:
+                if food_bounds(food, offset).colliderect(screen_rect):
+                    draw_food(backend, food, self._accumulator, offset, quality)
+            profiler.mark('foods')
             
-            # Fjern spist mat
-            self.foods.remove(eaten_food)
+            # Tegn partikler
+            self.particles.draw(backend, offset)
+            profiler.mark('particles')
             
-            # Sikre at farten ikke blir for lav eller ekstremt høy
-            self.speed = max(5, min(self.speed, 40))
+            self.draw_snake()
+            profiler.mark('snake')
+            self.draw_ui()
+            if profiler.enabled:
+                self.draw_profile_overlay()
+            profiler.mark('ui')
             
-            self.length_of_snake += 1
+            backend.present()
+            profiler.mark('flip')
+            return
+        
+        layer = self.snake_layer.surface
+        for rect in rects:
+            backend.set_clip(rect)
+            backend.blit(layer, rect, rect)
+            profiler.mark('background')
+            for food in self.foods:
+                if food_bounds(food, offset).colliderect(rect):
+                    draw_food(backend, food, self._accumulator, offset, quality)
+            profiler.mark('foods')
+            self.particles.draw(backend, offset)
+            profiler.mark('particles')
+            self.draw_snake()
+            profiler.mark('snake')
+            if rect.colliderect(HUD_RECT) or rect.colliderect(HUD_HIGH_RECT):
+                self.draw_ui()
+            if profiler.enabled and rect.colliderect(PROFILE_OVERLAY_RECT):
+                self.draw_profile_overlay()
+            profiler.mark('ui')
+        backend.set_clip(None)
+        backend.present(rects)
+        profiler.mark('flip')
 
-        # Viktig: clock.tick() må kalles for å oppdatere tiden
-        clock.tick(self.speed)
-        return False
+    def _segment_rect(self, col, row):
+        """Cellen pluss gløden rundt den, på skjermen."""
+        shift = BLOCK_SIZE // 2
+        return pygame.Rect(col * BLOCK_SIZE - shift - self.camera.x, row * BLOCK_SIZE - shift - self.camera.y,
+                           BLOCK_SIZE * 2, BLOCK_SIZE * 2)
+
+    def _moving_rects(self):
+        """Områder som animeres hver frame (mat og partikler)."""
+        offset = self.camera.offset
+        rects = [food_bounds(food, offset) for food in self.foods]
+        particle_rect = self.particles.bounds(offset)
+        if particle_rect:
+            rects.append(particle_rect)
+        return rects
+
+    def _changed_rects(self):
+        """Områder som endret seg denne framen: nye hoder, gamle hoder, hale og HUD."""
+        rects = [self._segment_rect(col, row) for col, row in self._changed_cells]
+        # Øynene følger styringen også mellom flyttene
+        rects.append(self._segment_rect(*self.snake[0]))
+        hud_state = (self.score, self.highscore)
+        if hud_state != self._hud_state:
+            self._hud_state = hud_state
+            rects.extend((HUD_RECT, HUD_HIGH_RECT))
+        if self.profiler.enabled:
+            rects.append(PROFILE_OVERLAY_RECT)  # Tegnes over det som endrer seg under
+        return rects
 
     def draw_snake(self):
-        # Tegn glød for hele slangen først
-        for index, segment in enumerate(self.snake_list):
-            if index == len(self.snake_list) - 1:
-                # Ekstra glød på hodet
-                glow_surf = pygame.Surface((BLOCK_SIZE * 2, BLOCK_SIZE * 2), pygame.SRCALPHA)
-                for i in range(4):
-                    alpha = 60 - i * 15
-                    size = BLOCK_SIZE + i * 3
-                    offset = (BLOCK_SIZE * 2 - size) // 2
-                    pygame.draw.rect(glow_surf, (*COLOR_SNAKE_HEAD[:3], alpha),
-                                   [offset, offset, size, size], border_radius=5)
-                screen.blit(glow_surf, (segment[0] - BLOCK_SIZE // 2, segment[1] - BLOCK_SIZE // 2),
-                           special_flags=pygame.BLEND_ALPHA_SDL2)
-            else:
-                # Mindre glød på kroppen
-                glow_surf = pygame.Surface((BLOCK_SIZE * 2, BLOCK_SIZE * 2), pygame.SRCALPHA)
-                for i in range(2):
-                    alpha = 40 - i * 15
-                    size = BLOCK_SIZE + i * 2
-                    offset = (BLOCK_SIZE * 2 - size) // 2
-                    pygame.draw.rect(glow_surf, (*COLOR_SNAKE[:3], alpha),
-                                   [offset, offset, size, size], border_radius=4)
-                screen.blit(glow_surf, (segment[0] - BLOCK_SIZE // 2, segment[1] - BLOCK_SIZE // 2),
-                           special_flags=pygame.BLEND_ALPHA_SDL2)
+        """Tegner hodet med glød og øyne; kroppen ligger ferdig i snake_layer."""
+        if not len(self.snake):
+            return
+        _, head_glow, body_surf, head_surf = snake_sprites(self.quality.settings)
+        head_col, head_row = self.snake[0]
+        offset_x, offset_y = self.camera.offset
+        shift = BLOCK_SIZE // 2
+        if head_glow:
+            backend.blit(head_glow, (head_col * BLOCK_SIZE - shift - offset_x, head_row * BLOCK_SIZE - shift - offset_y),
+                        special_flags=pygame.BLEND_ALPHA_SDL2)
         
-        # Tegn selve slangen
-        for index, segment in enumerate(self.snake_list):
-            # Hodet får en annen farge
-            color = COLOR_SNAKE_HEAD if index == len(self.snake_list)-1 else COLOR_SNAKE
-            
-            # Tegn segmentet med gradient-effekt
-            pygame.draw.rect(screen, color, [segment[0], segment[1], BLOCK_SIZE, BLOCK_SIZE], 
-                           border_radius=4)
-            
-            # Legg til en lysere kant
-            lighter_color = tuple(min(255, c + 30) for c in color)
-            pygame.draw.rect(screen, lighter_color, [segment[0], segment[1], BLOCK_SIZE, BLOCK_SIZE], 
-                           width=2, border_radius=4)
-            
-            # Tegn øyne på hodet for karakter
-            if index == len(self.snake_list)-1:
-                # Bestem øyenes retning basert på bevegelse
-                eye_offset_x = 0
-                eye_offset_y = 0
-                if self.x1_change > 0:  # Høyre
-                    eye_offset_x = 2
-                elif self.x1_change < 0:  # Venstre
-                    eye_offset_x = -2
-                elif self.y1_change > 0:  # Ned
-                    eye_offset_y = 2
-                elif self.y1_change < 0:  # Opp
-                    eye_offset_y = -2
-                
-                eye_radius = 3
-                left_eye = (segment[0] + 6 + eye_offset_x, segment[1] + 6 + eye_offset_y)
-                right_eye = (segment[0] + 14 + eye_offset_x, segment[1] + 6 + eye_offset_y)
-                pygame.draw.circle(screen, (0, 0, 0), left_eye, eye_radius)
-                pygame.draw.circle(screen, (0, 0, 0), right_eye, eye_radius)
-                # Legg til glød i øynene
-                pygame.draw.circle(screen, (255, 255, 255), left_eye, 1)
-                pygame.draw.circle(screen, (255, 255, 255), right_eye, 1)
+        # Gløden skal ligge under kroppen, så naboene stemples over den igjen
+        blits = [(body_surf, (col * BLOCK_SIZE - offset_x, row * BLOCK_SIZE - offset_y))
+                 for col, row in self.grid.snake_cells_in(head_col - 1, head_row - 1, head_col + 1, head_row + 1)
+                 if (col, row) != (head_col, head_row)]
+        head_pos = (head_col * BLOCK_SIZE - offset_x, head_row * BLOCK_SIZE - offset_y)
+        blits.append((head_surf, head_pos))
+        backend.blits(blits, doreturn=False)
+        
+        # Tegn øyne på hodet for karakter, retning basert på bevegelse
+        eye_offset_x = 0
+        eye_offset_y = 0
+        dx, dy = self.engine.direction
+        if dx > 0:  # Høyre
+            eye_offset_x = 2
+        elif dx < 0:  # Venstre
+            eye_offset_x = -2
+        elif dy > 0:  # Ned
+            eye_offset_y = 2
+        elif dy < 0:  # Opp
+            eye_offset_y = -2
+        
+        # Øyet (radius 3, med hvit glød) er en sprite, så det kan bli en tekstur
+        eye = sprite_cache.get('snake_eye', _build_eye)
+        eye_x = head_pos[0] + eye_offset_x + 3
+        eye_y = head_pos[1] + eye_offset_y + 3
+        backend.blits([(eye, (eye_x, eye_y)), (eye, (eye_x + 8, eye_y))], doreturn=False)
 
     def draw_ui(self):
         # Tegn bakgrunn for UI med glød
-        ui_bg = pygame.Surface((200, 60), pygame.SRCALPHA)
-        pygame.draw.rect(ui_bg, (0, 0, 0, 150), (0, 0, 200, 60), border_radius=10)
-        screen.blit(ui_bg, (5, 5))
+        backend.blit(sprite_cache.get('hud_bg', _build_hud_background), HUD_RECT.topleft)
         
-        # Score
-        score_text = game_font.render(f"Score: {self.score}", True, COLOR_TEXT)
-        screen.blit(score_text, [10, 10])
+        # Score (tallet settes sammen av cachede siffer)
+        x = text_cache.blit(backend, game_font, "Score: ", COLOR_TEXT, (10, 10))
+        text_cache.blit_number(backend, game_font, self.score, COLOR_TEXT, (x, 10))
         
         # Highscore
-        high_text = game_font.render(f"High: {self.highscore}", True, (255, 215, 0))
-        screen.blit(high_text, [SCREEN_WIDTH - 160, 10])
+        x = text_cache.blit(backend, game_font, "High: ", COLOR_HIGHSCORE, (SCREEN_WIDTH - 160, 10))
+        text_cache.blit_number(backend, game_font, self.highscore, COLOR_HIGHSCORE, (x, 10))
+
+    def draw_game_over(self, page=0, rank=None, total=0, is_new_record=False):
+        """Tegner game over-skjermen med én side av highscore-listen.
+
+        rank/total er plasseringen til scoren som ble lagret (None hvis den
+        ikke ble godtatt). Uten SQLite er total bare lengden på topp-listen,
+        så en score utenfor den får rank > total.
+        """
+        draw_gradient_background()
+        
+        # Bakgrunn for highscore-listen
+        screen.blit(sprite_cache.get('leaderboard_bg', _build_leaderboard_background), (SCREEN_WIDTH/2 - 325, 20))
+        
+        # Vis game over-melding øverst
+        gameover_text = text_cache.render(title_font, "GAME OVER", (255, 50, 50))
+        screen.blit(gameover_text, (SCREEN_WIDTH/2 - gameover_text.get_width()/2, 35))
+        
+        # Vis din score
+        score_display = f"Din Score: {self.score}"
+        score_text = text_cache.render(game_font, score_display, COLOR_TEXT)
+        screen.blit(score_text, (SCREEN_WIDTH/2 - score_text.get_width()/2, 85))
+        
+        if is_new_record:
+            record_text = text_cache.render(game_font, "NY HIGHSCORE!", COLOR_HIGHSCORE)
+            screen.blit(record_text, (SCREEN_WIDTH/2 - record_text.get_width()/2, 115))
+        elif rank is not None:
+            place = f"Plass {rank} av {total}" if rank <= total else f"Utenfor topp {total}"
+            place_text = text_cache.render(game_font, place, COLOR_TEXT)
+            screen.blit(place_text, (SCREEN_WIDTH/2 - place_text.get_width()/2, 115))
+        
+        # Vis én side av listen
+        first = page * LEADERBOARD_PAGE_SIZE + 1
+        if page == 0:
+            title = "TOPP 10 HIGHSCORES"
+        else:
+            title = f"PLASS {first}-{first + LEADERBOARD_PAGE_SIZE - 1}"
+        title_text = text_cache.render(game_font, title, COLOR_HIGHSCORE)
+        screen.blit(title_text, (SCREEN_WIDTH/2 - title_text.get_width()/2, 155))
+        
+        y_offset = 190
+        for i, entry in enumerate(self.highscores, first):
+            name_text = entry["name"][:15]  # Begrens navnlengde
+            score_text = str(entry["score"])
+            rank_text = f"{i}. {name_text:<15} {score_text:>6}"
+            
+            # Fargekode: 1. plass = gull, 2. plass = sølv, 3. plass = bronse
+            if i == 1:
+                color = COLOR_HIGHSCORE
+            elif i == 2:
+                color = (192, 192, 192)
+            elif i == 3:
+                color = (205, 127, 50)
+            else:
+                color = COLOR_TEXT
+            
+            rank_display = text_cache.render(game_font, rank_text, color)
+            screen.blit(rank_display, (SCREEN_WIDTH/2 - rank_display.get_width()/2, y_offset))
+            y_offset += 30
+        
+        hint_text = text_cache.render(small_font, GAME_OVER_HINT, COLOR_HINT)
+        screen.blit(hint_text, (SCREEN_WIDTH/2 - hint_text.get_width()/2, SCREEN_HEIGHT - 50))
 
     async def show_game_over(self):
         # Få navn fra brukeren
-        player_name = await get_name_input()
+        player_name = await get_name_input(self.scheduler)
         if player_name is None:
             return True  # Brukeren avbrøt
         
-        # Lagre highscore
-        self.highscores = save_highscore(player_name, self.score)
+        # Lagre highscore (godkjennes bare hvis replayet gir samme score)
+        if self.practice:
+            print("Øvingsspill (spolt tilbake): scoren lagres ikke")
+            saved = False
+        else:
+            replay = self.recorder.finish(self.engine.ticks, self.score)
+            saved = await save_highscore(player_name, self.score, replay)
+        rank, total = await run_blocking(highscore_rank, self.score)
+        page = 0
+        self.highscores = load_highscore(page)
         self.highscore = self.highscores[0]["score"] if self.highscores else 0
         
-        # Sjekk om dette er en ny rekord
-        is_new_record = len(self.highscores) > 0 and self.highscores[0]["name"] == player_name and self.highscores[0]["score"] == self.score
+        # Ny rekord hvis ingen i sesongen har mer (like scorer deler plass)
+        is_new_record = saved and rank == 1
         
+        # Skjermen står stille, så den tegnes bare når siden endres
+        redraw = True
         while self.game_close:
-            for event in pygame.event.get():
+            if redraw:
+                self.draw_game_over(page, rank if saved else None, total, is_new_record)
+                backend.present_screen()
+                redraw = False
+            
+            for event in await self.scheduler.wait_events():
+                if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                    redraw = True
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_q:
                         return True # Quit completely
                     elif event.key == pygame.K_c:
                         self.reset_game()
                         return False # Ikke quit, start på nytt
+                    elif event.key == pygame.K_DOWN:
+                        # Neste side, hvis det finnes flere plasser
+                        next_page = await run_blocking(load_highscore, page + 1)
+                        if next_page:
+                            page += 1
+                            self.highscores = next_page
+                            redraw = True
+                    elif event.key == pygame.K_UP and page > 0:
+                        page -= 1
+                        self.highscores = await run_blocking(load_highscore, page)
+                        redraw = True
                 if event.type == pygame.QUIT:
                     return True
-            
-            draw_gradient_background()
-            
-            # Bakgrunn for highscore-listen
-            list_bg = pygame.Surface((650, 500), pygame.SRCALPHA)
-            pygame.draw.rect(list_bg, (0, 0, 0, 200), (0, 0, 650, 500), border_radius=15)
-            pygame.draw.rect(list_bg, (255, 215, 0, 100), (0, 0, 650, 500), width=2, border_radius=15)
-            screen.blit(list_bg, (SCREEN_WIDTH/2 - 325, 20))
-            
-            # Vis game over-melding øverst
-            gameover_text = title_font.render("GAME OVER", True, (255, 50, 50))
-            screen.blit(gameover_text, (SCREEN_WIDTH/2 - gameover_text.get_width()/2, 35))
-            
-            # Vis din score
-            score_display = f"Din Score: {self.score}"
-            score_text = game_font.render(score_display, True, COLOR_TEXT)
-            screen.blit(score_text, (SCREEN_WIDTH/2 - score_text.get_width()/2, 85))
-            
-            if is_new_record:
-                record_text = game_font.render("NY HIGHSCORE!", True, (255, 215, 0))
-                screen.blit(record_text, (SCREEN_WIDTH/2 - record_text.get_width()/2, 115))
-            
-            # Vis topp 10-listen
-            title_text = game_font.render("TOPP 10 HIGHSCORES", True, (255, 215, 0))
-            screen.blit(title_text, (SCREEN_WIDTH/2 - title_text.get_width()/2, 155))
-            
-            y_offset = 190
-            for i, entry in enumerate(self.highscores[:10], 1):
-                name_text = entry["name"][:15]  # Begrens navnlengde
-                score_text = str(entry["score"])
-                rank_text = f"{i}. {name_text:<15} {score_text:>6}"
-                
-                # Fargekode: 1. plass = gull, 2. plass = sølv, 3. plass = bronse
-                if i == 1:
-                    color = (255, 215, 0)
-                elif i == 2:
-                    color = (192, 192, 192)
-                elif i == 3:
-                    color = (205, 127, 50)
-                else:
-                    color = COLOR_TEXT
-                
-                rank_display = game_font.render(rank_text, True, color)
-                screen.blit(rank_display, (SCREEN_WIDTH/2 - rank_display.get_width()/2, y_offset))
-                y_offset += 30
-            
-            hint_text = small_font.render("Trykk C for å spille igjen, Q for å avslutte", True, (150, 150, 150))
-            screen.blit(hint_text, (SCREEN_WIDTH/2 - hint_text.get_width()/2, SCREEN_HEIGHT - 50))
-            
-            pygame.display.update()
-            await asyncio.sleep(0)
         
         return False
 
-# --- KJØR SPILLET ---
-import asyncio
+startup.mark('import')
 
 # --- KJØR SPILLET ---
 async def main():
@@ -625,17 +1598,23 @@ async def main():
         while not quit_game:
             if game.game_close:
                 quit_game = await game.show_game_over()
+                game.scheduler.reset()  # Ikke ta igjen tiden på game over-skjermen
             else:
-                quit_game = game.play_step()
-            
-            # Viktig for web: Gi kontroll tilbake til nettleseren
-            await asyncio.sleep(0)
+                # Venter på neste frame med await, så nettleseren får tråden imens
+                quit_game = await game.play_frame()
+                if not startup.done:
+                    startup.finish('first_frame')
+                    print(startup.report())
             
     except Exception as e:
         print(f"FEIL I SPILLET: {e}")
         import traceback
         traceback.print_exc()
     finally:
+        # Skriv ut ventende highscores før vi avslutter
+        await highscore_store.flush()
+        if leaderboard is not None:
+            leaderboard.close()
         pygame.quit()
 
 if __name__ == "__main__":
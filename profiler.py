@@ -0,0 +1,243 @@
+"""
+Profilering av frames: tid per fase, allokeringer og GC-pauser.
+
+Spillet kaller begin_frame() øverst i hver frame og mark(fase) når en fase
+er ferdig; tiden siden forrige mark() legges til fasen. En fase kan merkes
+flere ganger i samme frame (f.eks. én gang per skittent område), og tidene
+summeres da.
+
+Rullerende p50/p95/p99 per fase hentes med percentiles(). Historikken kan
+eksporteres som Chrome trace-event JSON (åpnes i chrome://tracing eller
+Perfetto) eller som CSV med én rad per frame.
+
+Når profileringen er av, returnerer begin_frame() og mark() med en gang,
+og ingen GC-callback er registrert.
+
+StartupTimer måler oppstarten (fra import til første frame) i steg.
+"""
+
+import csv
+import gc
+import json
+import sys
+import time
+from array import array
+from collections import deque
+
+# Fasene i én frame, i rekkefølgen de kjøres. Gradient og rutenett ligger
+# i samme cachede lag og måles derfor samlet som 'background'.
+PHASES = (
+    'tick_wait', 'events', 'simulation', 'background', 'foods',
+    'particles', 'snake', 'ui', 'flip',
+)
+
+# Netto antall allokerte minneblokker (bare CPython)
+_allocated_blocks = getattr(sys, 'getallocatedblocks', None)
+
+
+class StartupTimer:
+    """Tid fra import til første frame, delt i navngitte steg.
+
+    mark(navn) gir steget tiden siden forrige mark. Etter finish() ignoreres
+    nye mark(), så rapporten bare gjelder oppstarten.
+    """
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self._last = self.start
+        self.steps = []  # (navn, sekunder)
+        self.done = False
+
+    def mark(self, name):
+        if self.done:
+            return
+        now = time.perf_counter()
+        self.steps.append((name, now - self._last))
+        self._last = now
+
+    def finish(self, name='first_frame'):
+        self.mark(name)
+        self.done = True
+
+    def total(self):
+        """Sekunder fra start til siste steg."""
+        return self._last - self.start
+
+    def report(self):
+        parts = ", ".join(f"{name} {seconds * 1000.0:.0f}" for name, seconds in self.steps)
+        return f"Oppstart: {self.total() * 1000.0:.0f} ms til første frame ({parts})"
+
+
+def percentile(sorted_values, q):
+    """Verdien ved andel q (0-1) i en sortert liste (nærmeste rang), 0.0 hvis den er tom.
+
+    Brukes av alle rapportene (profiler, benchmark og arena), så p50/p95/p99
+    regnes ut likt overalt.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class FrameProfiler:
+    """Måler tid per fase i hver frame, pluss allokeringer og GC-pauser.
+
+    window er antall frames percentilene regnes over, history er antall
+    frames (og GC-pauser) som beholdes for eksport.
+    """
+    def __init__(self, phases=PHASES, window=300, history=3600):
+        self.phases = tuple(phases)
+        self.window = window
+        self._index = {name: i for i, name in enumerate(self.phases)}
+        # Ringbuffere med sekunder per fase, pluss hele framen til slutt
+        self._samples = [array('d', bytes(8 * window)) for _ in range(len(self.phases) + 1)]
+        self._gc_samples = array('d', bytes(8 * window))
+        self._alloc_samples = array('q', bytes(8 * window))
+        self.frames = 0
+        self.history = deque(maxlen=history)     # (start, fasetider, total, gc-tid, allokeringer)
+        self.gc_events = deque(maxlen=history)   # (start, varighet, generasjon, samlet)
+        self.enabled = False
+        self._in_frame = False
+        self._frame_start = 0.0
+        self._last = 0.0
+        self._current = [0.0] * len(self.phases)
+        self._frame_gc = 0.0
+        self._gc_start = 0.0
+        self._blocks = 0
+
+    # --- Av og på ---
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            self._in_frame = False
+            gc.callbacks.append(self._on_gc)
+
+    def disable(self):
+        if self.enabled:
+            self.enabled = False
+            gc.callbacks.remove(self._on_gc)
+
+    def toggle(self):
+        """Slår profileringen av eller på. Returnerer ny tilstand."""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def _on_gc(self, phase, info):
+        now = time.perf_counter()
+        if phase == 'start':
+            self._gc_start = now
+            return
+        duration = now - self._gc_start
+        self._frame_gc += duration
+        self.gc_events.append((self._gc_start, duration, info['generation'], info['collected']))
+
+    # --- Måling ---
+
+    def begin_frame(self):
+        """Avslutter forrige frame (hvis noen) og starter en ny."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._in_frame:
+            self._end_frame(now)
+        self._in_frame = True
+        self._frame_start = self._last = now
+        self._current = [0.0] * len(self.phases)
+        self._frame_gc = 0.0
+        self._blocks = _allocated_blocks() if _allocated_blocks else 0
+
+    def mark(self, phase):
+        """Legger tiden siden forrige mark() (eller begin_frame()) til fasen."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._current[self._index[phase]] += now - self._last
+        self._last = now
+
+    def _end_frame(self, now):
+        slot = self.frames % self.window
+        total = now - self._frame_start
+        for i, seconds in enumerate(self._current):
+            self._samples[i][slot] = seconds
+        self._samples[-1][slot] = total
+        allocs = _allocated_blocks() - self._blocks if _allocated_blocks else 0
+        self._gc_samples[slot] = self._frame_gc
+        self._alloc_samples[slot] = allocs
+        self.history.append((self._frame_start, tuple(self._current), total, self._frame_gc, allocs))
+        self.frames += 1
+
+    # --- Statistikk ---
+
+    def percentiles(self):
+        """p50/p95/p99 i millisekunder per fase over de siste `window` framene.
+
+        Returnerer en dict fase -> (p50, p95, p99), med 'frame' for hele
+        framen og 'gc' for GC-tid per frame.
+        """
+        count = min(self.frames, self.window)
+        result = {}
+        names = self.phases + ('frame',)
+        for name, samples in zip(names, self._samples):
+            values = sorted(samples[:count])
+            result[name] = tuple(percentile(values, q) * 1000.0 for q in (0.5, 0.95, 0.99))
+        values = sorted(self._gc_samples[:count])
+        result['gc'] = tuple(percentile(values, q) * 1000.0 for q in (0.5, 0.95, 0.99))
+        return result
+
+    def allocations(self):
+        """Gjennomsnittlig netto antall nye minneblokker per frame (0 utenfor CPython).
+
+        Dette er endringen i sys.getallocatedblocks(), ikke antall allokeringer:
+        en frame som allokerer og frigjør like mye, gir omtrent 0.
+        """
+        count = min(self.frames, self.window)
+        return sum(self._alloc_samples[:count]) / count if count else 0.0
+
+    def gc_pauses(self):
+        """Antall GC-pauser i historikken og den lengste (ms)."""
+        longest = max((duration for _, duration, _, _ in self.gc_events), default=0.0)
+        return len(self.gc_events), longest * 1000.0
+
+    # --- Eksport ---
+
+    def export_chrome_trace(self, path):
+        """Skriver historikken som Chrome trace-event JSON.
+
+        Fasene legges etter hverandre i rekkefølgen i PHASES. Varighetene er
+        nøyaktige; plasseringen i tid er omtrentlig når en fase er målt i
+        flere biter (skitne områder). GC-pauser ligger på en egen tråd.
+        """
+        events = []
+        for start, durations, total, gc_seconds, allocs in self.history:
+            ts = start * 1e6
+            events.append({"name": "frame", "cat": "frame", "ph": "X", "pid": 0, "tid": 0,
+                           "ts": ts, "dur": total * 1e6, "args": {"gc_ms": gc_seconds * 1000.0}})
+            for name, seconds in zip(self.phases, durations):
+                if seconds:
+                    events.append({"name": name, "cat": "phase", "ph": "X", "pid": 0, "tid": 0,
+                                   "ts": ts, "dur": seconds * 1e6})
+                ts += seconds * 1e6
+            events.append({"name": "allocated_blocks", "ph": "C", "pid": 0, "tid": 0,
+                           "ts": start * 1e6, "args": {"delta": allocs}})
+        for start, duration, generation, collected in self.gc_events:
+            events.append({"name": f"gc gen{generation}", "cat": "gc", "ph": "X", "pid": 0, "tid": 1,
+                           "ts": start * 1e6, "dur": duration * 1e6, "args": {"collected": collected}})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def export_csv(self, path):
+        """Skriver én rad per frame: start, ms per fase, total, GC og allokeringer."""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'start_ms', *(f'{name}_ms' for name in self.phases),
+                             'total_ms', 'gc_ms', 'alloc_blocks'])
+            first = self.frames - len(self.history)
+            for i, (start, durations, total, gc_seconds, allocs) in enumerate(self.history):
+                writer.writerow([first + i, f"{start * 1000.0:.3f}",
+                                 *(f"{seconds * 1000.0:.3f}" for seconds in durations),
+                                 f"{total * 1000.0:.3f}", f"{gc_seconds * 1000.0:.3f}", allocs])
+        return len(self.history)
@@ -0,0 +1,141 @@
+"""
+Automatisk kvalitetsnivå styrt av målt tid per frame.
+
+QualityGovernor får arbeidstiden for hver frame (uten ventingen på neste
+frame) og holder et rullerende gjennomsnitt over de siste framene. Går
+snittet over budsjettet, går den ett nivå ned; er det godt under
+budsjettet lenge nok, prøver den ett nivå opp igjen. Tersklene for å gå
+ned og opp ligger langt fra hverandre, og etter hvert bytte venter den en
+stund før neste, så nivået ikke hopper fram og tilbake.
+
+Nivåene skrur ned glød-lag, partikler per mat og verditekstene over maten.
+Spillet går i samme fart uansett nivå; bare tegningen blir billigere.
+
+Eksempel:
+    governor = QualityGovernor(budget=1 / 60)
+    governor.record(frame_seconds)
+    if governor.changed:
+        ...  # Bygg sprites med governor.settings
+"""
+
+import time
+from collections import deque
+
+# Fra best til billigst. Glød-lag er antall rektangler i hver glød-sprite.
+QUALITY_TIERS = (
+    {'name': 'high', 'food_glow_layers': 5, 'head_glow_layers': 4, 'body_glow_layers': 2,
+     'particles_per_food': 15, 'food_labels': True},
+    {'name': 'medium', 'food_glow_layers': 3, 'head_glow_layers': 2, 'body_glow_layers': 1,
+     'particles_per_food': 8, 'food_labels': True},
+    {'name': 'low', 'food_glow_layers': 1, 'head_glow_layers': 1, 'body_glow_layers': 1,
+     'particles_per_food': 4, 'food_labels': False},
+    {'name': 'minimal', 'food_glow_layers': 0, 'head_glow_layers': 0, 'body_glow_layers': 0,
+     'particles_per_food': 0, 'food_labels': False},
+)
+
+
+def tier_index(name):
+    """Indeksen til et nivå ut fra navnet (ValueError hvis ukjent)."""
+    for i, tier in enumerate(QUALITY_TIERS):
+        if tier['name'] == name:
+            return i
+    raise ValueError(f"Ukjent kvalitetsnivå '{name}' (gyldige: {', '.join(t['name'] for t in QUALITY_TIERS)})")
+
+
+class QualityGovernor:
+    """Velger kvalitetsnivå ut fra rullerende gjennomsnitt av frame-tiden.
+
+    budget er sekunder en frame kan bruke. Over down_ratio * budget i
+    snitt går nivået ned; under up_ratio * budget i up_frames frames går
+    det opp. Etter et bytte står nivået i minst cooldown frames.
+    """
+    def __init__(self, budget, tiers=QUALITY_TIERS, window=60, down_ratio=0.9, up_ratio=0.5,
+                 up_frames=300, cooldown=120, history=64):
+        self.budget = budget
+        self.tiers = tiers
+        self.down_ratio = down_ratio
+        self.up_ratio = up_ratio
+        self.up_frames = up_frames
+        self.cooldown = cooldown
+        self.tier = 0
+        self.locked = False
+        self.changed = False  # Satt av record() når nivået byttet denne framen
+        self.history = deque(maxlen=history)  # (frame, tid, fra, til, snitt i ms)
+        self._samples = deque(maxlen=window)
+        self._total = 0.0
+        self._frames = 0
+        self._hold = 0       # Frames igjen før nivået kan byttes
+        self._good = 0       # Frames på rad godt under budsjettet
+
+    @property
+    def settings(self):
+        return self.tiers[self.tier]
+
+    @property
+    def name(self):
+        return self.settings['name']
+
+    def average(self):
+        """Rullerende snitt av frame-tiden i sekunder."""
+        return self._total / len(self._samples) if self._samples else 0.0
+
+    def set_tier(self, tier, lock=True):
+        """Setter nivået (indeks eller navn). Med lock styres det ikke automatisk lenger."""
+        if isinstance(tier, str):
+            tier = tier_index(tier)
+        self.locked = lock
+        self._switch(tier)
+
+    def unlock(self):
+        self.locked = False
+
+    def _switch(self, tier):
+        tier = max(0, min(tier, len(self.tiers) - 1))
+        if tier != self.tier:
+            self.history.append((self._frames, time.time(), self.tier, tier, self.average() * 1000.0))
+            self.tier = tier
+            self.changed = True
+        self._samples.clear()
+        self._total = 0.0
+        self._hold = self.cooldown
+        self._good = 0
+
+    def record(self, seconds):
+        """Registrerer arbeidstiden for én frame. Returnerer True hvis nivået byttet."""
+        self.changed = False
+        self._frames += 1
+        samples = self._samples
+        if len(samples) == samples.maxlen:
+            self._total -= samples[0]
+        samples.append(seconds)
+        self._total += seconds
+        if self.locked:
+            return False
+        if self._hold:
+            self._hold -= 1
+            return False
+        average = self.average()
+        if len(samples) == samples.maxlen and average > self.budget * self.down_ratio:
+            if self.tier < len(self.tiers) - 1:
+                self._switch(self.tier + 1)
+            return self.changed
+        if average < self.budget * self.up_ratio:
+            self._good += 1
+            if self._good >= self.up_frames and self.tier > 0:
+                self._switch(self.tier - 1)
+        else:
+            self._good = 0
+        return self.changed
+
+    def stats(self):
+        return {
+            "tier": self.name,
+            "locked": self.locked,
+            "average_ms": self.average() * 1000.0,
+            "budget_ms": self.budget * 1000.0,
+            "changes": [
+                {"frame": frame, "time": when, "from": self.tiers[old]['name'],
+                 "to": self.tiers[new]['name'], "average_ms": average}
+                for frame, when, old, new, average in self.history
+            ],
+        }
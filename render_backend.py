@@ -0,0 +1,190 @@
+"""
+Render-backends: hvor ferdige sprites komponeres og vises.
+
+Spill-framen tegnes gjennom et backend-objekt med samme metoder som en
+pygame.Surface (blit, blits, fill, get_size), så tegnekoden er den samme
+for begge:
+
+- SurfaceBackend tegner rett på skjermflaten med blits i programvare,
+  slik spillet alltid har gjort, og kan laste opp bare skitne områder.
+- TextureBackend bruker Renderer/Texture fra pygame._sdl2.video. Hver
+  sprite lastes opp som tekstur første gang den brukes, og komponeres
+  deretter av SDL-rendereren (på GPU-en hvis driveren har akselerasjon).
+  SDL-driveren 'software' fungerer uten GPU, også med SDL_VIDEODRIVER=dummy.
+
+Flater som endrer seg (som slangelaget) meldes med upload(), så bare de
+endrede områdene lastes opp på nytt. Skjermer som tegner rett på
+backend.surface (navn og game over) vises med present_screen().
+"""
+
+import weakref
+
+import pygame
+
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture, get_drivers
+except ImportError:
+    Renderer = None  # Eldre pygame uten _sdl2: bare SurfaceBackend
+
+BACKENDS = ('surface', 'texture')
+
+
+class SurfaceBackend:
+    """Tegner på skjermflaten fra pygame.display (programvare-blits)."""
+    name = 'surface'
+    partial_updates = True  # Kan vise bare skitne områder
+
+    def __init__(self, size, title):
+        self.surface = pygame.display.set_mode(size)
+        pygame.display.set_caption(title)
+
+    def get_size(self):
+        return self.surface.get_size()
+
+    def blit(self, image, dest, area=None, special_flags=0):
+        return self.surface.blit(image, dest, area, special_flags)
+
+    def blits(self, sequence, doreturn=True):
+        return self.surface.blits(sequence, doreturn)
+
+    def fill(self, color, rect=None):
+        return self.surface.fill(color, rect)
+
+    def set_clip(self, rect):
+        self.surface.set_clip(rect)
+
+    def upload(self, surface, rects=None):
+        """Flaten blittes direkte fra minnet, så det er ingenting å laste opp."""
+
+    def present(self, rects=None):
+        if rects is None:
+            pygame.display.flip()  # Bruk flip() i stedet for update() for web
+        else:
+            pygame.display.update(rects)
+
+    def present_screen(self):
+        pygame.display.update()
+
+    def close(self):
+        pass
+
+
+class TextureBackend:
+    """Komponerer framen med SDL Renderer og teksturer.
+
+    driver er navnet på en SDL-renderdriver ('software', 'opengl', ...),
+    eller None for SDLs standardvalg.
+    """
+    name = 'texture'
+    partial_updates = False  # Hele framen komponeres og vises hver gang
+
+    def __init__(self, size, title, driver=None):
+        if Renderer is None:
+            raise RuntimeError("pygame._sdl2 er ikke tilgjengelig")
+        index = -1
+        if driver is not None:
+            names = [info.name for info in get_drivers()]
+            if driver not in names:
+                raise ValueError(f"Ukjent renderdriver '{driver}' (tilgjengelige: {', '.join(names)})")
+            index = names.index(driver)
+        self.window = Window(title, size)
+        self.renderer = Renderer(self.window, index=index)
+        self.driver = driver
+        # Skjermer som ikke går gjennom backenden tegner på denne flaten
+        self.surface = pygame.Surface(size)
+        self._size = size
+        self._origin = (0, 0)  # Øverste venstre hjørne av viewporten satt av set_clip()
+        self._textures = weakref.WeakKeyDictionary()   # Surface -> Texture
+        self._streaming = weakref.WeakKeyDictionary()  # Surface -> Texture som oppdateres
+        # Tellere for diagnostikk
+        self.uploads = 0
+        self.draws = 0
+
+    def get_size(self):
+        return self._size
+
+    def _texture(self, image):
+        texture = self._streaming.get(image)
+        if texture is None:
+            texture = self._textures.get(image)
+        if texture is None:
+            texture = Texture.from_surface(self.renderer, image)
+            self._textures[image] = texture
+            self.uploads += 1
+        return texture
+
+    def blit(self, image, dest, area=None, special_flags=0):
+        """Tegner image som tekstur. Blandingen følger alfakanalen til flaten."""
+        texture = self._texture(image)
+        x, y = dest[0] - self._origin[0], dest[1] - self._origin[1]
+        if area is None:
+            texture.draw(dstrect=(x, y, texture.width, texture.height))
+        else:
+            area = pygame.Rect(area)
+            texture.draw(srcrect=area, dstrect=(x, y, area.width, area.height))
+        self.draws += 1
+
+    def blits(self, sequence, doreturn=True):
+        for item in sequence:
+            self.blit(*item)
+
+    def fill(self, color, rect=None):
+        self.renderer.draw_color = pygame.Color(color)
+        rect = pygame.Rect(rect or (0, 0, *self._size))
+        self.renderer.fill_rect(rect.move(-self._origin[0], -self._origin[1]))
+
+    def set_clip(self, rect):
+        """Begrenser tegningen til rect (None: hele vinduet).
+
+        Rendereren har ingen klipperektangel, så viewporten settes til rect,
+        og blit() og fill() trekker fra hjørnet til viewporten.
+        """
+        if rect is None:
+            self.renderer.set_viewport(None)
+            self._origin = (0, 0)
+        else:
+            rect = pygame.Rect(rect)
+            self.renderer.set_viewport(rect)
+            self._origin = rect.topleft
+
+    def upload(self, surface, rects=None):
+        """Laster opp en flate som endres, hel eller bare rects."""
+        texture = self._streaming.get(surface)
+        if texture is None:
+            texture = Texture(self.renderer, surface.get_size(), streaming=True)
+            self._streaming[surface] = texture
+            rects = None
+        if rects is None:
+            texture.update(surface)
+        else:
+            bounds = surface.get_rect()
+            for rect in rects:
+                rect = rect.clip(bounds)
+                if rect:
+                    texture.update(surface.subsurface(rect), rect)
+        self.uploads += 1
+
+    def present(self, rects=None):
+        self.renderer.present()
+
+    def present_screen(self):
+        self.upload(self.surface)
+        self.blit(self.surface, (0, 0))
+        self.renderer.present()
+
+    def close(self):
+        self._textures.clear()
+        self._streaming.clear()
+        self.window.destroy()
+
+
+def create_backend(name, size, title, driver=None):
+    """Lager en backend ut fra navnet. Faller tilbake til 'surface' hvis 'texture' ikke kan brukes."""
+    if name not in BACKENDS:
+        raise ValueError(f"Ukjent render-backend '{name}' (gyldige: {', '.join(BACKENDS)})")
+    if name == 'texture':
+        try:
+            return TextureBackend(size, title, driver)
+        except (RuntimeError, pygame.error) as e:
+            print(f"Kunne ikke starte texture-backend, bruker surface: {e}")
+    return SurfaceBackend(size, title)
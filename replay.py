@@ -0,0 +1,153 @@
+"""
+Deterministiske replays: seed pluss input, i et kompakt binærformat.
+
+Et spill på SnakeEngine er helt bestemt av seeden og hvilke svinger som
+ble tatt på hvilken tick, så et replay lagrer bare det. Formatet er:
+
+    b'NSR1' + varint(seed) + varint(ticks) + varint(score) + varint(antall)
+    + én varint per sving: (tick-avstand fra forrige sving << 2) | retning
+
+Spill på et annet brett enn standardbrettet (40x30) lagres som b'NSR2'
+med varint(kolonner) + varint(rader) rett etter magien.
+
+Retningen er UP/RIGHT/DOWN/LEFT fra engine.py (2 bit), så en sving koster
+som regel én byte. Avspilling kjører spillet på nytt uten skjerm, og
+verify() sjekker at det ender med samme poengsum.
+
+Et replay kan komme fra en ødelagt eller laget fil, så from_bytes() avviser
+brett større enn MAX_BOARD_SIZE, og verify() spiller ikke mer enn
+MAX_REPLAY_TICKS steg.
+"""
+
+from engine import SnakeEngine, BOARD_COLS, BOARD_ROWS, MAX_BOARD_SIZE, MAX_SPEED
+
+REPLAY_MAGIC = b'NSR1'
+REPLAY_MAGIC_SIZED = b'NSR2'  # Med brettstørrelse
+MAX_REPLAY_TICKS = MAX_SPEED * 60 * 60  # En time i høyeste fart
+
+
+class ReplayError(ValueError):
+    """Replay-dataene er ødelagte eller i feil format."""
+
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("replay slutter midt i et tall")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """Seed, antall ticks, oppgitt poengsum, svingene (tick, retning) og brettet."""
+    __slots__ = ('seed', 'ticks', 'score', 'turns', 'cols', 'rows')
+
+    def __init__(self, seed, ticks=0, score=0, turns=None, cols=BOARD_COLS, rows=BOARD_ROWS):
+        self.seed = seed
+        self.ticks = ticks
+        self.score = score
+        self.turns = turns if turns is not None else []
+        self.cols = cols
+        self.rows = rows
+
+    def to_bytes(self):
+        if (self.cols, self.rows) == (BOARD_COLS, BOARD_ROWS):
+            out = bytearray(REPLAY_MAGIC)
+        else:
+            out = bytearray(REPLAY_MAGIC_SIZED)
+            _write_varint(out, self.cols)
+            _write_varint(out, self.rows)
+        for value in (self.seed, self.ticks, self.score, len(self.turns)):
+            _write_varint(out, value)
+        last_tick = 0
+        for tick, action in self.turns:
+            _write_varint(out, (tick - last_tick) << 2 | action)
+            last_tick = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic = bytes(data[:len(REPLAY_MAGIC)])
+        if magic not in (REPLAY_MAGIC, REPLAY_MAGIC_SIZED):
+            raise ReplayError("ikke et Neon Snake-replay")
+        pos = len(REPLAY_MAGIC)
+        cols, rows = BOARD_COLS, BOARD_ROWS
+        if magic == REPLAY_MAGIC_SIZED:
+            cols, pos = _read_varint(data, pos)
+            rows, pos = _read_varint(data, pos)
+            if not cols or not rows:
+                raise ReplayError("brettet i replayet har ingen celler")
+            if cols > MAX_BOARD_SIZE or rows > MAX_BOARD_SIZE:
+                raise ReplayError(f"brettet i replayet er for stort ({cols}x{rows})")
+        seed, pos = _read_varint(data, pos)
+        ticks, pos = _read_varint(data, pos)
+        score, pos = _read_varint(data, pos)
+        count, pos = _read_varint(data, pos)
+        turns = []
+        tick = 0
+        for _ in range(count):
+            value, pos = _read_varint(data, pos)
+            tick += value >> 2
+            turns.append((tick, value & 3))
+        if pos != len(data):
+            raise ReplayError("ekstra data etter replayet")
+        return cls(seed, ticks, score, turns, cols, rows)
+
+    def simulate(self, engine=None):
+        """Spiller replayet på nytt uten skjerm og returnerer motoren etterpå."""
+        engine = engine or SnakeEngine(self.cols, self.rows)
+        engine.reset(self.seed)
+        turns = iter(self.turns)
+        pending = next(turns, None)
+        while engine.ticks < self.ticks and not engine.done:
+            while pending is not None and pending[0] == engine.ticks:
+                engine.turn(pending[1])
+                pending = next(turns, None)
+            engine.step()
+        return engine
+
+    def verify(self, score=None):
+        """True hvis replayet ender på oppgitt poengsum (og spillet faktisk er over).
+
+        Replays på mer enn MAX_REPLAY_TICKS steg spilles ikke av og gir False.
+        """
+        score = self.score if score is None else score
+        if self.ticks > MAX_REPLAY_TICKS:
+            return False
+        try:
+            engine = self.simulate()
+        except (IndexError, ValueError):
+            return False
+        return engine.done and engine.ticks == self.ticks and engine.score == score
+
+
+class ReplayRecorder:
+    """Tar opp svingene i et spill mens det spilles."""
+    def __init__(self, seed, cols=BOARD_COLS, rows=BOARD_ROWS):
+        self.replay = Replay(seed, cols=cols, rows=rows)
+
+    def record_turn(self, tick, action):
+        """Lagre en godtatt sving, tatt før steget med nummer tick + 1."""
+        self.replay.turns.append((tick, action))
+
+    def finish(self, ticks, score):
+        """Avslutter opptaket og returnerer replayet."""
+        self.replay.ticks = ticks
+        self.replay.score = score
+        return self.replay
@@ -0,0 +1,206 @@
+"""
+Spol tilbake: de siste sekundene av et spill i en ringbuffer med fast størrelse.
+
+RewindBuffer tar opp hvert steg i SnakeEngine som en kompakt post på
+RECORD.size byte (nytt hode, om halen ble fjernet, mat som ble spawnet
+eller spist, score, fart og lengde) i en forhåndsallokert bytearray.
+Hvert keyframe_interval steg lagres i tillegg et fullt snapshot av
+motoren (SnakeEngine.snapshot()). For å gjenopprette et steg tas
+nærmeste keyframe før steget, og postene etter den spilles framover;
+det er aldri mer enn keyframe_interval poster å spille av.
+
+Mat-timere og utløpt mat lagres ikke: de regnes ut igjen med samme
+flyttallsoperasjoner som i motoren, så resultatet blir bit for bit likt.
+Tilstanden til RNG-en lagres ikke heller, så ny mat etter en
+tilbakespoling kan havne andre steder enn første gang (se
+SnakeEngine.snapshot()). Spillet kan derfor ikke spilles av fra replayet
+etterpå, og main.py regner det som øvingsmodus.
+
+Eksempel:
+    rewind = RewindBuffer(engine, seconds=10)
+    ...
+    engine.advance(dt)
+    engine.move()
+    rewind.record(dt, previous_head, eaten)
+    ...
+    rewind.restore(engine.ticks - 30)
+"""
+
+import struct
+import time
+from collections import deque
+
+from engine import FOOD_TYPE_NAMES, MAX_SPEED, Food
+
+# dt, last_food_spawn, hode (kol, rad), spawnet mat (kol, rad, type),
+# retning (dx, dy), flagg, årsak, score, fart, lengde
+RECORD = struct.Struct('<ddiiiiBbbBBiHi')
+
+MOVED, TAIL_POPPED, EATEN, SPAWNED, DONE = 1, 2, 4, 8, 16
+CAUSES = (None, 'wall', 'self')
+
+
+class RewindBuffer:
+    """Ringbuffer med de siste stegene til en SnakeEngine.
+
+    Plassen er fast: seconds * MAX_SPEED poster, så bufferen dekker minst
+    seconds sekunder selv i høyeste fart. keyframe_interval er antall steg
+    mellom hvert fulle snapshot.
+    """
+    def __init__(self, engine, seconds=10, keyframe_interval=60):
+        self.engine = engine
+        self.capacity = max(1, int(seconds * MAX_SPEED))
+        # Bufferen må alltid ha plass til minst ett keyframe med postene etter
+        self.keyframe_interval = max(1, min(keyframe_interval, self.capacity))
+        self._records = bytearray(self.capacity * RECORD.size)
+        # (steg, snapshot), eldste først; eldre enn bufferen kastes
+        self._keyframes = deque()
+        self._newest = 0  # Steget til siste post
+        self._count = 0   # Poster i bufferen
+        # Tellere for diagnostikk
+        self.restores = 0
+        self.replayed = 0  # Poster spilt av ved siste restore()
+        self.restore_time = 0.0
+        self.clear()
+
+    def clear(self):
+        """Glemmer alt og starter med et keyframe av motoren slik den er nå."""
+        self._keyframes.clear()
+        self._count = 0
+        self._newest = self.engine.ticks
+        self._keyframes.append((self._newest, self.engine.snapshot()))
+
+    @property
+    def oldest(self):
+        """Det tidligste steget som kan gjenopprettes."""
+        return self._keyframes[0][0]
+
+    @property
+    def newest(self):
+        return self._newest
+
+    def record(self, dt, previous_head, eaten):
+        """Tar opp steget motoren nettopp tok: advance(dt) fulgt av move().
+
+        previous_head er hodet før steget, eaten det move() returnerte.
+        """
+        engine = self.engine
+        if engine.ticks != self._newest + 1:
+            self.clear()  # Motoren er nullstilt eller satt tilbake uten restore()
+            return
+        head_col, head_row = engine.snake[0]
+        flags = 0
+        if (head_col, head_row) != previous_head:
+            flags |= MOVED
+        if engine.vacated is not None:
+            flags |= TAIL_POPPED
+        if eaten is not None:
+            flags |= EATEN
+        if engine.done:
+            flags |= DONE
+        spawned = engine.spawned
+        spawn_col = spawn_row = spawn_type = 0
+        if spawned is not None:
+            flags |= SPAWNED
+            spawn_col, spawn_row = spawned.col, spawned.row
+            spawn_type = FOOD_TYPE_NAMES.index(spawned.food_type)
+        dx, dy = engine.direction
+        RECORD.pack_into(self._records, (engine.ticks % self.capacity) * RECORD.size,
+                         dt, engine.last_food_spawn, head_col, head_row, spawn_col, spawn_row, spawn_type,
+                         dx, dy, flags, CAUSES.index(engine.cause), engine.score, engine.speed, engine.length)
+        self._newest = engine.ticks
+        self._count = min(self._count + 1, self.capacity)
+
+        if engine.ticks % self.keyframe_interval == 0:
+            self._keyframes.append((engine.ticks, engine.snapshot()))
+        # Et keyframe er bare nyttig så lenge postene etter det er i bufferen
+        first = self._newest - self._count
+        while len(self._keyframes) > 1 and self._keyframes[0][0] < first:
+            self._keyframes.popleft()
+
+    def restore(self, tick):
+        """Setter motoren tilbake til slik den var etter steg tick.
+
+        Stegene etter tick glemmes, så opptaket fortsetter derfra. Gir
+        ValueError hvis tick ikke er i bufferen.
+        """
+        if not self.oldest <= tick <= self._newest:
+            raise ValueError(f"Steg {tick} er ikke i bufferen ({self.oldest}-{self._newest})")
+        start = time.perf_counter()
+        base, snapshot = self._keyframes[0]
+        for frame_tick, frame in self._keyframes:
+            if frame_tick > tick:
+                break
+            base, snapshot = frame_tick, frame
+        engine = self.engine
+        engine.restore(snapshot)
+        for t in range(base + 1, tick + 1):
+            self._apply(RECORD.unpack_from(self._records, (t % self.capacity) * RECORD.size))
+        engine.ticks = tick
+        engine._last_move = engine.direction
+
+        # Glem framtiden: stegene etter tick og keyframes som hører til dem
+        while self._keyframes[-1][0] > tick:
+            self._keyframes.pop()
+        self._count -= self._newest - tick
+        self._newest = tick
+        self.restores += 1
+        self.replayed = tick - base
+        self.restore_time = time.perf_counter() - start
+
+    def _apply(self, record):
+        """Spiller én post framover, med de samme operasjonene som motoren."""
+        (dt, last_food_spawn, head_col, head_row, spawn_col, spawn_row, spawn_type,
+         dx, dy, flags, cause, score, speed, length) = record
+        engine = self.engine
+        grid = engine.grid
+        # advance(): timere teller ned og utløpt mat fjernes
+        engine.time += dt
+        alive_foods = []
+        for food in engine.foods:
+            if food.update(dt):
+                alive_foods.append(food)
+            else:
+                grid.remove_food(grid.cell_at(food.col, food.row))
+        engine.foods = alive_foods
+        if flags & SPAWNED:
+            food = Food(spawn_col, spawn_row, FOOD_TYPE_NAMES[spawn_type])
+            grid.add_food(grid.cell_at(spawn_col, spawn_row), food)
+            engine.foods.append(food)
+        engine.last_food_spawn = last_food_spawn
+        # move(): nytt hode, halen og maten som ble spist
+        engine.direction = (dx, dy)
+        if flags & MOVED:
+            engine.snake.push_head(head_col, head_row)
+            if flags & TAIL_POPPED:
+                grid.remove_snake(grid.cell_at(*engine.snake.pop_tail()))
+            head_cell = grid.cell_at(head_col, head_row)
+            grid.add_snake(head_cell)
+            if flags & EATEN:
+                engine.foods.remove(grid.food_at(head_cell))
+                grid.remove_food(head_cell)
+        engine.score = score
+        engine.speed = speed
+        engine.length = length
+        engine.done = bool(flags & DONE)
+        engine.cause = CAUSES[cause]
+
+    def memory_bytes(self):
+        """Byte brukt på poster og keyframes (slangen og maten i hvert snapshot)."""
+        total = len(self._records)
+        for _, (cols, rows, foods, *_rest) in self._keyframes:
+            total += cols.itemsize * len(cols) + rows.itemsize * len(rows) + len(foods) * RECORD.size
+        return total
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "records": self._count,
+            "oldest": self.oldest,
+            "newest": self._newest,
+            "keyframes": len(self._keyframes),
+            "memory_bytes": self.memory_bytes(),
+            "restores": self.restores,
+            "last_restore_ms": self.restore_time * 1000.0,
+            "last_replayed": self.replayed,
+        }
@@ -0,0 +1,205 @@
+"""
+Turnering for autopilot-policyer: spiller mange hele spill uten skjerm.
+
+Spillene kjøres på SnakeEngine (ingen pygame) fordelt på en prosesspool.
+Hvert spill skrives som én linje JSON så snart det er ferdig, og til slutt
+skrives samlet statistikk og gjennomstrømning per arbeider.
+
+Kjør: python tournament.py --games 1000 --policy greedy --policy random
+En policy er enten et innebygd navn eller "modul:funksjon". Funksjonen får
+(engine, rng) og returnerer UP/RIGHT/DOWN/LEFT fra engine.py, eller None
+for å fortsette rett fram.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import SnakeEngine, FOOD_TYPES, DIRECTIONS, UP, RIGHT, DOWN, LEFT
+
+DEFAULT_MAX_TICKS = 20000  # En policy som aldri dør stoppes her ('timeout')
+
+# --- INNEBYGDE POLICYER ---
+
+def random_policy(engine, rng):
+    """Tilfeldig retning i ca. hvert femte steg."""
+    return rng.randrange(4) if rng.random() < 0.2 else None
+
+def _is_safe(engine, action):
+    dx, dy = DIRECTIONS[action]
+    col, row = engine.snake[0]
+    cell = engine.grid.cell_at(col + dx, row + dy)
+    if cell < 0:
+        return False
+    # Halen flytter seg før hodet kommer fram
+    tail_cell = engine.grid.cell_at(*engine.snake.tail())
+    return not engine.grid.has_snake(cell) or (cell == tail_cell and len(engine.snake) >= engine.length)
+
+def greedy_policy(engine, rng):
+    """Går mot nærmeste mat og unngår vegger og seg selv ett steg fram."""
+    col, row = engine.snake[0]
+    preferred = []
+    if engine.foods:
+        food = min(engine.foods, key=lambda f: abs(f.col - col) + abs(f.row - row))
+        if food.col > col:
+            preferred.append(RIGHT)
+        elif food.col < col:
+            preferred.append(LEFT)
+        if food.row > row:
+            preferred.append(DOWN)
+        elif food.row < row:
+            preferred.append(UP)
+    others = [a for a in (UP, RIGHT, DOWN, LEFT) if a not in preferred]
+    rng.shuffle(others)
+    current_dx, current_dy = engine.direction
+    for action in preferred + others:
+        dx, dy = DIRECTIONS[action]
+        if (current_dx or current_dy) and (dx, dy) == (-current_dx, -current_dy):
+            continue  # Kan ikke snu rett bakover
+        if _is_safe(engine, action):
+            return action
+    return None
+
+BUILTIN_POLICIES = {
+    'random': random_policy,
+    'greedy': greedy_policy,
+}
+
+def resolve_policy(spec):
+    """Finner policy fra et innebygd navn eller "modul:funksjon"."""
+    if spec in BUILTIN_POLICIES:
+        return BUILTIN_POLICIES[spec]
+    module_name, sep, attr = spec.partition(':')
+    if not sep:
+        raise ValueError(f"Ukjent policy '{spec}' (bruk et innebygd navn eller modul:funksjon)")
+    return getattr(importlib.import_module(module_name), attr)
+
+# --- ARBEIDER ---
+
+def play_game(policy_spec, seed, max_ticks=DEFAULT_MAX_TICKS):
+    """Spiller ett helt spill og returnerer resultatet som dict."""
+    policy = resolve_policy(policy_spec)
+    engine = SnakeEngine(seed=seed)
+    rng = random.Random(seed)
+    eaten = Counter()
+    start = time.perf_counter()
+    done = False
+    while not done and engine.ticks < max_ticks:
+        _, _, done, info = engine.step(policy(engine, rng))
+        if info['eaten']:
+            eaten[info['eaten']] += 1
+    return {
+        'policy': policy_spec,
+        'seed': seed,
+        'score': engine.score,
+        'length': engine.length,
+        'ticks': engine.ticks,
+        'eaten': {name: eaten[name] for name in FOOD_TYPES},
+        'cause': engine.cause if done else 'timeout',
+        'worker': os.getpid(),
+        'seconds': time.perf_counter() - start,
+    }
+
+def _play_game_args(args):
+    return play_game(*args)
+
+# --- OPPSUMMERING ---
+
+def summarize(results, wall_seconds):
+    """Samlet statistikk per policy og gjennomstrømning per arbeider."""
+    by_policy = defaultdict(list)
+    for result in results:
+        by_policy[result['policy']].append(result)
+
+    policies = {}
+    for name, games in by_policy.items():
+        scores = [g['score'] for g in games]
+        eaten = Counter()
+        for g in games:
+            eaten.update(g['eaten'])
+        policies[name] = {
+            'games': len(games),
+            'score_mean': statistics.fmean(scores),
+            'score_median': statistics.median(scores),
+            'score_max': max(scores),
+            'length_mean': statistics.fmean(g['length'] for g in games),
+            'ticks_mean': statistics.fmean(g['ticks'] for g in games),
+            'eaten': dict(eaten),
+            'causes': dict(Counter(g['cause'] for g in games)),
+        }
+
+    workers = defaultdict(lambda: {'games': 0, 'ticks': 0, 'seconds': 0.0})
+    for result in results:
+        worker = workers[result['worker']]
+        worker['games'] += 1
+        worker['ticks'] += result['ticks']
+        worker['seconds'] += result['seconds']
+    for worker in workers.values():
+        busy = worker['seconds'] or 1e-9
+        worker['games_per_sec'] = worker['games'] / busy
+        worker['ticks_per_sec'] = worker['ticks'] / busy
+
+    total_ticks = sum(r['ticks'] for r in results)
+    return {
+        'games': len(results),
+        'wall_seconds': wall_seconds,
+        'games_per_sec': len(results) / wall_seconds if wall_seconds else 0.0,
+        'ticks_per_sec': total_ticks / wall_seconds if wall_seconds else 0.0,
+        'policies': policies,
+        'workers': dict(workers),
+    }
+
+def run_tournament(policies, games, seed=0, workers=None, max_ticks=DEFAULT_MAX_TICKS, output=None):
+    """Spiller `games` spill per policy og strømmer resultatene til output (fil eller None)."""
+    for spec in policies:
+        resolve_policy(spec)  # Feil tidlig, ikke i arbeiderne
+    jobs = [(spec, seed + i, max_ticks) for spec in policies for i in range(games)]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (workers * 8))
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_play_game_args, jobs, chunksize=chunksize):
+            results.append(result)
+            if output:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return summarize(results, time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Turnering for Neon Snake-policyer uten skjerm.")
+    parser.add_argument('--policy', action='append', help="Innebygd navn eller modul:funksjon (kan gjentas)")
+    parser.add_argument('--games', type=int, default=100, help="Antall spill per policy")
+    parser.add_argument('--seed', type=int, default=0, help="Første seed; spill nr. i får seed + i")
+    parser.add_argument('--workers', type=int, default=None, help="Antall prosesser (standard: antall kjerner)")
+    parser.add_argument('--max-ticks', type=int, default=DEFAULT_MAX_TICKS)
+    parser.add_argument('--output', default='tournament_results.jsonl', help="JSONL-fil for resultater per spill")
+    args = parser.parse_args(argv)
+
+    policies = args.policy or ['greedy']
+    print(f"Spiller {args.games} spill per policy: {', '.join(policies)}")
+    with open(args.output, 'w', encoding='utf-8') as output:
+        summary = run_tournament(policies, args.games, args.seed, args.workers, args.max_ticks, output)
+
+    print(f"\n✅ Ferdig: {summary['games']} spill på {summary['wall_seconds']:.2f} s "
+          f"({summary['games_per_sec']:.1f} spill/s, {summary['ticks_per_sec']:.0f} ticks/s)")
+    for name, stats in summary['policies'].items():
+        print(f"\n{name}: snitt {stats['score_mean']:.1f}, median {stats['score_median']}, "
+              f"maks {stats['score_max']}, lengde {stats['length_mean']:.1f}, ticks {stats['ticks_mean']:.0f}")
+        print(f"  spist: {stats['eaten']}")
+        print(f"  dødsårsak: {stats['causes']}")
+    print("\nArbeidere:")
+    for pid, worker in summary['workers'].items():
+        print(f"  {pid}: {worker['games']} spill, {worker['games_per_sec']:.1f} spill/s, "
+              f"{worker['ticks_per_sec']:.0f} ticks/s")
+    print(f"\n📁 Resultater per spill ligger i '{args.output}'")
+    return summary
+
+if __name__ == "__main__":
+    main(sys.argv[1:])